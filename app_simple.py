@@ -8,7 +8,8 @@ import requests
 import json
 
 # Import the grouping logic from the existing script
-from group_assignment_to_excel import group_participants, save_to_excel, find_column_mapping
+from group_assignment_to_excel import group_participants, save_to_excel, find_column_mapping, resolve_columns
+from input_cache import load_merged_data
 
 def get_available_data():
     """Get data from any available source in the session state"""
@@ -265,15 +266,14 @@ def show_upload_page():
         try:
             # Read the Excel file
             try:
-                data = pd.read_excel(uploaded_file, sheet_name='Merged Data')
+                # Uploads carry personal data: parse in memory, never snapshot to disk
+                data, column_mapping, _ = load_merged_data(uploaded_file, find_column_mapping, csv_fallback=False,
+                                                           cache_dir=None)
             except Exception as e:
                 st.error(f"Could not read 'Merged Data' sheet: {str(e)}")
                 st.info("Please ensure your Excel file has a 'Merged Data' sheet.")
                 return
 
-            # Find column mapping
-            column_mapping = find_column_mapping(data)
-
             # Check for essential columns using flexible mapping
             essential_fields = ['user_id', 'gender_identity', 'gender_preference']
             missing_essential = [field for field in essential_fields if not column_mapping.get(field)]
@@ -460,6 +460,8 @@ def show_grouping_page():
                                 st.write(f"**{key}:** {value}")
                             else:
                                 st.write(f"**{key}:** ❌ Not found")
+                        for key, columns in resolve_columns(data.columns).ambiguous.items():
+                            st.write(f"⚠️ **{key}** also matched: {', '.join(columns[1:])}")
                     
                     # Convert DataFrame to list of dictionaries
                     data_list = data.to_dict('records')
@@ -759,6 +761,11 @@ def show_user_list_page():
                 mapped_to = f" → {column_mapping.get(col, 'Not found')}" if column_mapping.get(col) else ""
                 st.write(f"{status} {col}{mapped_to}")
 
+        ambiguous = resolve_columns(data_for_mapping.columns).ambiguous
+        if ambiguous:
+            st.warning("⚠️ Columns matched by more than one name (the first is used): " +
+                       "; ".join(f"{key} → {', '.join(columns)}" for key, columns in ambiguous.items()))
+
 def show_data_management_page():
     """Combined page for Upload Data, User List, and Create Groups"""
 
@@ -786,15 +793,14 @@ def show_data_management_page():
         try:
             # Read the Excel file
             try:
-                data = pd.read_excel(uploaded_file, sheet_name='Merged Data')
+                # Uploads carry personal data: parse in memory, never snapshot to disk
+                data, column_mapping, _ = load_merged_data(uploaded_file, find_column_mapping, csv_fallback=False,
+                                                           cache_dir=None)
             except Exception as e:
                 st.error(f"Could not read 'Merged Data' sheet: {str(e)}")
                 st.info("Please ensure your Excel file has a 'Merged Data' sheet.")
                 return
 
-            # Find column mapping
-            column_mapping = find_column_mapping(data)
-
             # Check for essential columns using flexible mapping
             essential_fields = ['user_id', 'gender_identity', 'gender_preference']
             missing_essential = [field for field in essential_fields if not column_mapping.get(field)]
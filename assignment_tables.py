@@ -0,0 +1,206 @@
+"""
+Columnar exports of group assignments.
+
+The Grouped Members sheet packs up to 7 members per row, which is convenient
+for coaches but slow and lossy to re-read for analytics. assignment_table()
+flattens the export row model (build_export_groups in
+group_assignment_to_excel.py) into a tidy long-format table with one row per
+member, and write_assignment_table() saves it as Parquet, Arrow IPC (Feather
+v2) or CSV.
+
+diff_assignment_tables() compares two such tables (e.g. the previous run's
+snapshot and the current assignment) member by member, for the Changes sheet
+of an incremental re-export.
+
+Parquet and Arrow need pyarrow, which is optional (requirements-extras.txt);
+CSV only needs pandas.
+"""
+
+import os
+
+import pandas as pd
+
+# Column order of the long-format table
+ASSIGNMENT_COLUMNS = [
+    'group_id', 'group_type', 'group_name', 'group_size', 'slot',
+    'user_id', 'name', 'location', 'coach', 'sex',
+    'lgbtq', 'same_gender', 'has_buddies', 'bulking', 'solo', 'excluded', 'highlighted',
+]
+
+INT_COLUMNS = {'group_id': 'int32', 'group_size': 'int16', 'slot': 'int16'}
+
+FLAG_COLUMNS = ['lgbtq', 'same_gender', 'has_buddies', 'bulking', 'solo', 'excluded', 'highlighted']
+
+GROUP_TYPES = ['requested', 'team', 'solo', 'regular', 'excluded']
+
+# Columns of diff_assignment_tables()
+CHANGE_COLUMNS = ['change', 'user_id', 'name', 'previous_group', 'new_group']
+
+# File extension -> table format
+TABLE_FORMATS = {
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+    '.csv': 'csv',
+}
+
+
+def _text(value):
+    """Cell value as text ('' for None / NaN)."""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ''
+    return str(value)
+
+
+def assignment_table(export_groups):
+    """
+    One row per assigned member, in sheet order.
+
+    Unlike the Excel sheet, groups with more than 7 members list every member.
+
+    Args:
+        export_groups: ExportGroup rows from build_export_groups()
+
+    Returns:
+        pd.DataFrame: Columns ASSIGNMENT_COLUMNS (categorical group_type, bool flags)
+    """
+    columns = {name: [] for name in ASSIGNMENT_COLUMNS}
+    for group in export_groups:
+        for slot, (user_id, name, location, coach) in enumerate(group.slots, 1):
+            flags = group.member_flags(slot - 1)
+            columns['group_id'].append(group.group_id)
+            columns['group_type'].append(group.group_type)
+            columns['group_name'].append(group.name)
+            columns['group_size'].append(len(group.members))
+            columns['slot'].append(slot)
+            columns['user_id'].append(_text(user_id))
+            columns['name'].append(_text(name))
+            columns['location'].append(_text(location))
+            columns['coach'].append(_text(coach))
+            columns['sex'].append(_text(flags['sex']))
+            for flag in FLAG_COLUMNS[:-1]:
+                columns[flag].append(flags[flag])
+            columns['highlighted'].append(bool(group.highlight))
+
+    table = pd.DataFrame(columns, columns=ASSIGNMENT_COLUMNS)
+    table = table.astype(INT_COLUMNS)
+    table['group_type'] = pd.Categorical(table['group_type'], categories=GROUP_TYPES)
+    table[FLAG_COLUMNS] = table[FLAG_COLUMNS].astype(bool)
+    return table
+
+
+def table_format(path, fmt=None):
+    """
+    Resolve the table format for a path.
+
+    Raises:
+        ValueError: If the format is not given and the extension is unknown
+    """
+    if fmt is None:
+        fmt = TABLE_FORMATS.get(os.path.splitext(str(path))[1].lower())
+    if fmt not in set(TABLE_FORMATS.values()):
+        raise ValueError(f"Unknown table format for '{path}'. Use one of: {', '.join(sorted(TABLE_FORMATS))}")
+    return fmt
+
+
+def _require_pyarrow(fmt):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError(f"{fmt} export needs pyarrow (pip install -r requirements-extras.txt)") from e
+
+
+def write_assignment_table(table, path, fmt=None):
+    """
+    Write an assignment table.
+
+    Args:
+        table: DataFrame from assignment_table()
+        path: Output file path or binary buffer (buffers need fmt)
+        fmt: 'parquet', 'arrow' or 'csv' (default: from the file extension)
+    """
+    fmt = table_format(path, fmt)
+    if fmt == 'csv':
+        table.to_csv(path, index=False)
+    elif fmt == 'parquet':
+        _require_pyarrow(fmt)
+        table.to_parquet(path, index=False)
+    else:
+        _require_pyarrow(fmt)
+        table.reset_index(drop=True).to_feather(path)
+
+
+def read_assignment_table(path, fmt=None):
+    """Load a table written by write_assignment_table (CSV dtypes restored)."""
+    fmt = table_format(path, fmt)
+    if fmt == 'parquet':
+        return pd.read_parquet(path)
+    if fmt == 'arrow':
+        return pd.read_feather(path)
+    table = pd.read_csv(path, keep_default_na=False,
+                        dtype={'user_id': str, 'name': str, 'location': str, 'coach': str, 'sex': str, **INT_COLUMNS})
+    table['group_type'] = pd.Categorical(table['group_type'], categories=GROUP_TYPES)
+    return table
+
+
+def tables_equal(previous, current):
+    """True if two assignment tables hold the same rows (dtypes ignored)."""
+    if len(previous) != len(current):
+        return False
+    def as_text(table):
+        return table[ASSIGNMENT_COLUMNS].astype(str).reset_index(drop=True)
+    return as_text(previous).equals(as_text(current))
+
+
+def _member_groups(table):
+    """user_id, name, group_name and the group's sorted member ids, one row per identified member."""
+    members = table.loc[table['user_id'] != '', ['group_id', 'user_id', 'name', 'group_name']]
+    group_members = members.sort_values('user_id').groupby('group_id')['user_id'].agg('|'.join)
+    members = members.assign(group_members=members['group_id'].map(group_members))
+    return members.drop_duplicates('user_id').drop(columns='group_id')
+
+
+def diff_assignment_tables(previous, current):
+    """
+    Per-member changes between two assignment tables.
+
+    Members are matched by user_id and their groups by member ids, so a group
+    that was only renumbered or renamed does not count as a change. Rows
+    without a user_id cannot be matched and are ignored.
+
+    Args:
+        previous: Assignment table of the earlier run
+        current: Assignment table of this run
+
+    Returns:
+        pd.DataFrame: Columns CHANGE_COLUMNS; change is 'Added', 'Moved' or
+            'Removed'. Added / moved members follow the current sheet order,
+            removed members come last.
+    """
+    before = _member_groups(previous)
+    after = _member_groups(current)
+
+    merged = after.merge(before, on='user_id', how='left', suffixes=('', '_previous'))
+    added = merged['group_members_previous'].isna()
+    moved = ~added & (merged['group_members'] != merged['group_members_previous'])
+    changed = merged[added | moved]
+    removed = before[~before['user_id'].isin(after['user_id'])]
+
+    changes = pd.concat([
+        pd.DataFrame({
+            'change': added[added | moved].map({True: 'Added', False: 'Moved'}),
+            'user_id': changed['user_id'],
+            'name': changed['name'],
+            'previous_group': changed['group_name_previous'].fillna(''),
+            'new_group': changed['group_name'],
+        }),
+        pd.DataFrame({
+            'change': 'Removed',
+            'user_id': removed['user_id'],
+            'name': removed['name'],
+            'previous_group': removed['group_name'],
+            'new_group': '',
+        }),
+    ], ignore_index=True)
+    return changes[CHANGE_COLUMNS]
@@ -0,0 +1,832 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the Kaizen grouping pipeline.
+
+Runs micro-benchmarks on synthetic data so that changes to the grouping
+helpers can be compared against the previous implementations.
+
+Usage:
+    python benchmark_grouping.py                  # run all benchmarks
+    python benchmark_grouping.py buddy_components # run one benchmark
+"""
+
+import argparse
+import ast
+import contextlib
+import io
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles import Font, PatternFill
+
+import assignment_tables
+import input_cache
+import input_stream
+from buddy_graph import BuddyGraph
+import city_coordinates
+import group_assignment_to_excel as grouping
+
+
+def _timed(fn, *args, **kwargs):
+    """Run fn once and return (result, elapsed_seconds)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+# ============================================================================
+# BUDDY GRAPH CONNECTED COMPONENTS
+# ============================================================================
+
+def make_buddy_requests(n_users, seed=42):
+    """
+    Build synthetic buddy requests: mostly small clusters, plus long chains
+    (each user naming the next) which stress recursive traversal.
+
+    Returns:
+        list: [(email, [requested_emails])] in participant order
+    """
+    rng = random.Random(seed)
+    emails = [f"user{i}@example.com" for i in range(n_users)]
+    requests = []
+    for i, email in enumerate(emails):
+        if i % 10 == 0 and i + 1 < n_users:
+            # Chain link: ~10% of users form one long chain across the cohort
+            requested = [emails[min(i + 10, n_users - 1)]]
+        else:
+            cluster_start = i - (i % 5)
+            requested = [emails[j] for j in range(cluster_start, min(cluster_start + 5, n_users))
+                         if j != i and rng.random() < 0.5]
+        if rng.random() < 0.05:
+            requested.append(f"missing{i}@example.com")
+        requests.append((email, requested))
+    return requests
+
+
+def legacy_connected_components(requests, known_emails):
+    """Previous algorithm: recursive DFS that scans every node for reverse edges."""
+    buddy_graph = {}
+    for email, requested in requests:
+        buddy_graph.setdefault(email, set()).update(e for e in requested if e in known_emails)
+
+    def find_connected_component(start_email, visited):
+        if start_email in visited:
+            return set()
+        visited.add(start_email)
+        component = {start_email}
+        for buddy_email in buddy_graph.get(start_email, ()):
+            if buddy_email in known_emails:
+                component.update(find_connected_component(buddy_email, visited))
+        for other_email, buddies in buddy_graph.items():
+            if start_email in buddies and other_email not in visited:
+                component.update(find_connected_component(other_email, visited))
+        return component
+
+    visited = set()
+    components = []
+    for email, _ in requests:
+        if email not in visited:
+            components.append(find_connected_component(email, visited))
+    return components
+
+
+def union_find_connected_components(requests, known_emails):
+    """Current algorithm: BuddyGraph + union-find."""
+    graph = BuddyGraph(known_emails=known_emails)
+    for email, requested in requests:
+        graph.add_request(email, requested)
+    for email, _ in requests:
+        graph.add_participant(email)
+    return graph.connected_components()
+
+
+def bench_buddy_components(sizes=(1000, 5000, 10000, 100000), legacy_limit=5000):
+    """Compare legacy DFS vs union-find connected components on synthetic graphs."""
+    print("\n🔗 BUDDY GRAPH CONNECTED COMPONENTS")
+    print(f"{'users':>8} {'components':>11} {'union-find (s)':>15} {'legacy DFS (s)':>15}")
+    for n_users in sizes:
+        requests = make_buddy_requests(n_users)
+        known_emails = {email for email, _ in requests}
+        components, uf_time = _timed(union_find_connected_components, requests, known_emails)
+
+        legacy_time = None
+        if n_users <= legacy_limit:
+            old_limit = sys.getrecursionlimit()
+            sys.setrecursionlimit(max(old_limit, n_users * 4))
+            try:
+                legacy, legacy_time = _timed(legacy_connected_components, requests, known_emails)
+            finally:
+                sys.setrecursionlimit(old_limit)
+            assert sorted(map(sorted, legacy)) == sorted(map(sorted, components)), "component mismatch"
+
+        legacy_str = f"{legacy_time:15.3f}" if legacy_time is not None else f"{'skipped':>15}"
+        print(f"{n_users:>8} {len(components):>11} {uf_time:15.3f} {legacy_str}")
+
+
+# ============================================================================
+# ACCOUNTABILITY BUDDIES PARSER
+# ============================================================================
+
+def make_buddy_fields(n_fields, n_distinct=None, seed=42):
+    """
+    Build accountability_buddies values covering every documented format.
+
+    Args:
+        n_fields: Number of field values to generate
+        n_distinct: Number of distinct raw values (defaults to n_fields);
+                    repeats model the same field being parsed by several passes
+
+    Returns:
+        list: Field values (dicts, lists and strings)
+    """
+    rng = random.Random(seed)
+    n_distinct = n_distinct or n_fields
+
+    def field(i):
+        emails = [f"buddy{i}_{k}@example.com" for k in range(rng.randint(1, 4))]
+        kind = i % 6
+        if kind == 0:
+            return {str(k + 1): e for k, e in enumerate(emails)}
+        if kind == 1:
+            return [f"Buddy {k} ({e})" for k, e in enumerate(emails)]
+        if kind == 2:
+            return str([f"Buddy {k} ({e})" for k, e in enumerate(emails)])
+        if kind == 3:
+            return str(emails)
+        if kind == 4:
+            return str({str(k + 1): e for k, e in enumerate(emails)})
+        return ', '.join(emails)
+
+    distinct = [field(i) for i in range(n_distinct)]
+    return [distinct[i % n_distinct] for i in range(n_fields)]
+
+
+def legacy_extract_emails(accountability_buddies, email_mapping):
+    """Previous parser: literal_eval on every string and a regex compiled per item."""
+    if not accountability_buddies:
+        return []
+    if isinstance(accountability_buddies, str):
+        try:
+            parsed_dict = ast.literal_eval(accountability_buddies)
+            if isinstance(parsed_dict, dict):
+                return [grouping.normalize_email(str(v).strip(), email_mapping)
+                        for v in parsed_dict.values() if v and '@' in str(v)]
+        except (ValueError, SyntaxError):
+            pass
+        items = accountability_buddies.strip('[]').replace('"', '').replace("'", '').split(',')
+    elif isinstance(accountability_buddies, dict):
+        return [grouping.normalize_email(str(v).strip(), email_mapping)
+                for v in accountability_buddies.values() if v and '@' in str(v)]
+    elif isinstance(accountability_buddies, list):
+        items = [str(item) for item in accountability_buddies if item]
+    else:
+        return []
+    emails = []
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        email_match = re.search(r'\(([^)]+@[^)]+)\)', item)
+        if email_match:
+            email = email_match.group(1).strip()
+            if email and '@' in email:
+                emails.append(grouping.normalize_email(email, email_mapping))
+        elif '@' in item:
+            emails.append(grouping.normalize_email(item, email_mapping))
+    return emails
+
+
+def bench_buddy_parser(n_fields=5000, repeats=4):
+    """Compare the legacy accountability_buddies parser with the cached, precompiled one."""
+    print("\n📧 ACCOUNTABILITY BUDDIES PARSER")
+    email_mapping = {}
+    # Each field is parsed `repeats` times, as in the grouping + export passes
+    fields = make_buddy_fields(n_fields * repeats, n_distinct=n_fields)
+
+    legacy, legacy_time = _timed(lambda: [legacy_extract_emails(f, email_mapping) for f in fields])
+
+    grouping._parse_buddy_string.cache_clear()
+    grouping._parse_buddy_item.cache_clear()
+    cold, cold_time = _timed(lambda: [grouping.extract_emails_from_accountability_buddies(f, email_mapping)
+                                      for f in fields[:n_fields]])
+    current, warm_time = _timed(lambda: [grouping.extract_emails_from_accountability_buddies(f, email_mapping)
+                                         for f in fields])
+    assert legacy[:n_fields] == cold and legacy == current, "parser mismatch"
+
+    print(f"{'fields':>8} {'legacy (s)':>11} {'cold (s)':>9} {'cached (s)':>11}")
+    print(f"{len(fields):>8} {legacy_time:11.3f} {cold_time:9.3f} {warm_time:11.3f}")
+    print(f"  cold = first parse of {n_fields} distinct fields; "
+          f"cached = all {len(fields)} fields after warm-up")
+
+
+# ============================================================================
+# PROXIMITY SORT (NORTH AMERICA)
+# ============================================================================
+
+def make_na_members(n_members, seed=42):
+    """Synthetic US/Canada members spread over the cities in CITY_COORDS."""
+    rng = random.Random(seed)
+    cities = list(city_coordinates.CITY_COORDS)
+    members = []
+    for i in range(n_members):
+        city, state = rng.choice(cities)
+        members.append({'id': i, 'city': city.title(), 'state': state.title()})
+    # A few members outside the lookup table (appended after the tour)
+    for i in range(n_members // 50):
+        members.append({'id': n_members + i, 'city': 'Nowhere', 'state': 'Unknown'})
+    return members
+
+
+def legacy_proximity_sort(members, get_city_fn, get_state_fn):
+    """Previous algorithm: greedy tour with a full haversine scan per step (O(n^2))."""
+    located = []
+    unlocated = []
+    for m in members:
+        coords = city_coordinates.get_city_coords(get_city_fn(m), get_state_fn(m))
+        if coords:
+            located.append([m, coords[0], coords[1]])
+        else:
+            unlocated.append(m)
+    if not located:
+        return unlocated
+
+    ordered = []
+    remaining = sorted(located, key=lambda x: -x[1])
+    current = remaining.pop(0)
+    ordered.append(current[0])
+    while remaining:
+        cur_lat, cur_lng = current[1], current[2]
+        nearest_idx = min(
+            range(len(remaining)),
+            key=lambda i: city_coordinates.haversine_miles(cur_lat, cur_lng, remaining[i][1], remaining[i][2])
+        )
+        current = remaining.pop(nearest_idx)
+        ordered.append(current[0])
+    return ordered + unlocated
+
+
+def bench_proximity_sort(sizes=(1000, 10000), legacy_limit=10000):
+    """Compare the O(n^2) greedy tour with the k-d tree tour on synthetic NA members."""
+    print("\n🗺️  PROXIMITY SORT (US/CANADA)")
+    print(f"{'members':>8} {'k-d tree (s)':>13} {'legacy scan (s)':>16}")
+    get_city = lambda m: m['city']
+    get_state = lambda m: m['state']
+    for n_members in sizes:
+        members = make_na_members(n_members)
+        ordered, tree_time = _timed(city_coordinates.proximity_sort, members, get_city, get_state)
+
+        legacy_time = None
+        if n_members <= legacy_limit:
+            legacy, legacy_time = _timed(legacy_proximity_sort, members, get_city, get_state)
+            assert [m['id'] for m in legacy] == [m['id'] for m in ordered], "tour mismatch"
+
+        legacy_str = f"{legacy_time:16.3f}" if legacy_time is not None else f"{'skipped':>16}"
+        print(f"{len(members):>8} {tree_time:13.3f} {legacy_str}")
+
+
+# ============================================================================
+# HAVERSINE DISTANCE MATRIX
+# ============================================================================
+
+def bench_haversine_matrix(sizes=(100, 500, 2000)):
+    """Compare pairwise distances from scalar haversine_miles calls vs haversine_matrix."""
+    print("\n📏 HAVERSINE DISTANCE MATRIX")
+    print(f"{'points':>8} {'pairs':>10} {'numpy (s)':>10} {'scalar loop (s)':>16}")
+    cities = list(city_coordinates.CITY_COORDS.values())
+    rng = random.Random(42)
+    for n_points in sizes:
+        points = [rng.choice(cities) for _ in range(n_points)]
+        lats = [lat for lat, _ in points]
+        lngs = [lng for _, lng in points]
+        matrix, numpy_time = _timed(city_coordinates.haversine_matrix, lats, lngs)
+        scalar, scalar_time = _timed(lambda: [[city_coordinates.haversine_miles(a[0], a[1], b[0], b[1])
+                                               for b in points] for a in points])
+        max_error = max(abs(matrix[i][j] - scalar[i][j]) for i in range(n_points) for j in range(n_points))
+        assert max_error < 1e-6, f"distance mismatch ({max_error})"
+        print(f"{n_points:>8} {n_points * n_points:>10} {numpy_time:10.3f} {scalar_time:16.3f}")
+
+
+# ============================================================================
+# PHASE 3 BUCKET GROUPING (PROCESS POOL)
+# ============================================================================
+
+SYNTHETIC_COLUMN_MAPPING = {
+    'user_id': 'id', 'email': 'email', 'sex': 'sex', 'residing_ph': 'residingInPhilippines',
+    'gender_preference': 'groupGenderPreference', 'country': 'country', 'province': 'province',
+    'city': 'city', 'internationalState': 'internationalState', 'internationalCity': 'internationalCity',
+    'current_goal': 'currentGoal', 'age_group': 'ageGroup',
+}
+
+
+def make_participants(n_users, seed=42):
+    """Synthetic Participant records: ~60% Philippines, ~25% USA/Canada, rest other countries."""
+    rng = random.Random(seed)
+    ph_places = [(province, city) for province in ['Metro Manila', 'Cebu', 'Davao del Sur', 'Laguna', 'Iloilo']
+                 for city in ['City A', 'City B', 'City C', 'City D']]
+    na_places = list(city_coordinates.CITY_COORDS)
+    other_countries = ['Australia', 'Singapore', 'United Kingdom', 'Japan', 'Germany', 'UAE']
+    participants = []
+    for i in range(n_users):
+        row = {
+            'id': str(i), 'email': f"user{i}@example.com", 'sex': rng.choice(['female', 'male']),
+            'groupGenderPreference': 'no_preference', 'currentGoal': rng.choice(['cutting', 'bulking', 'not_sure']),
+            'ageGroup': rng.choice(['21-30', '31-40', '41-50', '50+']),
+            'residingInPhilippines': 'false', 'country': '', 'province': '', 'city': '',
+            'internationalState': '', 'internationalCity': '',
+        }
+        roll = rng.random()
+        if roll < 0.6:
+            row['residingInPhilippines'] = 'true'
+            row['country'] = 'Philippines'
+            row['province'], row['city'] = rng.choice(ph_places)
+        elif roll < 0.85:
+            city, state = rng.choice(na_places)
+            row['country'] = 'United States'
+            row['internationalCity'], row['internationalState'] = city.title(), state.title()
+        else:
+            row['country'] = rng.choice(other_countries)
+            row['internationalState'] = rng.choice(['', 'North', 'South'])
+        participants.append(grouping.Participant(row, SYNTHETIC_COLUMN_MAPPING, {}))
+    return participants
+
+
+def bench_bucket_pool(sizes=(10000, 50000), workers=None):
+    """Compare Phase 3 bucket grouping in one process vs a process pool (same output)."""
+    workers = workers or os.cpu_count() or 1
+    print(f"\n🧵 PHASE 3 BUCKET GROUPING ({workers} workers available)")
+    print(f"{'users':>8} {'tasks':>6} {'groups':>7} {'1 process (s)':>14} {'pool (s)':>9}")
+    for n_users in sizes:
+        participants = make_participants(n_users)
+        tasks = grouping.plan_bucket_tasks('no_preference', participants, True)
+        serial, serial_time = _timed(grouping.run_bucket_tasks, tasks, None)
+        pooled, pool_time = _timed(grouping.run_bucket_tasks, tasks, max(workers, 2))
+        assert [(name, info, [id(m) for m in group]) for _, name, info, group in serial] == \
+               [(name, info, [id(m) for m in group]) for _, name, info, group in pooled], "pool result mismatch"
+        print(f"{n_users:>8} {len(tasks):>6} {len(serial):>7} {serial_time:14.3f} {pool_time:9.3f}")
+
+
+# ============================================================================
+# EXCEL EXPORT (STYLE CACHE)
+# ============================================================================
+
+class PerCellStyles:
+    """Previous behaviour: a new PatternFill / Font object for every styled cell."""
+
+    def fill(self, color):
+        return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+    def font(self, color=None, bold=False, underline=False):
+        return Font(color=color, bold=bold, underline='single' if underline else None)
+
+
+def make_grouped(n_users):
+    """Regular groups for n_users synthetic participants, named like group_participants does."""
+    tasks = grouping.plan_bucket_tasks('no_preference', make_participants(n_users), True)
+    grouped = grouping.GroupedMembers()
+    for i, (gender_key, location_info, info, members) in enumerate(grouping.run_bucket_tasks(tasks), 1):
+        grouped.add(f"Group {i} ({gender_key}, {location_info})", members, info)
+    return grouped
+
+
+def _export(grouped, path, write_only=False):
+    grouping.save_to_excel([], grouped, path, SYNTHETIC_COLUMN_MAPPING, [], [], {}, write_only=write_only)
+    return os.path.getsize(path)
+
+
+def bench_excel_styles(n_users=10000):
+    """save_to_excel time and file size with per-cell style objects vs the shared style registry."""
+    print("\n🎨 EXCEL EXPORT STYLES")
+    grouped = make_grouped(n_users)
+    shared_styles = grouping.CELL_STYLES
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            grouping.CELL_STYLES = PerCellStyles()
+            legacy_size, legacy_time = _timed(_export, grouped, os.path.join(tmp, 'legacy.xlsx'))
+        finally:
+            grouping.CELL_STYLES = shared_styles
+        shared_size, shared_time = _timed(_export, grouped, os.path.join(tmp, 'shared.xlsx'))
+    print(f"{'users':>8} {'mode':>10} {'time (s)':>9} {'size (KB)':>10}")
+    print(f"{n_users:>8} {'per-cell':>10} {legacy_time:9.3f} {legacy_size / 1024:10.1f}")
+    print(f"{n_users:>8} {'shared':>10} {shared_time:9.3f} {shared_size / 1024:10.1f}")
+
+
+def _traced_export(grouped, path, write_only):
+    """Export while tracing allocations; returns peak traced memory in bytes."""
+    tracemalloc.start()
+    try:
+        _export(grouped, path, write_only)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_streaming_export(sizes=(10000, 50000)):
+    """save_to_excel with an in-memory workbook vs the write-only (streaming) workbook."""
+    print("\n📤 EXCEL EXPORT MODE")
+    print(f"{'users':>8} {'mode':>10} {'time (s)':>9} {'peak (MB)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_users in sizes:
+            grouped = make_grouped(n_users)
+            for label, write_only in (('in-memory', False), ('streaming', True)):
+                path = os.path.join(tmp, f'{label}.xlsx')
+                _, elapsed = _timed(_export, grouped, path, write_only)
+                peak = _traced_export(grouped, path, write_only)
+                print(f"{n_users:>8} {label:>10} {elapsed:9.3f} {peak / 2**20:10.1f}")
+
+
+def _read_sheet_user_ids(path):
+    """Previous analytics path: walk the Grouped Members sheet with openpyxl."""
+    ws = load_workbook(path, read_only=True)['Grouped Members']
+    return [row[col] for row in ws.iter_rows(min_row=2, values_only=True)
+            for col in range(1, 29, 4) if row[col] not in (None, '')]
+
+
+def bench_assignment_tables(n_users=10000):
+    """Load assignment results from the Excel sheet vs the long-format table files."""
+    print("\n📄 ASSIGNMENT TABLE LOAD")
+    export_groups = grouping.build_export_groups([], make_grouped(n_users), SYNTHETIC_COLUMN_MAPPING)
+    table = assignment_tables.assignment_table(export_groups)
+    print(f"{'users':>8} {'source':>8} {'size (KB)':>10} {'load (s)':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsx = os.path.join(tmp, 'groups.xlsx')
+        grouping.save_to_excel(None, None, xlsx, SYNTHETIC_COLUMN_MAPPING, export_groups=export_groups)
+        user_ids, elapsed = _timed(_read_sheet_user_ids, xlsx)
+        assert len(user_ids) == len(table)
+        print(f"{n_users:>8} {'xlsx':>8} {os.path.getsize(xlsx) / 1024:10.1f} {elapsed:9.3f}")
+        for ext in ('.csv', '.parquet', '.arrow'):
+            path = os.path.join(tmp, 'groups' + ext)
+            try:
+                assignment_tables.write_assignment_table(table, path)
+            except ImportError as e:
+                print(f"{n_users:>8} {ext[1:]:>8} skipped: {e}")
+                continue
+            loaded, elapsed = _timed(assignment_tables.read_assignment_table, path)
+            assert len(loaded) == len(table)
+            print(f"{n_users:>8} {ext[1:]:>8} {os.path.getsize(path) / 1024:10.1f} {elapsed:9.3f}")
+
+
+def _naive_region_exports(export_groups, path):
+    """Master + one save_to_excel call per region, each formatting its rows again."""
+    grouping.save_to_excel(None, None, path, SYNTHETIC_COLUMN_MAPPING, export_groups=export_groups)
+    regions = {}
+    for group in export_groups:
+        regions.setdefault(grouping.export_region(group, SYNTHETIC_COLUMN_MAPPING), []).append(group)
+    for region, groups in regions.items():
+        grouping.save_to_excel(None, None, grouping.region_workbook_path(path, region),
+                               SYNTHETIC_COLUMN_MAPPING, export_groups=groups)
+    return len(regions)
+
+
+def bench_region_workbooks(n_users=10000, workers=None):
+    """Master + per-region workbooks: per-region save_to_excel vs shared rows (serial / pool)."""
+    workers = workers or os.cpu_count() or 1
+    print(f"\n🗺️  REGIONAL WORKBOOKS ({workers} workers available)")
+    export_groups = grouping.build_export_groups([], make_grouped(n_users), SYNTHETIC_COLUMN_MAPPING)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'groups.xlsx')
+        n_regions, naive_time = _timed(_naive_region_exports, export_groups, path)
+        _, shared_time = _timed(grouping.save_region_workbooks, export_groups, SYNTHETIC_COLUMN_MAPPING, path)
+        _, pool_time = _timed(grouping.save_region_workbooks, export_groups, SYNTHETIC_COLUMN_MAPPING, path,
+                              workers=max(workers, 2))
+    print(f"{'users':>8} {'regions':>8} {'per-region (s)':>15} {'shared (s)':>11} {'pool (s)':>9}")
+    print(f"{n_users:>8} {n_regions:>8} {naive_time:15.3f} {shared_time:11.3f} {pool_time:9.3f}")
+
+
+# ============================================================================
+# USER LIST EXPORT
+# ============================================================================
+
+def bench_user_list(sizes=(10000, 50000)):
+    """User list workbook from Participant records: regular vs write-only workbook."""
+    print("\n📋 USER LIST EXPORT")
+    print(f"{'users':>8} {'regular (s)':>12} {'write-only (s)':>15}")
+    for n_users in sizes:
+        participants = make_participants(n_users)
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            path = os.path.join(tmp, 'user_list.xlsx')
+            _, regular_time = _timed(grouping.save_user_list_to_excel, participants, path, SYNTHETIC_COLUMN_MAPPING)
+            _, stream_time = _timed(grouping.save_user_list_to_excel, participants, path, SYNTHETIC_COLUMN_MAPPING,
+                                    write_only=True)
+        print(f"{n_users:>8} {regular_time:12.3f} {stream_time:15.3f}")
+
+
+# ============================================================================
+# INPUT SNAPSHOT CACHE
+# ============================================================================
+
+def bench_input_cache(sizes=(1000, 10000)):
+    """Merged Data sheet: pd.read_excel vs first load (parse + snapshot) vs snapshot load."""
+    print(f"\n💽 INPUT SNAPSHOT CACHE ({input_cache.default_snapshot_format()})")
+    print(f"{'rows':>8} {'read_excel (s)':>15} {'first load (s)':>15} {'snapshot (s)':>13}")
+    for n_rows in sizes:
+        df = pd.DataFrame([p.row for p in make_participants(n_rows)])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'merged.xlsx')
+            df.to_excel(path, sheet_name='Merged Data', index=False)
+            cache_dir = os.path.join(tmp, 'cache')
+            parsed, excel_time = _timed(pd.read_excel, path, sheet_name='Merged Data')
+            (_, _, hit), first_time = _timed(input_cache.load_merged_data, path, cache_dir=cache_dir)
+            assert not hit
+            (cached, _, hit), snapshot_time = _timed(input_cache.load_merged_data, path, cache_dir=cache_dir)
+            assert hit
+            pd.testing.assert_frame_equal(parsed, cached)
+        print(f"{n_rows:>8} {excel_time:15.3f} {first_time:15.3f} {snapshot_time:13.3f}")
+
+
+def _traced(fn, *args):
+    """Run fn while tracing allocations; returns (result, elapsed_seconds, peak traced bytes)."""
+    tracemalloc.start()
+    try:
+        result, elapsed = _timed(fn, *args)
+        return result, elapsed, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _frame_participants(path):
+    """Default path: parse the whole file, then build records from every row."""
+    df = pd.read_csv(path) if path.endswith('.csv') else pd.read_excel(path, sheet_name='Merged Data')
+    return grouping.build_participants(df.to_dict('records'), SYNTHETIC_COLUMN_MAPPING, {})
+
+
+def _streamed_participants(path):
+    return input_stream.stream_records(
+        path, lambda df: SYNTHETIC_COLUMN_MAPPING,
+        lambda rows, column_mapping: grouping.build_participants(rows, column_mapping, {}))[1]
+
+
+def bench_streaming_input(sizes=(5000, 20000), extra_columns=30):
+    """Participant records from CSV / xlsx: whole-frame read vs chunked streaming (time and peak memory)."""
+    print("\n🚰 STREAMING INPUT")
+    print(f"{'rows':>8} {'file':>5} {'mode':>9} {'time (s)':>9} {'peak (MB)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in sizes:
+            df = pd.DataFrame([p.row for p in make_participants(n_rows)])
+            # Unused survey columns, as in the real merged export
+            for i in range(extra_columns):
+                df[f'extra_{i}'] = [f'answer {i} for row {j}' for j in range(n_rows)]
+            for ext in ('csv', 'xlsx'):
+                path = os.path.join(tmp, f'merged.{ext}')
+                if ext == 'csv':
+                    df.to_csv(path, index=False)
+                else:
+                    df.to_excel(path, sheet_name='Merged Data', index=False)
+                results = {}
+                for label, load in (('frame', _frame_participants), ('streaming', _streamed_participants)):
+                    participants, elapsed, peak = _traced(load, path)
+                    results[label] = [(p.user_id, p.location_key, p.location_display) for p in participants]
+                    print(f"{n_rows:>8} {ext:>5} {label:>9} {elapsed:9.3f} {peak / 2**20:10.1f}")
+                assert results['frame'] == results['streaming']
+
+
+# The PH sort expects every sort column to be mapped
+INPUT_FRAME_COLUMN_MAPPING = {**SYNTHETIC_COLUMN_MAPPING, 'gender_identity': 'genderIdentity'}
+
+
+def make_input_frame(n_rows):
+    """Synthetic merged input as read from a file (fresh string objects per cell)."""
+    df = pd.DataFrame([p.row for p in make_participants(n_rows)])
+    df['genderIdentity'] = ['lgbtq+' if i % 20 == 0 else 'cisgender' for i in range(n_rows)]
+    return df.map(lambda value: ''.join(value) if isinstance(value, str) else value)
+
+
+def bench_categorical_input(sizes=(10000, 50000)):
+    """Input frame as text vs categorical columns: memory of the encoded columns and input_sort_order time."""
+    print("\n🏷️  CATEGORICAL INPUT")
+    print(f"{'rows':>8} {'columns':>12} {'memory (MB)':>12} {'order (s)':>10}")
+    for n_rows in sizes:
+        df = make_input_frame(n_rows)
+        encoded = grouping.encode_categories(df, INPUT_FRAME_COLUMN_MAPPING)
+        columns = [column for column in encoded.columns if isinstance(encoded[column].dtype, pd.CategoricalDtype)]
+        results = {}
+        for label, frame in (('text', df), ('categorical', encoded)):
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[label], elapsed = _timed(grouping.input_sort_order, frame, INPUT_FRAME_COLUMN_MAPPING)
+            memory = frame[columns].memory_usage(deep=True).sum()
+            print(f"{n_rows:>8} {label:>12} {memory / 2**20:12.1f} {elapsed:10.3f}")
+        assert (results['text'] == results['categorical']).all()
+
+
+# ============================================================================
+# INPUT ORDER
+# ============================================================================
+
+def legacy_sort_input_frame(df, column_mapping):
+    """Previous pre-sort in main(): split PH / non-PH, count transforms, sort_values, concat."""
+    # --- SORTING STEP: Separate Philippines and non-Philippines residents, sort each group appropriately ---
+    ph_column = column_mapping.get('residing_ph')
+    if ph_column and ph_column in df.columns:
+        # Filter Philippines residents
+        ph_residents = df[df[ph_column].astype(str).str.lower().isin(['1', '1.0', 'true', 'yes', 'ph', 'philippines'])].copy()
+        # Filter non-Philippines residents
+        non_ph_residents = df[~df[ph_column].astype(str).str.lower().isin(['1', '1.0', 'true', 'yes', 'ph', 'philippines'])].copy()
+        
+        # Sort Philippines residents by province frequency (largest first), then city frequency within province (largest first), then other columns
+        if not ph_residents.empty:
+            # Sort provinces by frequency descending
+            province_counts = ph_residents['province'].value_counts()
+            province_order = province_counts.index
+            ph_residents['province'] = ph_residents['province'].astype('category').cat.set_categories(province_order)
+            
+            # Add city count within province
+            ph_residents['city_count'] = ph_residents.groupby(['province', 'city'])['city'].transform('count')
+            
+            ph_sort_columns = []
+            for col_key in ['province', 'city_count', 'city', 'gender_preference', 'gender_identity', 'user_id']:
+                if col_key == 'city_count':
+                    ph_sort_columns.append('city_count')
+                else:
+                    col_name = column_mapping.get(col_key)
+                    if col_name and col_name in ph_residents.columns:
+                        ph_sort_columns.append(col_name)
+            ph_residents = ph_residents.sort_values(by=ph_sort_columns, ascending=[True, False, True, True, True, True])
+            ph_residents = ph_residents.drop(columns=['city_count'])
+        
+        # Sort non-Philippines residents by country frequency (largest first), then internationalState frequency within country (largest first), then internationalCity frequency within state (largest first), then other columns
+        if not non_ph_residents.empty:
+            # Sort countries by frequency descending
+            country_counts = non_ph_residents['country'].value_counts()
+            country_order = country_counts.index
+            non_ph_residents['country'] = non_ph_residents['country'].astype('category').cat.set_categories(country_order)
+            
+            # Add internationalState count within country if column exists
+            if 'internationalState' in non_ph_residents.columns:
+                non_ph_residents['state_count'] = non_ph_residents.groupby(['country', 'internationalState'])['internationalState'].transform('count')
+                state_col = 'internationalState'
+            else:
+                # Fallback to state
+                state_col_name = column_mapping.get('state')
+                if state_col_name and state_col_name in non_ph_residents.columns:
+                    non_ph_residents['state_count'] = non_ph_residents.groupby(['country', state_col_name])[state_col_name].transform('count')
+                    state_col = state_col_name
+                else:
+                    state_col = None
+            
+            # Add internationalCity count within country and state if columns exist
+            if 'internationalCity' in non_ph_residents.columns and state_col:
+                non_ph_residents['city_count'] = non_ph_residents.groupby(['country', state_col, 'internationalCity'])['internationalCity'].transform('count')
+                city_col = 'internationalCity'
+            else:
+                city_col_name = column_mapping.get('city')
+                if city_col_name and city_col_name in non_ph_residents.columns and state_col:
+                    non_ph_residents['city_count'] = non_ph_residents.groupby(['country', state_col, city_col_name])[city_col_name].transform('count')
+                    city_col = city_col_name
+                else:
+                    city_col = None
+            
+            non_ph_sort_columns = ['country']
+            if state_col:
+                non_ph_sort_columns.extend(['state_count', state_col])
+            if city_col:
+                non_ph_sort_columns.extend(['city_count', city_col])
+            
+            # Add other columns
+            for col_key in ['gender_preference', 'gender_identity', 'user_id']:
+                col_name = column_mapping.get(col_key)
+                if col_name and col_name in non_ph_residents.columns:
+                    non_ph_sort_columns.append(col_name)
+            
+            ascending_order = [True] * len(non_ph_sort_columns)
+            # Set descending for count columns
+            for i, col in enumerate(non_ph_sort_columns):
+                if col.endswith('_count'):
+                    ascending_order[i] = False
+            
+            non_ph_residents = non_ph_residents.sort_values(by=non_ph_sort_columns, ascending=ascending_order)
+            # Drop temporary count columns
+            count_cols = [col for col in non_ph_sort_columns if col.endswith('_count')]
+            non_ph_residents = non_ph_residents.drop(columns=count_cols, errors='ignore')
+        
+        # Combine sorted dataframes: Philippines first, then non-Philippines
+        # (the index keeps each row's source position, for the user list)
+        df = pd.concat([ph_residents, non_ph_residents])
+        print("\n📊 Data sorted: Philippines residents by province/city, non-Philippines by country/state")
+    else:
+        # Fallback to original sorting if residing_ph column not found
+        sort_columns = []
+        for col_key in ['province', 'city', 'gender_preference', 'gender_identity', 'user_id']:
+            col_name = column_mapping.get(col_key)
+            if col_name and col_name in df.columns:
+                sort_columns.append(col_name)
+        if sort_columns:
+            df = df.sort_values(by=sort_columns)
+            print(f"\n📊 Data sorted by: {sort_columns}")
+    return df
+
+
+def bench_input_order(sizes=(10000, 50000)):
+    """Grouping order of the input: previous sort_values pre-sort vs input_sort_order (same order)."""
+    print("\n🪣 INPUT ORDER")
+    print(f"{'rows':>8} {'pre-sort (s)':>13} {'sort order (s)':>15}")
+    for n_rows in sizes:
+        df = make_input_frame(n_rows)
+        with contextlib.redirect_stdout(io.StringIO()):
+            sorted_df, legacy_time = _timed(legacy_sort_input_frame, df, INPUT_FRAME_COLUMN_MAPPING)
+            order, order_time = _timed(grouping.input_sort_order, df, INPUT_FRAME_COLUMN_MAPPING)
+        assert (sorted_df.index.to_numpy() == df.index.to_numpy()[order]).all()
+        print(f"{n_rows:>8} {legacy_time:13.3f} {order_time:15.3f}")
+
+
+# ============================================================================
+# INCREMENTAL EXPORT
+# ============================================================================
+
+def bench_incremental_export(n_users=10000, moved_pairs=5):
+    """Re-export after a run: full write vs unchanged (skipped) vs a few swapped members."""
+    print("\n🔁 INCREMENTAL EXPORT")
+    grouped = make_grouped(n_users)
+    export_groups = grouping.build_export_groups([], grouped, SYNTHETIC_COLUMN_MAPPING)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'groups.xlsx')
+        _, full_time = _timed(grouping.save_incremental_export, export_groups, path)
+        (_, written), same_time = _timed(grouping.save_incremental_export, export_groups, path)
+        assert not written
+
+        # Swap the first member of a few group pairs, as a hand edit would
+        names = list(grouped)
+        for i in range(moved_pairs):
+            a, b = grouped[names[2 * i]], grouped[names[2 * i + 1]]
+            a[0], b[0] = b[0], a[0]
+        export_groups = grouping.build_export_groups([], grouped, SYNTHETIC_COLUMN_MAPPING)
+        (changes, written), changed_time = _timed(grouping.save_incremental_export, export_groups, path)
+        assert written and set(changes['change']) == {'Moved'}
+    print(f"{'users':>8} {'full (s)':>9} {'unchanged (s)':>14} {'changed (s)':>12} {'moved':>6}")
+    print(f"{n_users:>8} {full_time:9.3f} {same_time:14.3f} {changed_time:12.3f} {len(changes):>6}")
+
+
+# ============================================================================
+# COMBINED-GROUP LOOKUP
+# ============================================================================
+
+def legacy_combined_lookup(group, combined_group_info, column_mapping):
+    """Previous behaviour: rebuild and compare email sets for every combined group."""
+    current = {m[column_mapping['email']].lower().strip() for m in group}
+    for group_info in combined_group_info.values():
+        if current == {m[column_mapping['email']].lower().strip() for m in group_info['members']}:
+            return group_info['is_combined'], group_info['combined_info']
+    return False, ""
+
+
+def bench_combined_lookup(sizes=(500, 2000)):
+    """Resolve combined status for every requested group: linear scan vs frozenset index."""
+    print("\n🔗 COMBINED-GROUP LOOKUP")
+    print(f"{'groups':>8} {'scan (s)':>9} {'index (s)':>10}")
+    column_mapping = {'email': 'email'}
+    for n_groups in sizes:
+        groups = [[{'email': f"user{g}_{i}@example.com"} for i in range(4)] for g in range(n_groups)]
+        combined = {f"combined_{g}": {'members': list(reversed(group)), 'is_combined': True,
+                                      'combined_info': f"Combined {g}"}
+                    for g, group in enumerate(groups) if g % 2 == 0}
+        legacy, scan_time = _timed(lambda: [legacy_combined_lookup(g, combined, column_mapping) for g in groups])
+
+        def indexed():
+            index = grouping.index_combined_groups(combined, column_mapping)
+            return [index.get(grouping.group_email_key(g, column_mapping), (False, "")) for g in groups]
+        result, index_time = _timed(indexed)
+        assert result == legacy
+        print(f"{n_groups:>8} {scan_time:9.3f} {index_time:10.3f}")
+
+
+BENCHMARKS = {
+    'buddy_components': bench_buddy_components,
+    'buddy_parser': bench_buddy_parser,
+    'proximity_sort': bench_proximity_sort,
+    'haversine_matrix': bench_haversine_matrix,
+    'bucket_pool': bench_bucket_pool,
+    'excel_styles': bench_excel_styles,
+    'streaming_export': bench_streaming_export,
+    'assignment_tables': bench_assignment_tables,
+    'combined_lookup': bench_combined_lookup,
+    'region_workbooks': bench_region_workbooks,
+    'user_list': bench_user_list,
+    'input_cache': bench_input_cache,
+    'streaming_input': bench_streaming_input,
+    'categorical_input': bench_categorical_input,
+    'input_order': bench_input_order,
+    'incremental_export': bench_incremental_export,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run grouping performance benchmarks')
+    parser.add_argument('benchmarks', nargs='*',
+                        help=f"Benchmarks to run (default: all): {', '.join(BENCHMARKS)}")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    for name in args.benchmarks or BENCHMARKS:
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
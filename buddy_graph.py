@@ -0,0 +1,159 @@
+"""
+Accountability buddy graph for the Kaizen participant grouping system.
+
+Indexes every accountability buddy request once and keeps both directions
+of each relationship:
+- forward edges: participant -> buddies they requested (present in the data)
+- reverse edges: buddy -> participants who requested them
+
+Used by Phase 1 of group_participants so that connected-component search,
+large-group splitting and missing-buddy reporting query one shared index
+instead of re-parsing the accountability_buddies field for every pair.
+
+Connected components are computed with a disjoint-set (union-find) structure
+in near-linear time, without recursion, and returned in a deterministic order.
+"""
+
+from collections import defaultdict
+
+
+class DisjointSet:
+    """Union-find with path halving and union by size."""
+
+    def __init__(self, items=()):
+        self.parent = {}
+        self.size = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        """Add item as its own singleton set (no-op if already present)."""
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+
+    def find(self, item):
+        """Return the representative of item's set."""
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        """Merge the sets containing a and b; return the new representative."""
+        root_a = self.find(a)
+        root_b = self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+
+class BuddyGraph:
+    """
+    Adjacency index of accountability buddy relationships keyed by normalized email.
+
+    Requests are recorded for every row with add_request(); only rows that are
+    added as participants with add_participant() contribute edges to the graph.
+    Rows sharing a normalized email are merged into one node, matching the
+    email -> user lookup used by the grouping algorithm.
+    """
+
+    def __init__(self, known_emails=()):
+        """
+        Args:
+            known_emails: Normalized emails present in the input data. Requested
+                          buddies outside this set are kept as requests but never
+                          become edges (reported as missing instead).
+        """
+        self.known_emails = set(known_emails)
+        self.requests = {}                # email -> requested emails (parse order)
+        self.forward = defaultdict(set)   # email -> requested buddies present in data
+        self.reverse = defaultdict(set)   # email -> participants who requested it
+        self.participants = {}            # email -> None (insertion-ordered node set)
+
+    def add_request(self, email, requested_emails):
+        """
+        Record the parsed buddy request of one row (no edges are created yet).
+
+        Rows without a usable email (blank, missing or no '@') are skipped:
+        they would all share one key and pool unrelated requests.
+        """
+        if not email or '@' not in email:
+            return
+        existing = self.requests.setdefault(email, [])
+        for buddy_email in requested_emails:
+            if buddy_email not in existing:
+                existing.append(buddy_email)
+
+    def add_participant(self, email):
+        """Add an accountability participant and link it to its requested buddies."""
+        if email in self.participants:
+            return
+        self.participants[email] = None
+        for buddy_email in self.requests.get(email, ()):
+            if buddy_email in self.known_emails:
+                self.forward[email].add(buddy_email)
+                self.reverse[buddy_email].add(email)
+
+    def requested_emails(self, email):
+        """Return the buddy emails requested by this email, in the order given."""
+        return list(self.requests.get(email, ()))
+
+    def referenced_emails(self):
+        """Return every email requested as a buddy by any row."""
+        referenced = set()
+        for requested in self.requests.values():
+            referenced.update(requested)
+        return referenced
+
+    def buddies(self, email):
+        """Forward edges: requested buddies that exist in the data."""
+        return self.forward.get(email, set())
+
+    def referrers(self, email):
+        """Reverse edges: participants who requested this email."""
+        return self.reverse.get(email, set())
+
+    def neighbors(self, email):
+        """Undirected neighbourhood (requested buddies plus referrers)."""
+        return self.buddies(email) | self.referrers(email)
+
+    def missing_buddies(self, email):
+        """Requested buddy emails that do not match any participant in the data."""
+        return [e for e in self.requests.get(email, ()) if e not in self.known_emails]
+
+    def nodes(self):
+        """All nodes in deterministic order: participants as added, then buddy-only nodes sorted."""
+        extra = sorted(e for e in self.reverse if e not in self.participants)
+        return list(self.participants) + extra
+
+    def connected_components(self):
+        """
+        Find all connected components of the (undirected) buddy graph.
+
+        Returns:
+            list: Components as lists of emails. Components are ordered by their
+                  earliest node in nodes() order, and members keep that order,
+                  so results do not depend on set iteration or hash seeds.
+        """
+        nodes = self.nodes()
+        dsu = DisjointSet(nodes)
+        for email, buddies in self.forward.items():
+            for buddy_email in buddies:
+                dsu.union(email, buddy_email)
+
+        components = {}
+        for email in nodes:
+            components.setdefault(dsu.find(email), []).append(email)
+        return list(components.values())
+
+    def __contains__(self, email):
+        return email in self.participants or email in self.reverse
+
+    def __len__(self):
+        return len(set(self.participants) | set(self.reverse))
@@ -4,9 +4,21 @@ Key: (city_lower, state_or_province_lower) -> (latitude, longitude)
 
 Used for proximity-based grouping of USA/Canada participants.
 If a city is not in this table, timezone grouping is used as fallback.
+
+Lookups go through an index built once at import: keys are normalized
+(case, accents, punctuation, "St."/"Saint", "Mt"/"Mount", spacing), state
+and province abbreviations are resolved, and near-miss spellings fall back
+to a cached trigram match within the same state.
 """
 
+import difflib
 import math
+import re
+import unicodedata
+from collections import defaultdict, deque
+from functools import lru_cache
+
+import numpy as np
 
 CITY_COORDS = {
     # ─── UNITED STATES ───────────────────────────────────────────────────────
@@ -591,20 +603,124 @@ CITY_COORDS = {
 }
 
 
+# State / province abbreviations and variants -> names used in CITY_COORDS
+STATE_ALIASES = {
+    'al': 'alabama', 'ak': 'alaska', 'az': 'arizona', 'ar': 'arkansas',
+    'ca': 'california', 'co': 'colorado', 'ct': 'connecticut', 'de': 'delaware',
+    'fl': 'florida', 'ga': 'georgia', 'hi': 'hawaii', 'id': 'idaho',
+    'il': 'illinois', 'in': 'indiana', 'ia': 'iowa', 'ks': 'kansas',
+    'ky': 'kentucky', 'la': 'louisiana', 'me': 'maine', 'md': 'maryland',
+    'ma': 'massachusetts', 'mi': 'michigan', 'mn': 'minnesota', 'ms': 'mississippi',
+    'mo': 'missouri', 'mt': 'montana', 'ne': 'nebraska', 'nv': 'nevada',
+    'nh': 'new hampshire', 'nj': 'new jersey', 'nm': 'new mexico', 'ny': 'new york',
+    'nc': 'north carolina', 'nd': 'north dakota', 'oh': 'ohio', 'ok': 'oklahoma',
+    'or': 'oregon', 'pa': 'pennsylvania', 'ri': 'rhode island', 'sc': 'south carolina',
+    'sd': 'south dakota', 'tn': 'tennessee', 'tx': 'texas', 'ut': 'utah',
+    'vt': 'vermont', 'va': 'virginia', 'wa': 'washington', 'wv': 'west virginia',
+    'wi': 'wisconsin', 'wy': 'wyoming',
+    'dc': 'district of columbia', 'washington dc': 'district of columbia',
+    'ab': 'alberta', 'bc': 'british columbia', 'mb': 'manitoba', 'nb': 'new brunswick',
+    'nl': 'newfoundland and labrador', 'newfoundland': 'newfoundland and labrador',
+    'ns': 'nova scotia', 'nt': 'northwest territories', 'nwt': 'northwest territories',
+    'nu': 'nunavut', 'on': 'ontario', 'pe': 'prince edward island',
+    'pei': 'prince edward island', 'qc': 'quebec', 'que': 'quebec',
+    'sk': 'saskatchewan', 'yt': 'yukon', 'yukon territory': 'yukon',
+}
+
+# Abbreviated words in place names -> spelled-out form
+PLACE_WORD_ALIASES = {
+    'st': 'saint', 'ste': 'sainte', 'ft': 'fort', 'mt': 'mount', 'pt': 'port',
+}
+
+# Minimum difflib ratio for a fuzzy city match (same state only)
+FUZZY_MATCH_CUTOFF = 0.85
+
+
+def normalize_place(text):
+    """
+    Normalize a city/state name for lookup: lowercase, no accents or
+    punctuation, single spaces, abbreviated words spelled out.
+    """
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = re.sub(r"[.'’]", '', text)
+    text = re.sub(r'[^a-z0-9]+', ' ', text).strip()
+    return ' '.join(PLACE_WORD_ALIASES.get(word, word) for word in text.split())
+
+
+def normalize_state(state):
+    """Normalize a state/province name and resolve abbreviations."""
+    state = normalize_place(state)
+    return STATE_ALIASES.get(state, state)
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _CoordinateIndex:
+    """CITY_COORDS keyed by normalized (city, state), with a per-state trigram index."""
+
+    def __init__(self, table):
+        self.exact = {}                                    # (city, state) -> coords
+        self.compact = {}                                  # (city without spaces, state) -> coords
+        self.trigrams = defaultdict(lambda: defaultdict(set))  # state -> trigram -> cities
+        for (city, state), coords in table.items():
+            city_key, state_key = normalize_place(city), normalize_state(state)
+            self.exact.setdefault((city_key, state_key), coords)
+            self.compact.setdefault((city_key.replace(' ', ''), state_key), coords)
+            for gram in _trigrams(city_key):
+                self.trigrams[state_key][gram].add(city_key)
+
+    def fuzzy(self, city_key, state_key):
+        """Closest city in the same state by difflib ratio, or None below the cutoff."""
+        grams = self.trigrams.get(state_key)
+        if not grams or len(city_key) < 4:
+            return None
+        candidates = set()
+        for gram in _trigrams(city_key):
+            candidates.update(grams.get(gram, ()))
+        best_key, best_ratio = None, FUZZY_MATCH_CUTOFF
+        for candidate in sorted(candidates):
+            ratio = difflib.SequenceMatcher(None, city_key, candidate).ratio()
+            if ratio > best_ratio or (ratio == best_ratio and best_key is None):
+                best_key, best_ratio = candidate, ratio
+        return self.exact[(best_key, state_key)] if best_key else None
+
+
+_COORDINATE_INDEX = _CoordinateIndex(CITY_COORDS)
+
+EARTH_RADIUS_MILES = 3958.8
+
+
+@lru_cache(maxsize=4096)
+def _resolve_city_coords(city_key, state_key):
+    index = _COORDINATE_INDEX
+    coords = index.exact.get((city_key, state_key))
+    if coords is None:
+        coords = index.compact.get((city_key.replace(' ', ''), state_key))
+    if coords is None:
+        coords = index.fuzzy(city_key, state_key)
+    return coords
+
+
 def get_city_coords(city, state):
     """
     Look up coordinates for a city + state/province.
+
+    Matches normalized names first (so "St. Louis", "Saint Louis" and
+    "ST LOUIS, MO" agree), then a close spelling in the same state.
     Returns (lat, lng) tuple or None if not found.
     """
     if not city or not state:
         return None
-    key = (str(city).strip().lower(), str(state).strip().lower())
-    return CITY_COORDS.get(key)
+    return _resolve_city_coords(normalize_place(city), normalize_state(state))
 
 
 def haversine_miles(lat1, lng1, lat2, lng2):
     """Return the great-circle distance in miles between two lat/lng points."""
-    R = 3958.8
+    R = EARTH_RADIUS_MILES
     lat1, lng1, lat2, lng2 = map(math.radians, [lat1, lng1, lat2, lng2])
     dlat = lat2 - lat1
     dlng = lng2 - lng1
@@ -612,6 +728,190 @@ def haversine_miles(lat1, lng1, lat2, lng2):
     return R * 2 * math.asin(math.sqrt(a))
 
 
+def haversine_miles_to_many(lat, lng, lats, lngs):
+    """
+    Vectorized one-to-many great-circle distances.
+
+    Args:
+        lat, lng:   origin point in degrees
+        lats, lngs: array-likes of destination points in degrees (same shape)
+
+    Returns:
+        numpy array of distances in miles, shaped like lats
+    """
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lngs, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_MILES * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_matrix(lats1, lngs1, lats2=None, lngs2=None):
+    """
+    Vectorized many-to-many great-circle distances.
+
+    Args:
+        lats1, lngs1: array-likes of n points in degrees
+        lats2, lngs2: array-likes of m points in degrees (default: the first set)
+
+    Returns:
+        numpy array of shape (n, m) with distances in miles
+    """
+    if lats2 is None:
+        lats2, lngs2 = lats1, lngs1
+    lat1 = np.radians(np.asarray(lats1, dtype=float))[:, None]
+    lng1 = np.radians(np.asarray(lngs1, dtype=float))[:, None]
+    lat2 = np.radians(np.asarray(lats2, dtype=float))[None, :]
+    lng2 = np.radians(np.asarray(lngs2, dtype=float))[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_MILES * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def mean_pairwise_miles(lats, lngs):
+    """
+    Compactness score for a set of points: mean great-circle distance over all pairs.
+
+    Returns:
+        float miles (0.0 for fewer than two points)
+    """
+    n = len(lats)
+    if n < 2:
+        return 0.0
+    distances = haversine_matrix(lats, lngs)
+    return float(distances[np.triu_indices(n, k=1)].mean())
+
+
+def _unit_vector(lat, lng):
+    """3D unit vector for a lat/lng point (chord length grows with great-circle distance)."""
+    lat, lng = math.radians(lat), math.radians(lng)
+    cos_lat = math.cos(lat)
+    return (cos_lat * math.cos(lng), cos_lat * math.sin(lng), math.sin(lat))
+
+
+class _PointIndex:
+    """
+    Static 3D k-d tree over unit vectors of distinct coordinates, with removal.
+
+    Each node keeps a count of live points in its subtree, so removed points
+    (cities with no members left) are skipped without rebuilding the tree.
+    """
+
+    def __init__(self, coords):
+        self.coords = coords
+        self.vectors = [_unit_vector(lat, lng) for lat, lng in coords]
+        self.alive = [True] * len(coords)
+        # Node arrays: point id, split axis, left/right child node, live count
+        self.point, self.axis, self.left, self.right, self.live = [], [], [], [], []
+        self.node_of = [0] * len(coords)
+        self.parent = []
+        self.root = self._build(list(range(len(coords))), -1)
+
+    def _build(self, ids, parent):
+        if not ids:
+            return -1
+        vectors = self.vectors
+        # Split on the axis with the largest spread
+        axis = max(range(3), key=lambda a: max(vectors[i][a] for i in ids) - min(vectors[i][a] for i in ids))
+        ids.sort(key=lambda i: vectors[i][axis])
+        mid = len(ids) // 2
+        node = len(self.point)
+        self.point.append(ids[mid])
+        self.axis.append(axis)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.live.append(len(ids))
+        self.parent.append(parent)
+        self.node_of[ids[mid]] = node
+        self.left[node] = self._build(ids[:mid], node)
+        self.right[node] = self._build(ids[mid + 1:], node)
+        return node
+
+    def remove(self, point_id):
+        """Mark a point as removed."""
+        if not self.alive[point_id]:
+            return
+        self.alive[point_id] = False
+        node = self.node_of[point_id]
+        while node != -1:
+            self.live[node] -= 1
+            node = self.parent[node]
+
+    def nearest(self, lat, lng, tie_break):
+        """
+        Return the live point nearest to (lat, lng) by haversine distance.
+
+        Ties on distance go to the point with the smallest tie_break(point_id).
+        Chord lengths are only used to prune subtrees, with a small tolerance,
+        so the winner is the same one a full haversine scan would pick.
+        """
+        qx, qy, qz = _unit_vector(lat, lng)
+        query = (qx, qy, qz)
+        best_id, best_key, best_chord2 = None, None, math.inf
+        stack = [self.root] if self.root != -1 and self.live[self.root] else []
+        while stack:
+            node = stack.pop()
+            point_id = self.point[node]
+            if self.alive[point_id]:
+                vx, vy, vz = self.vectors[point_id]
+                chord2 = (vx - qx) ** 2 + (vy - qy) ** 2 + (vz - qz) ** 2
+                if chord2 <= best_chord2 + 1e-12:
+                    p_lat, p_lng = self.coords[point_id]
+                    key = (haversine_miles(lat, lng, p_lat, p_lng), tie_break(point_id))
+                    if best_key is None or key < best_key:
+                        best_id, best_key = point_id, key
+                        best_chord2 = min(best_chord2, chord2)
+            diff = query[self.axis[node]] - self.vectors[point_id][self.axis[node]]
+            near, far = (self.left[node], self.right[node]) if diff < 0 else (self.right[node], self.left[node])
+            # Far side first on the stack so the near side is searched first
+            if far != -1 and self.live[far] and diff * diff <= best_chord2 + 1e-12:
+                stack.append(far)
+            if near != -1 and self.live[near]:
+                stack.append(near)
+        return best_id
+
+
+def _nearest_neighbor_tour(points):
+    """
+    Greedy nearest-neighbour order over (lat, lng) points, northernmost first.
+
+    Matches a plain O(n^2) scan exactly: the tour starts at the highest
+    latitude, always moves to the closest remaining point by haversine
+    distance, and breaks ties by north-to-south position. Points sharing a
+    coordinate are visited back to back, so the k-d tree only indexes
+    distinct coordinates.
+
+    Args:
+        points: list of (lat, lng) tuples
+
+    Returns:
+        list of indices into points in tour order
+    """
+    # Position in the north-to-south order is the tie-breaker
+    order = sorted(range(len(points)), key=lambda i: -points[i][0])
+
+    coord_ids = {}
+    queues = []      # coordinate id -> deque of point indices, in north-to-south order
+    for i in order:
+        coord_id = coord_ids.setdefault(points[i], len(queues))
+        if coord_id == len(queues):
+            queues.append(deque())
+        queues[coord_id].append(i)
+
+    rank = {i: position for position, i in enumerate(order)}
+    coords = list(coord_ids)
+    index = _PointIndex(coords)
+
+    tour = []
+    current = coord_ids[points[order[0]]] if order else None
+    while current is not None:
+        tour.append(queues[current].popleft())
+        if queues[current]:
+            continue
+        index.remove(current)
+        lat, lng = coords[current]
+        current = index.nearest(lat, lng, lambda coord_id: rank[queues[coord_id][0]])
+    return tour
+
+
 def proximity_sort(members, get_city_fn, get_state_fn):
     """
     Sort members geographically using nearest-neighbor traversal.
@@ -620,6 +920,9 @@ def proximity_sort(members, get_city_fn, get_state_fn):
     adjacent entries in the result are as close together as possible.
     Members with no coordinates are appended at the end (timezone fallback).
 
+    The traversal uses a k-d tree over the distinct city coordinates, so
+    large buckets take O(n log n) instead of O(n^2) distance calls.
+
     Args:
         members:      list of participant dicts
         get_city_fn:  callable(member) -> city string
@@ -628,33 +931,20 @@ def proximity_sort(members, get_city_fn, get_state_fn):
     Returns:
         list of members in proximity order
     """
-    located = []    # [member, lat, lng]
+    located = []    # members with coordinates
+    points = []     # (lat, lng) per located member
     unlocated = []
 
     for m in members:
         coords = get_city_coords(get_city_fn(m), get_state_fn(m))
         if coords:
-            located.append([m, coords[0], coords[1]])
+            located.append(m)
+            points.append((coords[0], coords[1]))
         else:
             unlocated.append(m)
 
     if not located:
         return unlocated
 
-    ordered = []
-    remaining = located[:]
-    # Start from the northernmost point (highest latitude) for a consistent north→south sweep
-    remaining.sort(key=lambda x: -x[1])
-    current = remaining.pop(0)
-    ordered.append(current[0])
-
-    while remaining:
-        cur_lat, cur_lng = current[1], current[2]
-        nearest_idx = min(
-            range(len(remaining)),
-            key=lambda i: haversine_miles(cur_lat, cur_lng, remaining[i][1], remaining[i][2])
-        )
-        current = remaining.pop(nearest_idx)
-        ordered.append(current[0])
-
+    ordered = [located[i] for i in _nearest_neighbor_tour(points)]
     return ordered + unlocated
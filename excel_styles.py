@@ -0,0 +1,157 @@
+"""
+Shared cell style registry for the Excel writers.
+
+The participant cells in the exported workbooks only ever use a handful of
+fill colors and font variants (color x bold x underline). CellStyleRegistry
+builds each PatternFill / Font once and hands out the same objects for every
+cell and sheet, instead of constructing new style objects per cell.
+
+RowWriter appends styled rows to either a regular worksheet or a write-only
+(streaming) one, so the same row-building code serves both export modes.
+set_column_widths sizes columns from the row values up front, which also
+works for write-only sheets (their widths must be set before any row).
+"""
+
+from itertools import product
+
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+
+
+def solid_fill(color):
+    """Solid PatternFill for a hex color."""
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+class CellStyleRegistry:
+    """Pre-built fills and fonts keyed by (color) and (font color, bold, underline)."""
+
+    def __init__(self, fill_colors=(), font_colors=()):
+        """
+        Args:
+            fill_colors: Hex fill colors to pre-build
+            font_colors: Hex font colors to pre-build (None, i.e. default, is always included)
+        """
+        self.fills = {color: solid_fill(color) for color in fill_colors}
+        self.fonts = {}
+        self.stylers = {}
+        for color, bold, underline in product((None, *font_colors), (False, True), (False, True)):
+            self.font(color, bold, underline)
+
+    def fill(self, color):
+        """Shared PatternFill for color (built on first use if not pre-built)."""
+        fill = self.fills.get(color)
+        if fill is None:
+            fill = self.fills[color] = solid_fill(color)
+        return fill
+
+    def font(self, color=None, bold=False, underline=False):
+        """Shared Font for the color / bold / single-underline combination."""
+        key = (color, bool(bold), bool(underline))
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = Font(color=color, bold=key[1], underline='single' if key[2] else None)
+        return font
+
+    def styler(self, fill_color=None, font=None):
+        """
+        Shared RowWriter styler applying a fill and/or font.
+
+        Args:
+            fill_color: Hex fill color, or None to leave the fill alone
+            font: (font_color, bold, underline), or None to leave the font alone
+        """
+        key = (fill_color, font)
+        styler = self.stylers.get(key)
+        if styler is None:
+            fill = self.fill(fill_color) if fill_color else None
+            cell_font = self.font(*font) if font is not None else None
+
+            def styler(cell):
+                if fill is not None:
+                    cell.fill = fill
+                if cell_font is not None:
+                    cell.font = cell_font
+            self.stylers[key] = styler
+        return styler
+
+    def __len__(self):
+        return len(self.fills) + len(self.fonts)
+
+
+class RowWriter:
+    """
+    Append rows with per-cell styling to a regular or write-only worksheet.
+
+    Styles are given as {column: styler} where column is 1-based and styler is
+    a callable(cell) that sets fill/font on the cell. On a write-only sheet the
+    styled values are wrapped in WriteOnlyCell before the row is streamed out;
+    on a regular sheet the cells are styled after the append. The row index is
+    tracked here, so callers never need ws.max_row (which scans every row).
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.write_only = isinstance(ws, WriteOnlyWorksheet)
+        self.rows = 0
+        self.cells = 0
+
+    def append(self, values, styles=None):
+        """
+        Append one row.
+
+        Args:
+            values: Row values
+            styles: Optional {column: callable(cell)} applied to those cells
+
+        Returns:
+            int: The 1-based index of the written row
+        """
+        values = list(values)
+        if self.write_only and styles:
+            for column, styler in styles.items():
+                cell = WriteOnlyCell(self.ws, value=values[column - 1] if column <= len(values) else None)
+                styler(cell)
+                if column > len(values):
+                    values.extend([None] * (column - len(values)))
+                values[column - 1] = cell
+        self.ws.append(values)
+        self.rows += 1
+        self.cells += len(values)
+        if styles and not self.write_only:
+            for column, styler in styles.items():
+                styler(self.ws.cell(row=self.rows, column=column))
+        return self.rows
+
+
+def font_styler(font):
+    """Styler that sets a cell's font."""
+    def styler(cell):
+        cell.font = font
+    return styler
+
+
+def set_column_widths(ws, rows, max_width=50, skip_empty=False):
+    """
+    Size each column to its longest value (+2 characters, capped at max_width).
+
+    Args:
+        ws: Worksheet (for write-only sheets, call before the first append)
+        rows: All rows that will be written, header included
+        max_width: Width cap
+        skip_empty: Ignore falsy values (instead of measuring str(value))
+    """
+    lengths = {}
+    for row in rows:
+        for column, value in enumerate(row, 1):
+            try:
+                if skip_empty and not value:
+                    continue
+                length = len(str(value))
+            except (TypeError, ValueError):
+                continue
+            lengths[column] = max(lengths.get(column, 0), length)
+    for column, length in lengths.items():
+        ws.column_dimensions[get_column_letter(column)].width = min(length + 2, max_width)
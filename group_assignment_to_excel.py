@@ -37,11 +37,26 @@ OUTPUT: Excel file with organized groups, solos, and excluded users
 
 import pandas as pd
 import numpy as np
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from collections.abc import Mapping
+from contextlib import contextmanager
 from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font
+from openpyxl.styles import Font
+from excel_styles import CellStyleRegistry, RowWriter, font_styler, set_column_widths
+import ast
+import os
+import json
 import re
+import time
+from datetime import datetime
+from functools import lru_cache
 from city_coordinates import get_city_coords, haversine_miles, proximity_sort
+from buddy_graph import BuddyGraph
+from group_optimizer import GroupObjective, make_optimizer
+from input_cache import load_merged_data
+from input_stream import stream_records
+from assignment_tables import (CHANGE_COLUMNS, assignment_table, diff_assignment_tables, read_assignment_table,
+                               tables_equal, write_assignment_table)
 
 # ============================================================================
 # UTILITY FUNCTIONS
@@ -74,6 +89,48 @@ def safe_get_value(data_dict, key, default=''):
 INPUT_FILE = 'merged_users_grouping_preferences_20260118_212836.xlsx'  # Change this to your merged file
 OUTPUT_FILE = 'grouped_participants.xlsx'
 
+# Parsed copies of INPUT_FILE, keyed by its content hash (see input_cache.py).
+# Re-runs on an unchanged file skip Excel parsing. None = always parse
+INPUT_CACHE_DIR = '.input_cache'
+
+# Read INPUT_FILE in chunks (CSV via pandas, xlsx via openpyxl read-only mode)
+# and build participant records chunk by chunk, keeping only the columns the
+# grouping uses (see input_stream.py). Lower peak memory on large inputs;
+# bypasses INPUT_CACHE_DIR
+STREAMING_INPUT = False
+
+# Optional local-search pass over regular groups (see group_optimizer.py).
+# None keeps the greedy assignment exactly as formed; 'swap' improves it.
+GROUP_OPTIMIZER = None
+OPTIMIZER_TIME_BUDGET = 5.0  # seconds
+
+# Processes for Phase 3 bucket grouping (None or 1 = single process)
+GROUPING_WORKERS = None
+
+# Stream the output workbook (openpyxl write-only mode); same sheets and formatting
+EXCEL_WRITE_ONLY = False
+
+# Also write one workbook per region (MM, PH regions, timezone regions) next to
+# OUTPUT_FILE, using EXPORT_WORKERS processes (None or 1 = one after another)
+REGION_WORKBOOKS = False
+EXPORT_WORKERS = None
+
+# Long-format copies of the assignment (one row per member, see assignment_tables.py).
+# Extension picks the format: .parquet / .arrow / .feather (need pyarrow) or .csv
+TABLE_EXPORTS = []
+
+# Re-runs compare the assignment with the previous run's snapshot (written next
+# to OUTPUT_FILE as <name>_assignments.csv), skip the export if nothing changed
+# and otherwise add a Changes sheet listing every added / moved / removed member
+INCREMENTAL_EXPORT = False
+
+# Also write the participant user list (see user_list_to_excel.py) from the
+# records parsed for grouping, e.g. 'user_list.xlsx' (None = skip)
+USER_LIST_FILE = None
+
+# Append each export's timing / size metrics as one JSON line to this file (None = off)
+EXPORT_METRICS_LOG = None
+
 # ============================================================================
 # EMAIL PROCESSING FUNCTIONS
 # ============================================================================
@@ -126,6 +183,63 @@ def normalize_email(email, email_mapping):
     email_lower = str(email).lower().strip()
     return email_mapping.get(email_lower, email_lower)
 
+# "Name (email@domain.com)" -> email@domain.com
+BUDDY_EMAIL_IN_PARENS = re.compile(r'\(([^)]+@[^)]+)\)')
+BUDDY_QUOTE_CHARS = str.maketrans('', '', '"\'')
+
+@lru_cache(maxsize=65536)
+def _parse_buddy_item(item_str):
+    """Return the raw email in one buddy entry ("Name (email)" or "email"), or None."""
+    email_match = BUDDY_EMAIL_IN_PARENS.search(item_str)
+    if email_match:
+        # Extract email from parentheses
+        email = email_match.group(1).strip()
+        return email if email and '@' in email else None
+    if '@' in item_str:
+        # Direct email format
+        return item_str
+    return None
+
+def _buddy_dict_emails(buddy_dict):
+    """Raw emails from the values of a {'1': 'email1', '2': 'email2'} dictionary."""
+    return tuple(str(value).strip() for value in buddy_dict.values() if value and '@' in str(value))
+
+@lru_cache(maxsize=65536)
+def _parse_buddy_string(accountability_buddies):
+    """
+    Parse a raw accountability_buddies string into raw (un-normalized) emails.
+
+    Only strings that look like a dict literal are decoded: JSON first, then
+    ast.literal_eval for Python-style quoting. Everything else skips straight
+    to the comma-separated scan, which is what the list-like strings in the
+    input data always ended up in.
+
+    Returns:
+        tuple: Raw email strings in field order (cached per raw string)
+    """
+    if accountability_buddies.lstrip()[:1] in ('{', '('):
+        try:
+            parsed_dict = json.loads(accountability_buddies)
+        except ValueError:
+            try:
+                parsed_dict = ast.literal_eval(accountability_buddies)
+            except (ValueError, SyntaxError):
+                # Not a valid dict string, continue with string parsing
+                parsed_dict = None
+        if isinstance(parsed_dict, dict):
+            return _buddy_dict_emails(parsed_dict)
+
+    # Remove brackets and quotes, split by comma
+    cleaned = accountability_buddies.strip('[]').translate(BUDDY_QUOTE_CHARS)
+    emails = []
+    for email_item in cleaned.split(','):
+        email_item = email_item.strip()
+        if email_item:
+            email = _parse_buddy_item(email_item)
+            if email:
+                emails.append(email)
+    return tuple(emails)
+
 def extract_emails_from_accountability_buddies(accountability_buddies, email_mapping):
     """
     Extract emails from accountability_buddies field, handling multiple formats:
@@ -137,6 +251,9 @@ def extract_emails_from_accountability_buddies(accountability_buddies, email_map
     - String representation of lists/dicts (JSON-like)
     - Simple comma-separated strings
 
+    String fields and list entries are parsed once and cached on the raw
+    value; only the email alias mapping is applied per call.
+
     Args:
         accountability_buddies: The accountability buddies data in any supported format
         email_mapping: Dictionary for email normalization/alias mapping
@@ -146,72 +263,21 @@ def extract_emails_from_accountability_buddies(accountability_buddies, email_map
     """
     if not accountability_buddies:
         return []
-    
+
     if isinstance(accountability_buddies, str):
-        # Try to parse as dictionary first (for string representations of dicts)
-        try:
-            import ast
-            parsed_dict = ast.literal_eval(accountability_buddies)
-            if isinstance(parsed_dict, dict):
-                # Handle dictionary format with numbered keys like {'1': 'email1', '2': 'email2'}
-                emails = []
-                for value in parsed_dict.values():
-                    if value and '@' in str(value):
-                        emails.append(normalize_email(str(value).strip(), email_mapping))
-                return emails
-        except (ValueError, SyntaxError):
-            # Not a valid dict string, continue with string parsing
-            pass
-        
-        # Handle regular string format (list-like strings)
-        # Remove brackets and quotes, split by comma
-        cleaned = accountability_buddies.strip('[]').replace('"', '').replace("'", '')
-        emails = []
-        for email_item in cleaned.split(','):
-            email_item = email_item.strip()
-            if email_item:
-                # Check for "Name (email)" format
-                import re
-                email_match = re.search(r'\(([^)]+@[^)]+)\)', email_item)
-                if email_match:
-                    # Extract email from parentheses
-                    email = email_match.group(1).strip()
-                    if email and '@' in email:
-                        emails.append(normalize_email(email, email_mapping))
-                elif '@' in email_item:
-                    # Direct email format
-                    emails.append(normalize_email(email_item, email_mapping))
-        return emails
+        raw_emails = _parse_buddy_string(accountability_buddies)
     elif isinstance(accountability_buddies, dict):
-        # Handle dictionary format with numbered keys like {'1': 'email1', '2': 'email2'}
-        emails = []
-        for value in accountability_buddies.values():
-            if value and '@' in str(value):
-                emails.append(normalize_email(str(value).strip(), email_mapping))
-        return emails
+        raw_emails = _buddy_dict_emails(accountability_buddies)
     elif isinstance(accountability_buddies, list):
-        # Handle list format - supports two formats:
-        # 1. "Name (email@domain.com)" - extract email from parentheses
-        # 2. "email@domain.com" - use email directly
-        emails = []
+        raw_emails = []
         for item in accountability_buddies:
             if item:
-                item_str = str(item).strip()
-
-                # Check for "Name (email)" format
-                import re
-                email_match = re.search(r'\(([^)]+@[^)]+)\)', item_str)
-                if email_match:
-                    # Extract email from parentheses
-                    email = email_match.group(1).strip()
-                    if email and '@' in email:
-                        emails.append(normalize_email(email, email_mapping))
-                elif '@' in item_str:
-                    # Direct email format
-                    emails.append(normalize_email(item_str, email_mapping))
-        return emails
+                email = _parse_buddy_item(str(item).strip())
+                if email:
+                    raw_emails.append(email)
     else:
         return []
+    return [normalize_email(email, email_mapping) for email in raw_emails]
 
 # ============================================================================
 # COLUMN MAPPING CONFIGURATION
@@ -239,11 +305,16 @@ EXPECTED_COLUMNS = {
     'accountability_buddies': ['accountability_buddies', 'accountabilityBuddies', 'accountability_buddies', 'buddies'],
     'has_accountability_buddies': ['has_accountability_buddies', 'hasAccountabilityBuddies', 'has_buddies'],
     'email': ['email', 'user_email', 'email_address', 'useremail', 'userEmail'],
+    'temporary_team_name': ['temporaryTeamName', 'temporary_team_name', 'temp_team_name', 'team_name'],
     'previous_coach_name': ['previousCoachName', 'previous_coach_name', 'prev_coach_name', 'coach_name'],
     'current_goal': ['currentGoal', 'current_goal', 'goal'],
     'age_group': ['ageGroup', 'age_group', 'age']
 }
 
+# Low-cardinality fields stored as pandas categoricals by encode_categories()
+CATEGORICAL_FIELDS = ('sex', 'gender_identity', 'gender_preference', 'residing_ph', 'country', 'province',
+                      'city', 'state', 'internationalState', 'internationalCity', 'current_goal', 'age_group')
+
 # ============================================================================
 # VISUAL FORMATTING CONSTANTS
 # ============================================================================
@@ -266,6 +337,15 @@ SOLO_COLOR = 'D3D3D3'  # Light Grey
 # Orange for excluded / not participating
 EXCLUDED_COLOR = 'FFD580'  # Light Orange
 
+# Sky blue group name for regular groups with 5+ members in the same location
+REGULAR_GROUP_COLOR = '87CEEB'
+
+# Fills and fonts for participant cells, built once and shared by every cell
+CELL_STYLES = CellStyleRegistry(
+    fill_colors=[*SEX_COLOR.values(), GREEN_COLOR, SOLO_COLOR, EXCLUDED_COLOR, REGULAR_GROUP_COLOR],
+    font_colors=[LGBTQ_FONT_COLOR],
+)
+
 # ============================================================================
 # LOCATION FORMATTING FUNCTIONS
 # ============================================================================
@@ -622,28 +702,68 @@ def get_timezone_label(timezone_region):
     else:
         return timezone_region
 
+# Result of matching input columns against EXPECTED_COLUMNS:
+# mapping   - key -> column name (None if not found)
+# missing   - keys with no matching column
+# ambiguous - key -> every matching column, in preference order (the first one is used)
+ColumnResolution = namedtuple('ColumnResolution', ['mapping', 'missing', 'ambiguous'])
+
+@lru_cache(maxsize=32)
+def _resolve_columns(columns, expected_columns):
+    # columns: tuple of column names (the schema fingerprint);
+    # expected_columns: EXPECTED_COLUMNS as ((key, (names...)), ...)
+    by_lower = {}
+    for col in columns:
+        by_lower.setdefault(col.lower(), []).append(col)
+
+    mapping, missing, ambiguous = {}, [], {}
+    for expected_key, possible_names in expected_columns:
+        matches = []
+        for possible_name in possible_names:
+            for col in by_lower.get(possible_name.lower(), ()):
+                if col not in matches:
+                    matches.append(col)
+        mapping[expected_key] = matches[0] if matches else None
+        if not matches:
+            missing.append(expected_key)
+        elif len(matches) > 1:
+            ambiguous[expected_key] = tuple(matches)
+    return ColumnResolution(mapping, tuple(missing), ambiguous)
+
+def resolve_columns(columns):
+    """
+    Match input columns against EXPECTED_COLUMNS (case-insensitive).
+
+    Each key takes the first of its possible names that is present, and the
+    first column with that name. Results are cached per column tuple, so the
+    entry points that resolve the same schema share one pass over the columns.
+
+    Args:
+        columns: Input column names (e.g. df.columns)
+
+    Returns:
+        ColumnResolution: (mapping, missing keys, ambiguous keys -> matching columns)
+    """
+    expected_columns = tuple((key, tuple(names)) for key, names in EXPECTED_COLUMNS.items())
+    resolution = _resolve_columns(tuple(columns), expected_columns)
+    # Copies, so callers can change them without touching the cached result
+    return ColumnResolution(dict(resolution.mapping), resolution.missing, dict(resolution.ambiguous))
+
 def find_column_mapping(df):
     """Dynamically find column mapping based on available columns"""
-    mapping = {}
-    available_columns = [col.lower() for col in df.columns]
-    
-    for expected_key, possible_names in EXPECTED_COLUMNS.items():
-        found = False
-        for possible_name in possible_names:
-            if possible_name.lower() in available_columns:
-                # Find the exact column name (case-insensitive match)
-                for col in df.columns:
-                    if col.lower() == possible_name.lower():
-                        mapping[expected_key] = col
-                        found = True
-                        break
-                if found:
-                    break
-        
-        if not found:
-            mapping[expected_key] = None
-    
-    return mapping
+    return resolve_columns(df.columns).mapping
+
+def print_column_mapping(column_mapping, columns=None):
+    """Print the column mapping, and keys that matched more than one of the given columns."""
+    ambiguous = resolve_columns(columns).ambiguous if columns is not None else {}
+    print(f"\n📋 Column mapping found:")
+    for key, value in column_mapping.items():
+        if value:
+            print(f"  ✅ {key}: {value}")
+            if key in ambiguous:
+                print(f"     ⚠️ also matched: {', '.join(ambiguous[key][1:])}")
+        else:
+            print(f"  ❌ {key}: NOT FOUND")
 
 def get_country_region(country):
     """Get the region for a given country"""
@@ -655,7 +775,23 @@ def get_country_region(country):
 
 def apply_color_to_cell(cell, sex, gender_identity=None, gender_preference=None, has_accountability_buddies=None, current_goal=None, is_user_id=False, accountability_buddies=None, go_solo=False, is_excluded=False):
     """Apply color coding based on sex, font styling, and special fill coloring"""
-    # Apply fill color based on sex (default)
+    fill_color, font = member_cell_style(sex, gender_identity, gender_preference, has_accountability_buddies, current_goal,
+                                         is_user_id, accountability_buddies, go_solo, is_excluded)
+    if fill_color:
+        cell.fill = CELL_STYLES.fill(fill_color)
+    cell.font = CELL_STYLES.font(*font)
+
+def member_cell_style(sex, gender_identity=None, gender_preference=None, has_accountability_buddies=None, current_goal=None, is_user_id=False, accountability_buddies=None, go_solo=False, is_excluded=False, require_buddy_list=True):
+    """
+    Fill and font for a participant's User ID / Name cell (same arguments as apply_color_to_cell).
+
+    require_buddy_list=False underlines on the has_accountability_buddies flag
+    alone (User List rule); the Grouped Members sheet also needs listed buddies.
+
+    Returns:
+        tuple: (fill_color or None, (font_color, bold, underline))
+    """
+    # Fill color based on sex (default)
     fill_color = None
     sex_lower = str(sex).lower().strip() if sex else ''
     if sex_lower in SEX_COLOR:
@@ -673,34 +809,31 @@ def apply_color_to_cell(cell, sex, gender_identity=None, gender_preference=None,
     if is_excluded:
         fill_color = EXCLUDED_COLOR
 
-    # Apply fill color if set
-    if fill_color:
-        cell.fill = PatternFill(start_color=fill_color, end_color=fill_color, fill_type="solid")
-
-    # Apply font formatting
-    font_color = None
-    is_bold = False
-    is_underline = False
-
-    # Maroon font color for LGBTQ+
-    if gender_identity and str(gender_identity).lower() in ['lgbtq+', 'lgbtq']:
-        font_color = LGBTQ_FONT_COLOR
-
-    # Bold text for same_gender preference
-    if gender_preference and str(gender_preference).lower().strip() == 'same_gender':
-        is_bold = True
-
-    # Underlined text for users with accountability buddies
-    if (has_accountability_buddies and str(has_accountability_buddies).lower() in ['1', '1.0', 'true', 'yes'] and
-        accountability_buddies and str(accountability_buddies).strip() not in ['', 'None', 'nan', 'NaN']):
-        is_underline = True
-
-    # Create font style - always create a new font with the desired properties
-    cell.font = Font(
-        color=font_color,
-        bold=is_bold,
-        underline='single' if is_underline else None
-    )
+    # Font formatting: maroon for LGBTQ+, bold for same_gender, underline for buddies
+    flags = member_style_flags(gender_identity, gender_preference, has_accountability_buddies, accountability_buddies,
+                               require_buddy_list)
+    font_color = LGBTQ_FONT_COLOR if flags['lgbtq'] else None
+    return fill_color, (font_color, flags['same_gender'], flags['has_buddies'])
+
+def member_style_flags(gender_identity=None, gender_preference=None, has_accountability_buddies=None, accountability_buddies=None,
+                       require_buddy_list=True):
+    """
+    Font formatting flags for a participant's User ID / Name cells.
+
+    Args:
+        require_buddy_list: has_buddies also needs accountability_buddies filled in
+
+    Returns:
+        dict: lgbtq (maroon font), same_gender (bold), has_buddies (underline)
+    """
+    buddy_list = bool(accountability_buddies and str(accountability_buddies).strip() not in ['', 'None', 'nan', 'NaN'])
+    return {
+        'lgbtq': bool(gender_identity and str(gender_identity).lower() in ['lgbtq+', 'lgbtq']),
+        'same_gender': bool(gender_preference and str(gender_preference).lower().strip() == 'same_gender'),
+        'has_buddies': bool(
+            has_accountability_buddies and str(has_accountability_buddies).lower() in ['1', '1.0', 'true', 'yes'] and
+            (buddy_list or not require_buddy_list)),
+    }
 
 def format_name_display(name, kaizen_client_type):
     """Format name with prefixes/suffixes based on kaizen_client_type"""
@@ -794,7 +927,7 @@ def generate_diagnostic_report(user_tracking, original_count, solo_groups, group
         for user_id, info in user_tracking.items():
             row_data = info['row_data']
             # Get value using column mapping
-            if isinstance(row_data, dict) and column_mapping and col in column_mapping:
+            if isinstance(row_data, Mapping) and column_mapping and col in column_mapping:
                 col_name = column_mapping[col]
                 value = row_data.get(col_name, '') if col_name else ''
             else:
@@ -855,7 +988,7 @@ def generate_missing_users_analysis(user_tracking, original_count, solo_groups,
     solo_users = set()
     for group in solo_groups:
         for member in group:
-            if isinstance(member, dict) and column_mapping and 'user_id' in column_mapping:
+            if isinstance(member, Mapping) and column_mapping and 'user_id' in column_mapping:
                 col_name = column_mapping['user_id']
                 user_id = member.get(col_name, 'Unknown')
             else:
@@ -867,7 +1000,7 @@ def generate_missing_users_analysis(user_tracking, original_count, solo_groups,
     regular_users = set()
     for group_name, members in grouped.items():
         for member in members:
-            if isinstance(member, dict) and column_mapping and 'user_id' in column_mapping:
+            if isinstance(member, Mapping) and column_mapping and 'user_id' in column_mapping:
                 col_name = column_mapping['user_id']
                 user_id = member.get(col_name, 'Unknown')
             else:
@@ -879,7 +1012,7 @@ def generate_missing_users_analysis(user_tracking, original_count, solo_groups,
     requested_users = set()
     for group in requested_groups:
         for member in group:
-            if isinstance(member, dict) and column_mapping and 'user_id' in column_mapping:
+            if isinstance(member, Mapping) and column_mapping and 'user_id' in column_mapping:
                 col_name = column_mapping['user_id']
                 user_id = member.get(col_name, 'Unknown')
             else:
@@ -890,7 +1023,7 @@ def generate_missing_users_analysis(user_tracking, original_count, solo_groups,
     # Collect users from excluded users
     excluded_user_ids = set()
     for user in excluded_users:
-        if isinstance(user, dict) and column_mapping and 'user_id' in column_mapping:
+        if isinstance(user, Mapping) and column_mapping and 'user_id' in column_mapping:
             col_name = column_mapping['user_id']
             user_id = user.get(col_name, 'Unknown')
         else:
@@ -974,7 +1107,7 @@ def generate_missing_users_analysis(user_tracking, original_count, solo_groups,
         for i, group in enumerate(solo_groups[:5], 1):
             user_ids = []
             for member in group:
-                if isinstance(member, dict) and column_mapping and 'user_id' in column_mapping:
+                if isinstance(member, Mapping) and column_mapping and 'user_id' in column_mapping:
                     col_name = column_mapping['user_id']
                     user_id = member.get(col_name, 'Unknown')
                 else:
@@ -995,7 +1128,7 @@ def generate_missing_users_analysis(user_tracking, original_count, solo_groups,
                 break
             user_ids = []
             for member in members:
-                if isinstance(member, dict) and column_mapping and 'user_id' in column_mapping:
+                if isinstance(member, Mapping) and column_mapping and 'user_id' in column_mapping:
                     col_name = column_mapping['user_id']
                     user_id = member.get(col_name, 'Unknown')
                 else:
@@ -1014,7 +1147,7 @@ def generate_missing_users_analysis(user_tracking, original_count, solo_groups,
         for i, group in enumerate(requested_groups[:5], 1):
             user_ids = []
             for member in group:
-                if isinstance(member, dict) and column_mapping and 'user_id' in column_mapping:
+                if isinstance(member, Mapping) and column_mapping and 'user_id' in column_mapping:
                     col_name = column_mapping['user_id']
                     user_id = member.get(col_name, 'Unknown')
                 else:
@@ -1056,7 +1189,7 @@ def check_for_duplicates(solo_groups, grouped, excluded_users, requested_groups,
     
     def get_value(row, key, default=''):
         if column_mapping and key in column_mapping:
-            if isinstance(row, dict):
+            if isinstance(row, Mapping):
                 return row.get(column_mapping[key], default)
             else:
                 return default
@@ -1384,11 +1517,760 @@ def check_for_duplicates(solo_groups, grouped, excluded_users, requested_groups,
 #     
 #     return final_groups
 
+# ============================================================================
+# PARTICIPANT RECORDS
+# ============================================================================
+
+# Raw values accepted as "true" for the various yes/no columns
+PH_RESIDENT_VALUES = ('1', '1.0', 'true', 'yes', 'ph', 'philippines')
+HAS_BUDDIES_VALUES = ('1', '1.0', 'true', 'yes')
+GO_SOLO_VALUES = ('1', '1.0', 'true')
+NOT_JOINING_VALUES = ('false', '0', '0.0', 'no')
+
+# Fallback positions for list-format rows (no column mapping available)
+LEGACY_ROW_INDICES = {
+    'user_id': 0,
+    'gender_identity': 3,
+    'sex': 7,
+    'residing_ph': 8,
+    'gender_preference': 10,
+    'country': 16,
+    'province': 17,
+    'city': 18,
+    'state': 19,
+    'go_solo': 20,
+}
+
+def format_coach_with_age(coach_name, age_group):
+    """Format "Coach (age group)", "Coach" or "(age group)" for the Coach and Age columns."""
+    if coach_name and age_group:
+        return f"{coach_name} ({age_group})"
+    elif coach_name:
+        return coach_name
+    elif age_group:
+        return f"({age_group})"
+    return coach_name
+
+class CategoryMemo:
+    """
+    Normalized CATEGORICAL_FIELDS values for one build of Participant records.
+
+    Holds one entry per distinct value (sized by the input's categories, never
+    evicting), so every record with that value shares one string. Bucket keys
+    also get dense integer codes in first-seen order for the grouping buckets.
+    A memo lives only as long as the build call that created it, so nothing
+    accumulates across runs or Streamlit uploads.
+    """
+
+    def __init__(self):
+        self.texts = {}
+        self.keys = {}
+        self.codes = {}
+
+    @staticmethod
+    def _memo_key(value):
+        # Typed like lru_cache(typed=True): 1, 1.0 and True stay apart; all NaNs share one entry
+        if isinstance(value, float) and value != value:
+            return float, 'nan'
+        return type(value), value
+
+    def text(self, value):
+        """str(value).strip(), one shared string per distinct value."""
+        key = self._memo_key(value)
+        text = self.texts.get(key)
+        if text is None:
+            text = self.texts[key] = str(value).strip()
+        return text
+
+    def key(self, value):
+        """Lowercased text(value), the form the grouping buckets compare."""
+        key = self._memo_key(value)
+        lowered = self.keys.get(key)
+        if lowered is None:
+            lowered = self.keys[key] = self.text(value).lower()
+        return lowered
+
+    def code(self, bucket_key):
+        """Integer code of a bucket key string (equal keys, equal codes)."""
+        code = self.codes.get(bucket_key)
+        if code is None:
+            code = self.codes[bucket_key] = len(self.codes)
+        return code
+
+class Participant(Mapping):
+    """
+    Pre-parsed participant record built once from an input row.
+
+    Every field used by the grouping algorithm and the exporters is resolved
+    and normalized up front, so the hot loops compare plain attributes instead
+    of repeating column_mapping lookups and str()/strip()/lower() calls.
+
+    Text fields use the same conversion the grouping code always applied
+    (str(value).strip()), so empty cells read as 'nan' keep their previous
+    grouping keys and group names. Display fields (location_display,
+    display_name, coach_with_age) use the exporter conventions (empty cells blank).
+
+    Participant is also a read-only Mapping over the original row, so code that
+    reads columns directly (member.get(column_name)) keeps working.
+    """
+    __slots__ = (
+        'row', 'user_id', 'email', 'sex', 'gender_identity', 'gender_preference',
+        'is_ph', 'country', 'country_name', 'country_key', 'province', 'city', 'state',
+        'international_state', 'international_city', 'location_key',
+        'goal', 'age_group', 'go_solo', 'excluded', 'has_buddies', 'accountability_buddies',
+        'kaizen_client_type', 'previous_coach_name', 'age_group_display',
+        'location_display', 'display_name', 'coach_with_age', 'province_code', 'country_code',
+    )
+
+    def __init__(self, row, column_mapping, email_mapping, categories=None):
+        self.row = row
+        if categories is None:
+            categories = CategoryMemo()
+
+        def raw(key, default=''):
+            # Same resolution as the grouping helper get_value()
+            if column_mapping and key in column_mapping:
+                if isinstance(row, Mapping):
+                    return row.get(column_mapping[key], default)
+                return default
+            if isinstance(row, list) and key in LEGACY_ROW_INDICES:
+                index = LEGACY_ROW_INDICES[key]
+                return row[index] if len(row) > index else default
+            return default
+
+        def text(key, default=''):
+            if key in CATEGORICAL_FIELDS:
+                return categories.text(raw(key, default))
+            return str(raw(key, default)).strip()
+
+        def lowered(key, default=''):
+            return categories.key(raw(key, default))
+
+        user_id = raw('user_id', '')
+        self.user_id = str(user_id).strip() if user_id else ''
+        self.email = normalize_email(raw('email', ''), email_mapping)
+        self.sex = lowered('sex')
+        self.gender_identity = lowered('gender_identity')
+        self.gender_preference = lowered('gender_preference')
+        self.is_ph = lowered('residing_ph', '0') in PH_RESIDENT_VALUES
+
+        self.country = text('country')
+        self.country_name = extract_country_from_field(text('country', 'Unknown Country'))
+        self.country_key = normalize_country_name(self.country_name)
+        self.province = text('province')
+        self.city = text('city')
+        self.state = text('state')
+        self.international_state = text('internationalState')
+        self.international_city = text('internationalCity')
+
+        self.goal = lowered('current_goal')
+        self.age_group = lowered('age_group')
+        self.go_solo = text('go_solo', '0').lower() in GO_SOLO_VALUES
+        self.excluded = text('joining_as_student', 'True').lower() in NOT_JOINING_VALUES
+        self.has_buddies = text('has_accountability_buddies', '0').lower() in HAS_BUDDIES_VALUES
+        self.accountability_buddies = raw('accountability_buddies', '')
+
+        # Location bucket used by priority same-gender grouping:
+        # MM -> same city, rest of PH -> same province, international -> country + state
+        if self.is_ph:
+            if self.province.lower() in ['metro manila', 'mm']:
+                self.location_key = f"PH_MM_{self.city}"
+            else:
+                self.location_key = f"PH_{self.province}"
+        elif column_mapping and column_mapping.get('internationalState'):
+            if self.international_state:
+                self.location_key = f"INT_{self.country}_{self.international_state}"
+            else:
+                self.location_key = f"INT_{self.country}"
+        else:
+            self.location_key = f"INT_{self.country}_{self.state}"
+
+        # Export display fields (blank for missing values)
+        if column_mapping and isinstance(row, Mapping):
+            self.kaizen_client_type = safe_get_value(row, column_mapping.get('kaizen_client_type', ''), '')
+            self.previous_coach_name = safe_get_value(row, column_mapping.get('previous_coach_name', ''), '')
+            self.age_group_display = safe_get_value(row, column_mapping.get('age_group', ''), '')
+            self.location_display = format_location_display(row, column_mapping)
+            self.display_name = format_name_display(row.get(column_mapping.get('name'), ''), self.kaizen_client_type)
+        else:
+            self.kaizen_client_type = ''
+            self.previous_coach_name = ''
+            self.age_group_display = ''
+            self.location_display = ''
+            self.display_name = ''
+        self.coach_with_age = format_coach_with_age(self.previous_coach_name, self.age_group_display)
+        self.encode(categories)
+
+    def encode(self, categories):
+        """Set the Phase 3 bucket codes (PH province, country) from a CategoryMemo."""
+        self.province_code = categories.code(self.province.lower())
+        self.country_code = categories.code(self.country_key)
+
+    @property
+    def has_buddy_field(self):
+        """True if the accountability_buddies field is filled in (not blank/None/NaN)."""
+        value = self.accountability_buddies
+        return bool(value) and str(value).strip() not in ['', 'None', 'nan', 'NaN']
+
+    # Read-only mapping over the original row
+    def __getitem__(self, key):
+        try:
+            return self.row[key]
+        except (IndexError, TypeError):
+            raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.row)
+
+    def __len__(self):
+        return len(self.row)
+
+    def __contains__(self, key):
+        return isinstance(self.row, Mapping) and key in self.row
+
+    def __repr__(self):
+        return f"Participant(user_id={self.user_id!r}, email={self.email!r})"
+
+def build_participants(data, column_mapping, email_mapping, categories=None):
+    """
+    Build Participant records for all rows (rows that already are records are reused).
+
+    Args:
+        data: List of participant dictionaries (or Participant records)
+        column_mapping: Column name mappings
+        email_mapping: Email alias mapping from create_email_mapping()
+        categories: CategoryMemo shared with other chunks of the same input
+                    (default: a new one for this call)
+
+    Returns:
+        list: Participant records in input order, with bucket codes from one memo
+    """
+    if categories is None:
+        categories = CategoryMemo()
+    records = []
+    for row in data:
+        if isinstance(row, Participant):
+            # Reused records may come from another memo; recode so all codes compare
+            row.encode(categories)
+        else:
+            row = Participant(row, column_mapping, email_mapping, categories)
+        records.append(row)
+    return records
+
+def as_participant(member, column_mapping, email_mapping=None):
+    """Return member as a Participant record, building one if needed."""
+    if isinstance(member, Participant):
+        return member
+    return Participant(member, column_mapping, email_mapping if email_mapping is not None else create_email_mapping([], {}))
+
+class MembershipIndex:
+    """
+    Email-keyed lookup of participants and requested-group membership.
+
+    Maintained incrementally while Phase 1 builds requested groups, so "who
+    has this email", "which requested group is this buddy in" and "is this
+    email already in that group" are O(1) instead of list scans.
+    """
+
+    def __init__(self, participants=()):
+        self.participants = {}    # email -> participant (later rows win)
+        self.group_of = {}        # email -> id of the first requested group containing it
+        self.group_emails = []    # requested group id -> set of member emails
+        for participant in participants:
+            self.add_participant(participant)
+
+    def add_participant(self, participant):
+        """Index a participant under its normalized email."""
+        self.participants[participant.email] = participant
+
+    def get(self, email, default=None):
+        """Return the participant with this email, or default."""
+        return self.participants.get(email, default)
+
+    def add_group(self, members):
+        """Register a new requested group; ids follow the order groups are added."""
+        group_id = len(self.group_emails)
+        self.group_emails.append(set())
+        for member in members:
+            self.add_to_group(group_id, member)
+        return group_id
+
+    def add_to_group(self, group_id, member):
+        """Record that member was appended to an existing requested group."""
+        self.group_emails[group_id].add(member.email)
+        self.group_of.setdefault(member.email, group_id)
+
+    def group_id(self, email):
+        """Id of the first requested group containing email, or None."""
+        return self.group_of.get(email)
+
+    def in_group(self, group_id, email):
+        """True if email is a member of the given requested group."""
+        return email in self.group_emails[group_id]
+
+    def __contains__(self, email):
+        return email in self.participants
+
+def participant_coords(participant):
+    """(lat, lng) for USA/Canada participants found in the city table, else None."""
+    if participant.country_key not in NA_COUNTRIES:
+        return None
+    return get_city_coords(participant.international_city or participant.city,
+                           participant.international_state or participant.state)
+
+def age_group_rank(age_group):
+    """Decade rank from an age bracket such as '31-40' or '50+' (None if unparseable)."""
+    match = re.match(r'\s*(\d+)', str(age_group))
+    return int(match.group(1)) / 10 if match else None
+
+def participant_timezone(participant):
+    """Timezone key used by the optimizer: NA zone for USA/Canada, otherwise country (or PH)."""
+    if participant.is_ph:
+        return 'philippines'
+    if participant.country_key in NA_COUNTRIES:
+        return get_na_timezone(participant.country_key, participant.international_state or participant.state)
+    return participant.country_key
+
+def print_optimizer_metrics(metrics):
+    """Print the summary of one optimizer run."""
+    print(f"\n🧮 GROUP OPTIMIZER ({metrics['optimizer']})")
+    print(f"  Domains: {metrics['domains']} | Groups: {metrics['groups']} | Members: {metrics['members']}")
+    print(f"  Swaps: {metrics['swaps']} in {metrics['passes']} passes "
+          f"({metrics['elapsed_seconds']:.2f}s, stopped: {metrics['stopped']})")
+    print(f"  Cost: {metrics['cost_before']:.2f} → {metrics['cost_after']:.2f} "
+          f"({metrics['improvement_pct']:.1f}% better)")
+    for name, before in metrics['components_before'].items():
+        print(f"    {name}: {before:.2f} → {metrics['components_after'][name]:.2f}")
+
+# ============================================================================
+# GROUP METADATA
+# ============================================================================
+# Every group created by group_participants carries a GroupInfo describing
+# where it sits (so export ordering never has to parse the group name).
+#
+# level: 'mm'            Metro Manila city / mixed-city group
+#        'province'      Other Philippine province
+#        'country'       International country (optionally one state)
+#        'international' Same-gender international group without a state
+#        'na_timezone'   USA + Canada remainder merged by timezone
+#        'na_mixed'      USA + Canada final proximity mix
+
+GroupInfo = namedtuple('GroupInfo', ['level', 'gender_key', 'country', 'province', 'city', 'state', 'timezone'])
+
+# Export order of location levels (anything else sorts last)
+LOCATION_LEVEL_ORDER = {'mm': 0, 'province': 1, 'country': 2}
+
+# Export order of Metro Manila cities and of countries (unlisted sort last)
+MM_CITY_ORDER = {
+    'Quezon City': 1,
+    'Taguig': 2,
+    'Makati': 3,
+    'Parañaque': 4,
+    'Pasig': 5,
+    'San Juan': 6,
+    'Mandaluyong': 7,
+    'Manila': 8,
+    'Las Piñas': 9,
+    'Muntinlupa': 10,
+    'Navotas': 11,
+    'Marikina': 12,
+    'Malabon': 13,
+    'Valenzuela': 14,
+    'Caloocan': 15,
+    'Pateros': 16
+}
+COUNTRY_ORDER = {
+    'United States': 1,
+    'Canada': 2,
+    'United Kingdom': 3,
+    'Australia': 4,
+    'United Arab Emirates': 5,
+    'Singapore': 6,
+    'Japan': 7,
+    'Germany': 8,
+    'New Zealand': 9,
+    'China': 10,
+    'Hong Kong': 11,
+    'Vietnam': 12,
+    'Norway': 13,
+    'Netherlands': 14,
+    'Spain': 15,
+    'Turkey': 16,
+    'Oman': 17,
+    'Qatar': 18,
+    'Saudi Arabia': 19,
+    'Cayman Islands': 20
+}
+
+def group_location(level, country='', province='', city='', state='', timezone=''):
+    """GroupInfo for a location; gender_key is filled in when the group is named."""
+    return GroupInfo(level, None, country, province, city, state, timezone)
+
+class GroupedMembers(dict):
+    """
+    {group_name: [members]} for regular groups, plus group_name -> GroupInfo in .info.
+
+    A plain dict everywhere else; groups added with add() carry their metadata.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.info = {}
+
+    def add(self, group_name, members, info):
+        self[group_name] = members
+        self.info[group_name] = info
+
+def group_info_from_name(group_name):
+    """
+    GroupInfo parsed from a "Group N (gender, location)" name.
+
+    Fallback for groups built outside group_participants (plain dicts);
+    reproduces the order the export used before groups carried metadata.
+    """
+    def field(label, stops):
+        start = group_name.find(label)
+        if start == -1:
+            return ''
+        start += len(label)
+        for stop in stops:
+            end = group_name.find(stop, start)
+            if end != -1:
+                return group_name[start:end].strip()
+        return group_name[start:].strip()
+
+    if 'Province: MM' in group_name:
+        level = 'mm'
+    elif 'Province:' in group_name and 'MM' not in group_name:
+        level = 'province'
+    elif 'Country:' in group_name:
+        level = 'country'
+    else:
+        level = 'other'
+
+    gender_key = 'unknown'
+    if '(' in group_name and ')' in group_name:
+        start = group_name.find('(') + 1
+        gender_key = group_name[start:group_name.find(')', start)].split(', ')[0]
+
+    city = field('City:', [')']) if 'Province: MM, City:' in group_name else ''
+    return GroupInfo(level, gender_key, field('Country:', [',', ')']), '', city, field('State:', [')']), '')
+
+def group_sort_key(group_name, members, info):
+    """
+    Export order of regular groups: MM → provinces → countries → others,
+    then country priority, MM city priority, state, larger groups, name.
+    """
+    return (
+        LOCATION_LEVEL_ORDER.get(info.level, 3),
+        COUNTRY_ORDER.get(info.country, 99) if info.level == 'country' else 99,
+        MM_CITY_ORDER.get(info.city, 99) if info.level == 'mm' else 99,
+        info.state if info.level == 'country' else '',
+        -len(members),
+        group_name,
+    )
+
+# ============================================================================
+# PHASE 3 BUCKET GROUPING
+# ============================================================================
+# Phase 3 (regular grouping) splits each gender bucket into independent
+# location buckets: one task per Philippine province, per non-NA country and
+# one for USA + Canada. Tasks are plain module-level functions over
+# Participant lists so they can run in a process pool; each returns
+# (location_info, location, members) groups in order, where location is a
+# GroupInfo without gender_key, and never numbers groups itself.
+
+GOAL_ORDER = {
+    'bulking': 1, 'get_bigger': 1,
+    'maintain': 2, 'maintenance': 2, 'recomp': 2,
+    'lose_weight': 3, 'cut': 3, 'cutting': 3, 'weight_loss': 3,
+}
+AGE_ORDER = {
+    'under 18': 1, '18-24': 2, '25-34': 3,
+    '35-44': 4, '45-54': 5, '55+': 6,
+}
+PH_REGION_ORDER = {'luzon': 1, 'visayas': 2, 'mindanao': 3, 'unknown': 4}
+
+def sort_by_goal_age(members):
+    """Sort members within a location bucket by goal then age, so similar
+    participants naturally cluster into the same groups of 5.
+    Location is always the primary bucket — this only reorders within it."""
+    return sorted(members, key=lambda p: (
+        GOAL_ORDER.get(p.goal, 99),      # known goals first, unknown last
+        AGE_ORDER.get(p.age_group, 99),  # known ages first, unknown last
+        p.user_id,                       # stable tiebreaker
+    ))
+
+def _na_city(member):
+    return member.international_city or member.city
+
+def _na_state(member):
+    return member.international_state or member.state
+
+def group_ph_province(province_members, original_province, province_norm):
+    """
+    PHILIPPINES GROUPING for one province: City → province remainder
+    (hard boundaries — cities never mixed together, MM never mixed with
+    other Luzon provinces).
+
+    Returns:
+        list: (location_info, location, members) in creation order
+    """
+    groups = []
+    province_display = 'MM' if province_norm in ['metro manila', 'mm'] else original_province
+    level = 'mm' if province_display == 'MM' else 'province'
+
+    # Group by city
+    city_members = defaultdict(list)
+    for r in province_members:
+        city_members[r.city.lower()].append(r)
+
+    province_remainder = []
+    for city_norm in sorted(city_members.keys()):
+        members = sort_by_goal_age(city_members[city_norm])
+        original_city = members[0].city or 'Unknown City'
+        location_info = f"Province: {province_display}, City: {original_city}"
+        location = group_location(level, 'Philippines', province_display, original_city, timezone='philippines')
+        i = 0
+        while i + 5 <= len(members):
+            groups.append((location_info, location, members[i:i+5]))
+            i += 5
+        # City remainder → province pool for cross-city merging within same province
+        if i < len(members):
+            province_remainder.extend(members[i:])
+
+    # Merge city remainders within the same province (never cross-province)
+    if province_remainder:
+        province_remainder = sort_by_goal_age(province_remainder)
+        location_info = f"Province: {province_display}, Mixed Cities"
+        location = group_location(level, 'Philippines', province_display, timezone='philippines')
+        i = 0
+        while i + 5 <= len(province_remainder):
+            groups.append((location_info, location, province_remainder[i:i+5]))
+            i += 5
+        # Final province remainder — keep as-is, never merged with another province
+        if i < len(province_remainder):
+            groups.append((location_info, location, province_remainder[i:]))
+    return groups
+
+def group_international_country(country_members, int_states, country_display):
+    """
+    INTERNATIONAL GROUPING for one non-NA country: full groups per state,
+    then the country remainder (never merged across country lines).
+
+    Args:
+        country_members: Participants in this country
+        int_states: State key per participant (same order)
+        country_display: Country name used in group names
+
+    Returns:
+        list: (location_info, location, members) in creation order
+    """
+    groups = []
+    timezone = participant_timezone(country_members[0]) if country_members else ''
+    state_buckets = defaultdict(list)
+    for r, int_state in zip(country_members, int_states):
+        state_buckets[int_state].append(r)
+
+    country_remainder = []
+    for state_key in sorted(state_buckets.keys()):
+        members = sort_by_goal_age(state_buckets[state_key])
+        location_info = (f"Country: {country_display}, State: {state_key}"
+                         if state_key else f"Country: {country_display}")
+        location = group_location('country', country_display, state=state_key, timezone=timezone)
+        i = 0
+        while i + 5 <= len(members):
+            groups.append((location_info, location, members[i:i+5]))
+            i += 5
+        country_remainder.extend(members[i:])
+
+    if country_remainder:
+        country_remainder = sort_by_goal_age(country_remainder)
+        has_states = any(k for k in state_buckets)
+        location_info = (f"Country: {country_display}, Mixed States"
+                         if has_states else f"Country: {country_display}")
+        location = group_location('country', country_display, timezone=timezone)
+        i = 0
+        while i + 5 <= len(country_remainder):
+            groups.append((location_info, location, country_remainder[i:i+5]))
+            i += 5
+        if i < len(country_remainder):
+            groups.append((location_info, location, country_remainder[i:]))
+    return groups
+
+def group_north_america(na_members, na_keys, country_display_name):
+    """
+    USA + Canada: full groups per state/province, then timezone proximity
+    merging, then one NA-wide proximity mix for the final remainder.
+
+    Args:
+        na_members: USA/Canada participants
+        na_keys: (country_norm, state) per participant (same order)
+        country_display_name: {country_norm: display name}
+
+    Returns:
+        list: (location_info, location, members) in creation order
+    """
+    groups = []
+    # Step 1: full groups of 5 per state/province
+    na_state_buckets = defaultdict(list)  # (country_norm, state) -> members
+    for r, key in zip(na_members, na_keys):
+        na_state_buckets[key].append(r)
+
+    na_tz_remainder = defaultdict(list)  # timezone -> members that didn't fill a group
+
+    for (country_norm, state_key), members in sorted(na_state_buckets.items()):
+        country_display = country_display_name.get(country_norm, country_norm).title()
+        members = sort_by_goal_age(members)
+        location_info = (f"Country: {country_display}, State: {state_key}"
+                         if state_key else f"Country: {country_display}")
+        tz = get_na_timezone(country_norm, state_key)
+        location = group_location('country', country_display, state=state_key, timezone=tz)
+        i = 0
+        while i + 5 <= len(members):
+            groups.append((location_info, location, members[i:i+5]))
+            i += 5
+        if i < len(members):
+            na_tz_remainder[tz].extend(members[i:])
+
+    # Step 2: merge remainders by shared timezone, ordered by city proximity
+    na_global_remainder = []
+    for tz in ['pacific', 'mountain', 'central', 'eastern', 'other']:
+        raw = na_tz_remainder.get(tz, [])
+        if not raw:
+            continue
+        # Sort by goal/age first, then re-order by proximity within that sorted list
+        raw = sort_by_goal_age(raw)
+        members = proximity_sort(raw, get_city_fn=_na_city, get_state_fn=_na_state)
+        location_info = f"NA ({tz.title()} Time)"
+        location = group_location('na_timezone', timezone=tz)
+        i = 0
+        while i + 5 <= len(members):
+            groups.append((location_info, location, members[i:i+5]))
+            i += 5
+        na_global_remainder.extend(members[i:])
+
+    # Step 3: NA-wide mix — apply proximity sort one final time
+    na_global_remainder = proximity_sort(
+        sort_by_goal_age(na_global_remainder),
+        get_city_fn=_na_city,
+        get_state_fn=_na_state,
+    )
+    location = group_location('na_mixed')
+    i = 0
+    while i < len(na_global_remainder):
+        groups.append(("NA Mixed", location, na_global_remainder[i:i+5]))
+        i += 5
+    return groups
+
+def plan_bucket_tasks(gender_key, rows, has_international_state):
+    """
+    Split one gender bucket into independent location tasks, in output order:
+    PH provinces (Luzon → Visayas → Mindanao → unknown), then non-NA
+    countries alphabetically, then USA + Canada.
+
+    Returns:
+        list: (gender_key, task_function, members, extra_args) tuples
+    """
+    tasks = []
+
+    # Separate Philippines vs International residents
+    ph_rows = []
+    non_ph_rows = []
+    for r in rows:
+        if r.is_ph:
+            ph_rows.append(r)
+        else:
+            # Non-PH and unknown values are treated as international
+            non_ph_rows.append(r)
+
+    # Bucket on the integer province / country codes (one code per lowercased name)
+    province_groups = defaultdict(list)
+    for r in ph_rows:
+        province_groups[r.province_code].append(r)
+
+    # Sort provinces by PH region (Luzon → Visayas → Mindanao → unknown)
+    sorted_provinces = []
+    for province_members in province_groups.values():
+        province_norm = province_members[0].province.lower()
+        original_province = province_members[0].province or 'Unknown Province'
+        ph_region = get_philippines_region(original_province)
+        sorted_provinces.append((original_province, province_norm, province_members, ph_region))
+    sorted_provinces.sort(key=lambda x: (PH_REGION_ORDER.get(x[3], 5), str(x[0]).lower() if x[0] else ''))
+
+    for original_province, province_norm, province_members, ph_region in sorted_provinces:
+        tasks.append((gender_key, group_ph_province, province_members, (original_province, province_norm)))
+
+    if non_ph_rows:
+        country_members = defaultdict(list)
+        country_states = defaultdict(list)
+        country_display_name = {}
+        na_members, na_keys = [], []
+
+        for r in non_ph_rows:
+            country_norm = r.country_key
+            country_display_name[country_norm] = r.country_name
+            int_state = r.international_state if has_international_state else ''
+            if country_norm in NA_COUNTRIES:
+                na_members.append(r)
+                na_keys.append((country_norm, int_state))
+            else:
+                country_members[r.country_code].append(r)
+                country_states[r.country_code].append(int_state)
+
+        # Non-NA countries: no cross-country merging
+        for members in sorted(country_members.values(), key=lambda members: members[0].country_key):
+            country_norm = members[0].country_key
+            country_display = country_display_name.get(country_norm, country_norm)
+            tasks.append((gender_key, group_international_country, members,
+                          (country_states[members[0].country_code], country_display)))
+
+        # USA + Canada: timezone proximity merging
+        if na_members:
+            na_names = {c: country_display_name[c] for c in NA_COUNTRIES if c in country_display_name}
+            tasks.append((gender_key, group_north_america, na_members, (na_keys, na_names)))
+
+    return tasks
+
+def _run_bucket_task(task_fn, members, extra_args):
+    """Run one bucket task and return its groups as indices into members (cheap to send back)."""
+    position = {id(member): i for i, member in enumerate(members)}
+    return [(location_info, location, [position[id(m)] for m in group])
+            for location_info, location, group in task_fn(members, *extra_args)]
+
+def run_bucket_tasks(tasks, workers=None):
+    """
+    Run Phase 3 bucket tasks and merge their groups in task order.
+
+    Args:
+        tasks: Output of plan_bucket_tasks() for every gender bucket
+        workers: Process count; None or 1 runs everything in this process
+
+    Returns:
+        list: (gender_key, location_info, info, members) with the caller's
+              Participant objects and the group's GroupInfo, in the same
+              order for any worker count
+    """
+    if workers and workers > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_bucket_task, fn, members, extra) for _, fn, members, extra in tasks]
+            results = [future.result() for future in futures]
+    else:
+        results = [_run_bucket_task(fn, members, extra) for _, fn, members, extra in tasks]
+
+    merged = []
+    for (gender_key, _, members, _), groups in zip(tasks, results):
+        for location_info, location, indices in groups:
+            merged.append((gender_key, location_info, location._replace(gender_key=gender_key),
+                           [members[i] for i in indices]))
+    return merged
+
 # ============================================================================
 # MAIN GROUPING FUNCTIONS
 # ============================================================================
 
-def group_participants(data, column_mapping):
+def group_participants(data, column_mapping, optimizer=None, optimizer_time_budget=None, workers=None):
     """
     MAIN GROUPING ALGORITHM - Processes participants into optimized groups.
 
@@ -1399,16 +2281,21 @@ def group_participants(data, column_mapping):
     4. Priority Same-Gender Grouping (females first, 5-member target, same location)
     5. Regular Algorithmic Grouping (remaining participants)
     6. Small Group Merging (optimization)
+    7. Optional local-search optimization of regular groups
 
     Args:
         data: List of participant dictionaries
         column_mapping: Column name mappings
+        optimizer: Registered optimizer name (e.g. 'swap') or None to skip
+        optimizer_time_budget: Seconds for the optimizer (default OPTIMIZER_TIME_BUDGET)
+        workers: Processes for Phase 3 bucket grouping (None/1 = run in this process)
 
     Returns:
         tuple: (solo_groups, grouped, excluded_users, requested_groups, combined_group_info)
+               grouped is a GroupedMembers dict; grouped.info maps each group name to its GroupInfo
     """
     solo_groups = []
-    grouped = defaultdict(list)
+    grouped = GroupedMembers()
     group_counter = 1
     
     # Create dynamic email mapping
@@ -1418,120 +2305,62 @@ def group_participants(data, column_mapping):
     user_tracking = {}
     original_count = len(data)
     
-    # Helper function to get value safely
-    def get_value(row, key, default=''):
-        if column_mapping and key in column_mapping:
-            if isinstance(row, dict):
-                return row.get(column_mapping[key], default)
-            else:
-                # For list format, we can't use column mapping
-                return default
-        else:
-            # Fallback to old format (list indices)
-            if isinstance(row, list):
-                if key == 'go_solo':
-                    return row[20] if len(row) > 20 else default
-                elif key == 'user_id':
-                    return row[0] if len(row) > 0 else default
-                elif key == 'gender_preference':
-                    return row[10] if len(row) > 10 else default
-                elif key == 'gender_identity':
-                    return row[3] if len(row) > 3 else default
-                elif key == 'sex':
-                    return row[7] if len(row) > 7 else default
-                elif key == 'residing_ph':
-                    return row[8] if len(row) > 8 else default
-                elif key == 'country':
-                    return row[16] if len(row) > 16 else default
-                elif key == 'province':
-                    return row[17] if len(row) > 17 else default
-                elif key == 'city':
-                    return row[18] if len(row) > 18 else default
-                elif key == 'state':
-                    return row[19] if len(row) > 19 else default
-            return default
-
-    def sort_by_goal_age(members):
-        """Sort members within a location bucket by goal then age, so similar
-        participants naturally cluster into the same groups of 5.
-        Location is always the primary bucket — this only reorders within it."""
-        goal_order = {
-            'bulking': 1, 'get_bigger': 1,
-            'maintain': 2, 'maintenance': 2, 'recomp': 2,
-            'lose_weight': 3, 'cut': 3, 'cutting': 3, 'weight_loss': 3,
-        }
-        age_order = {
-            'under 18': 1, '18-24': 2, '25-34': 3,
-            '35-44': 4, '45-54': 5, '55+': 6,
-        }
-
-        def sort_key(r):
-            goal = str(get_value(r, 'current_goal', '')).lower().strip()
-            age  = str(get_value(r, 'age_group',    '')).lower().strip()
-            return (
-                goal_order.get(goal, 99),   # known goals first, unknown last
-                age_order.get(age, 99),     # known ages first, unknown last
-                str(get_value(r, 'user_id', '')),  # stable tiebreaker
-            )
-
-        return sorted(members, key=sort_key)
+    # Pre-parse every row once into a typed participant record; all phases
+    # below work on these normalized fields
+    data = build_participants(data, column_mapping, email_mapping)
+
+    # Raw column value, only used for diagnostic text
+    def get_raw_value(participant, key, default=''):
+        if column_mapping and column_mapping.get(key) and isinstance(participant.row, Mapping):
+            return participant.row.get(column_mapping[key], default)
+        return default
 
     def sort_fillers_by_group(fillers, group_members):
         """Sort filler candidates so those sharing goal/age with the group come first."""
         if not group_members:
             return sort_by_goal_age(fillers)
         # Use the most common goal/age in the current group as the target
-        goals = [str(get_value(m, 'current_goal', '')).lower().strip() for m in group_members]
-        ages  = [str(get_value(m, 'age_group',    '')).lower().strip() for m in group_members]
-        target_goal = max(set(goals), key=goals.count) if goals else ''
-        target_age  = max(set(ages),  key=ages.count)  if ages  else ''
-
-        def filler_key(f):
-            f_goal = str(get_value(f, 'current_goal', '')).lower().strip()
-            f_age  = str(get_value(f, 'age_group',    '')).lower().strip()
-            return (
-                0 if f_goal == target_goal else 1,
-                0 if f_age  == target_age  else 1,
-                str(get_value(f, 'user_id', '')),
-            )
-
-        return sorted(fillers, key=filler_key)
+        # (ties go to the first one in the group, so the result does not
+        # depend on set order / PYTHONHASHSEED)
+        goals = [m.goal for m in group_members]
+        ages  = [m.age_group for m in group_members]
+        target_goal = max(dict.fromkeys(goals), key=goals.count) if goals else ''
+        target_age  = max(dict.fromkeys(ages),  key=ages.count)  if ages  else ''
+
+        return sorted(fillers, key=lambda f: (
+            0 if f.goal == target_goal else 1,
+            0 if f.age_group == target_age else 1,
+            f.user_id,
+        ))
 
     # Initialize tracking for all users
-    for i, row in enumerate(data):
-        user_id = get_value(row, 'user_id', f'Row_{i}')
+    for i, participant in enumerate(data):
         # Convert user_id to string for consistent comparison
-        user_id_str = str(user_id).strip() if user_id else f'Row_{i}'
-        email = get_value(row, 'email', '')
+        user_id_str = participant.user_id or f'Row_{i}'
         user_tracking[user_id_str] = {
-            'email': email,
+            'email': get_raw_value(participant, 'email', ''),
             'status': 'original',
             'reason': 'Initial data',
-            'row_data': row
+            'row_data': participant.row
         }
     
     # Filter out participants where joiningAsStudent is False (but keep NaN/missing values)
     excluded_users = []  # Track excluded users to include them later
     if column_mapping and 'joining_as_student' in column_mapping:
-        joining_col = column_mapping['joining_as_student']
         # Keep participants where joiningAsStudent is True or NaN/missing
         filtered_data = []
         excluded_count = 0
-        for row in data:
-            user_id = get_value(row, 'user_id', 'Unknown')
-            joining_value = get_value(row, 'joining_as_student', 'True')
-            # Convert to string and check if it's explicitly False
-            joining_str = str(joining_value).strip().lower()
-            if joining_str in ['false', '0', '0.0', 'no']:
+        for participant in data:
+            if participant.excluded:
                 excluded_count += 1
-                excluded_users.append(row)  # Add to excluded list
-                user_id_str = str(user_id).strip() if user_id else 'Unknown'
+                excluded_users.append(participant)  # Add to excluded list
+                user_id_str = participant.user_id or 'Unknown'
                 if user_id_str in user_tracking:
                     user_tracking[user_id_str]['status'] = 'excluded'
-                    user_tracking[user_id_str]['reason'] = f'joiningAsStudent = {joining_value}'
+                    user_tracking[user_id_str]['reason'] = f"joiningAsStudent = {get_raw_value(participant, 'joining_as_student', 'True')}"
             else:
                 # Keep if True, NaN, or any other value (including missing)
-                filtered_data.append(row)
+                filtered_data.append(participant)
         
         data = filtered_data
     
@@ -1543,123 +2372,59 @@ def group_participants(data, column_mapping):
     requested_groups = []
     accountability_count = 0
     
-    # First pass: collect all participants with non-empty accountabilityBuddies
+    # Email -> participant / requested-group index, kept up to date as groups form
+    membership = MembershipIndex(p for p in data if p.email and '@' in p.email)
+
+    def add_requested_group(members):
+        requested_groups.append(members)
+        membership.add_group(members)
+
+    # Buddy graph: every accountability_buddies field is parsed exactly once here,
+    # and forward/reverse edges are indexed for all later Phase 1 steps
+    buddy_graph = BuddyGraph(known_emails=membership.participants)
+
+    # First pass: collect all participants with has_accountability_buddies set
     accountability_participants = []
-    for row in data:
-        accountability_buddies = get_value(row, 'accountability_buddies', '')
-        has_accountability_buddies = get_value(row, 'has_accountability_buddies', '0')
-        user_id = get_value(row, 'user_id', 'Unknown')
-        
-        # Check if has_accountability_buddies is True/1
-        has_buddies = str(has_accountability_buddies).strip().lower() in ['1', '1.0', 'true', 'yes']
-        
-        # Check if accountability_buddies field has valid data
-        has_buddy_data = False
-        if accountability_buddies:
-            accountability_str = str(accountability_buddies).strip()
-            # Check if it's not empty and not just None values
-            if accountability_str not in ['', 'None', 'nan', '[None]', '[None, None]', "{'1': None}"]:
-                # For string representations of lists, check if there are actual email addresses
-                emails = extract_emails_from_accountability_buddies(accountability_buddies, email_mapping)
-                has_buddy_data = len(emails) > 0
-        
+    accountability_emails = set()
+    for participant in data:
+        if participant.accountability_buddies:
+            buddy_graph.add_request(participant.email, extract_emails_from_accountability_buddies(participant.accountability_buddies, email_mapping))
+
         # Include users with has_buddies=True, even if they don't have buddy data (they might be referenced by others)
-        if has_buddies:
-            accountability_participants.append(row)
-            user_id_str = str(user_id).strip() if user_id else 'Unknown'
+        if participant.has_buddies:
+            accountability_participants.append(participant)
+            accountability_emails.add(participant.email)
+            user_id_str = participant.user_id or 'Unknown'
             if user_id_str in user_tracking:
                 user_tracking[user_id_str]['status'] = 'accountability_buddies'
                 user_tracking[user_id_str]['reason'] = 'Has accountability buddies'
-    
+
     # Second pass: collect users who are referenced as buddies by others
-    referenced_buddies = set()
-    for row in data:
-        accountability_buddies = get_value(row, 'accountability_buddies', '')
-        if accountability_buddies:
-            emails = extract_emails_from_accountability_buddies(accountability_buddies, email_mapping)
-            referenced_buddies.update(emails)
-    
+    referenced_buddies = buddy_graph.referenced_emails()
+
     # Add users who are referenced as buddies but not already in accountability_participants
-    for row in data:
-        user_email = normalize_email(get_value(row, 'email', ''), email_mapping)
-        user_id = get_value(row, 'user_id', 'Unknown')
+    for participant in data:
+        user_email = participant.email
         
         if user_email in referenced_buddies:
             # Check if this user is already in accountability_participants
-            already_included = any(
-                normalize_email(get_value(acc_user, 'email', ''), email_mapping) == user_email 
-                for acc_user in accountability_participants
-            )
-            
-            if not already_included:
-                accountability_participants.append(row)
-                user_id_str = str(user_id).strip() if user_id else 'Unknown'
+            if user_email not in accountability_emails:
+                accountability_participants.append(participant)
+                accountability_emails.add(user_email)
+                user_id_str = participant.user_id or 'Unknown'
                 if user_id_str in user_tracking:
                     user_tracking[user_id_str]['status'] = 'accountability_buddies'
                     user_tracking[user_id_str]['reason'] = 'Referenced as buddy by others'
     
-    # Create a mapping of email to user data for quick lookup
-    email_to_user = {}
-    for row in data:
-        # Use the column mapping to find email
-        email = get_value(row, 'email', '')
-
-        if email and '@' in email:
-            normalized_email = normalize_email(email, email_mapping)
-            email_to_user[normalized_email] = row
-    
     # Pre-process: Group users with mutual buddies and their referenced buddies
     # Use a more comprehensive approach to find all connected groups
     mutual_buddy_groups = []
     processed_users = set()
     assigned_users = set()  # Track users already assigned to requested groups
     
-    # Create a graph of all accountability buddy relationships
-    buddy_graph = {}
+    # Link accountability participants in the buddy graph (forward + reverse edges in one pass)
     for participant in accountability_participants:
-        participant_email = normalize_email(get_value(participant, 'email', ''), email_mapping)
-        accountability_buddies = get_value(participant, 'accountability_buddies', '')
-        requested_emails = extract_emails_from_accountability_buddies(accountability_buddies, email_mapping)
-        
-        if participant_email not in buddy_graph:
-            buddy_graph[participant_email] = set()
-        
-        # Add direct references
-        for email in requested_emails:
-            if email in email_to_user:
-                buddy_graph[participant_email].add(email)
-        
-        # Also add reverse references (users who reference this participant)
-        for other_participant in accountability_participants:
-            other_email = normalize_email(get_value(other_participant, 'email', ''), email_mapping)
-            other_buddies = get_value(other_participant, 'accountability_buddies', '')
-            other_requested_emails = extract_emails_from_accountability_buddies(other_buddies, email_mapping)
-            
-            if participant_email in other_requested_emails:
-                if other_email not in buddy_graph:
-                    buddy_graph[other_email] = set()
-                buddy_graph[other_email].add(participant_email)
-    
-    # Find all connected components using DFS
-    def find_connected_component(start_email, visited):
-        """Find all emails connected to start_email through buddy relationships"""
-        if start_email in visited:
-            return set()
-        
-        visited.add(start_email)
-        component = {start_email}
-        
-        if start_email in buddy_graph:
-            for buddy_email in buddy_graph[start_email]:
-                if buddy_email in email_to_user:  # Only include emails that exist in our data
-                    component.update(find_connected_component(buddy_email, visited))
-        
-        # Also check for reverse connections (users who reference this email)
-        for other_email, buddies in buddy_graph.items():
-            if start_email in buddies and other_email not in visited:
-                component.update(find_connected_component(other_email, visited))
-        
-        return component
+        buddy_graph.add_participant(participant.email)
     
     def split_large_component_by_direct_connections(connected_emails, max_group_size=7):
         """
@@ -1669,7 +2434,7 @@ def group_participants(data, column_mapping):
         into smaller groups to ensure manageable group sizes.
 
         Args:
-            connected_emails: Set of emails in the connected component
+            connected_emails: Emails in the connected component (deterministic order)
             max_group_size: Maximum allowed group size (default 7)
 
         Returns:
@@ -1687,86 +2452,56 @@ def group_participants(data, column_mapping):
 
         return final_groups
     
-    # Alternative approach: ensure all referenced users are included
-    def ensure_referenced_users_included():
-        """Ensure that all users who are referenced by others are included in the same groups"""
-        # Create a mapping of referenced users to their referrers
-        referenced_to_referrers = {}
-        for email, buddies in buddy_graph.items():
-            for buddy_email in buddies:
-                if buddy_email in email_to_user:
-                    if buddy_email not in referenced_to_referrers:
-                        referenced_to_referrers[buddy_email] = set()
-                    referenced_to_referrers[buddy_email].add(email)
-        
-        # For each referenced user, ensure they're in the same group as their referrers
-        for referenced_email, referrers in referenced_to_referrers.items():
-            if referenced_email not in buddy_graph:  # User has no outgoing edges
-                # Add this user to the buddy graph with connections to all referrers
-                if referenced_email not in buddy_graph:
-                    buddy_graph[referenced_email] = set()
-                buddy_graph[referenced_email].update(referrers)
-    
-    # Call the function to ensure referenced users are included
-    ensure_referenced_users_included()
-    
-    # Find all connected components
-    visited = set()
-    for participant in accountability_participants:
-        participant_email = normalize_email(get_value(participant, 'email', ''), email_mapping)
-        
-        if participant_email not in visited:
-            # Find all users connected to this participant
-            connected_emails = find_connected_component(participant_email, visited)
-            
-            if len(connected_emails) > 1:
-                # Split large components into smaller groups prioritizing direct connections
-                if len(connected_emails) > 7:
-                    # Use the splitting function for large components
-                    email_groups = split_large_component_by_direct_connections(connected_emails, max_group_size=7)
-                    
-                    for email_group in email_groups:
-                        if len(email_group) > 1:
-                            mutual_group = []
-                            for email in email_group:
-                                if email in email_to_user:
-                                    user = email_to_user[email]
-                                    mutual_group.append(user)
-                                    processed_users.add(email)
-                            
-                            if len(mutual_group) > 1:
-                                mutual_buddy_groups.append(mutual_group)
-                else:
-                    # For smaller components, create a single group as before
-                    mutual_group = []
-                    for email in connected_emails:
-                        if email in email_to_user:
-                            user = email_to_user[email]
-                            mutual_group.append(user)
-                            processed_users.add(email)
-                    
-                    if len(mutual_group) > 1:
-                        mutual_buddy_groups.append(mutual_group)
+    # Find all connected components (union-find, deterministic participant order)
+    for connected_emails in buddy_graph.connected_components():
+        if len(connected_emails) > 1:
+            # Split large components into smaller groups prioritizing direct connections
+            if len(connected_emails) > 7:
+                # Use the splitting function for large components
+                email_groups = split_large_component_by_direct_connections(connected_emails, max_group_size=7)
+                
+                for email_group in email_groups:
+                    if len(email_group) > 1:
+                        mutual_group = []
+                        for email in email_group:
+                            if email in membership:
+                                user = membership.get(email)
+                                mutual_group.append(user)
+                                processed_users.add(email)
+                        
+                        if len(mutual_group) > 1:
+                            mutual_buddy_groups.append(mutual_group)
             else:
-                # Single user - mark as processed but don't create a group yet
-                processed_users.add(participant_email)
+                # For smaller components, create a single group as before
+                mutual_group = []
+                for email in connected_emails:
+                    if email in membership:
+                        user = membership.get(email)
+                        mutual_group.append(user)
+                        processed_users.add(email)
+                
+                if len(mutual_group) > 1:
+                    mutual_buddy_groups.append(mutual_group)
+        else:
+            # Single user - mark as processed but don't create a group yet
+            processed_users.update(connected_emails)
     
     # Process mutual buddy groups first
     for mutual_group in mutual_buddy_groups:
         if len(mutual_group) > 1:
             # Create a group for these mutual buddies
-            requested_groups.append(mutual_group)
+            add_requested_group(mutual_group)
             accountability_count += len(mutual_group)
             
             # Mark all members as assigned
             for member in mutual_group:
-                member_email = normalize_email(get_value(member, 'email', ''), email_mapping)
+                member_email = member.email
                 assigned_users.add(member_email)
     
     # Process remaining accountability participants (those not in mutual groups)
     remaining_participants = []
     for participant in accountability_participants:
-        participant_email = normalize_email(get_value(participant, 'email', ''), email_mapping)
+        participant_email = participant.email
         if participant_email not in assigned_users:
             remaining_participants.append(participant)
     
@@ -1774,12 +2509,10 @@ def group_participants(data, column_mapping):
     processed_requests = set()  # Track processed requests to avoid duplicates
     
     for participant in remaining_participants:
-        accountability_buddies = get_value(participant, 'accountability_buddies', '')
-        user_id = get_value(participant, 'user_id', 'Unknown')
-        participant_email = normalize_email(get_value(participant, 'email', ''), email_mapping)
+        participant_email = participant.email
         
-        # Clean and extract emails from accountabilityBuddies
-        requested_emails = extract_emails_from_accountability_buddies(accountability_buddies, email_mapping)
+        # Requested buddy emails were parsed once when the buddy graph was built
+        requested_emails = buddy_graph.requested_emails(participant_email)
         
         if requested_emails:
             # Create a unique key for this request to avoid duplicates
@@ -1794,20 +2527,18 @@ def group_participants(data, column_mapping):
                 existing_group_with_buddies = None
                 
                 for email in requested_emails:
-                    if email in email_to_user:
-                        buddy_user = email_to_user[email]
-                        buddy_email = normalize_email(get_value(buddy_user, 'email', ''), email_mapping)
+                    if email in membership:
+                        buddy_user = membership.get(email)
+                        buddy_email = buddy_user.email
                         
                         # Check if this buddy is already assigned to a requested group
                         if buddy_email in assigned_users:
                             buddies_in_existing_groups.append(email)
                             
                             # Find which existing group contains this buddy
-                            for i, existing_group in enumerate(requested_groups):
-                                existing_emails = [normalize_email(get_value(member, 'email', ''), email_mapping) for member in existing_group]
-                                if buddy_email in existing_emails:
-                                    existing_group_with_buddies = i
-                                    break
+                            buddy_group_id = membership.group_id(buddy_email)
+                            if buddy_group_id is not None:
+                                existing_group_with_buddies = buddy_group_id
                         else:
                             available_buddies.append(email)
                     else:
@@ -1820,21 +2551,21 @@ def group_participants(data, column_mapping):
                     # Check if the group has space (max 5 members)
                     if len(existing_group) < 5:
                         # Check if participant is already in the group to prevent duplicates
-                        participant_email_normalized = normalize_email(get_value(participant, 'email', ''), email_mapping)
-                        existing_emails = [normalize_email(get_value(member, 'email', ''), email_mapping) for member in existing_group]
-                        if participant_email_normalized not in existing_emails:
+                        if not membership.in_group(existing_group_with_buddies, participant_email):
                             # Add participant to existing group
                             existing_group.append(participant)
+                            membership.add_to_group(existing_group_with_buddies, participant)
                             assigned_users.add(participant_email)
                             accountability_count += 1
                             
                             # Also add any available buddies to the same group if there's space
                             for email in available_buddies:
-                                if email in email_to_user:
-                                    buddy_user = email_to_user[email]
-                                    buddy_email = normalize_email(get_value(buddy_user, 'email', ''), email_mapping)
+                                if email in membership:
+                                    buddy_user = membership.get(email)
+                                    buddy_email = buddy_user.email
                                     if buddy_email not in assigned_users and len(existing_group) < 5:
                                         existing_group.append(buddy_user)
+                                        membership.add_to_group(existing_group_with_buddies, buddy_user)
                                         assigned_users.add(buddy_email)
                                         accountability_count += 1
                         
@@ -1845,15 +2576,15 @@ def group_participants(data, column_mapping):
                         
                         # Add any available buddies
                         for email in available_buddies:
-                            if email in email_to_user:
-                                buddy_user = email_to_user[email]
-                                buddy_email = normalize_email(get_value(buddy_user, 'email', ''), email_mapping)
+                            if email in membership:
+                                buddy_user = membership.get(email)
+                                buddy_email = buddy_user.email
                                 if buddy_email not in assigned_users:
                                     group_members.append(buddy_user)
                                     assigned_users.add(buddy_email)
                         
                         if group_members:
-                            requested_groups.append(group_members)
+                            add_requested_group(group_members)
                             accountability_count += len(group_members)
                             
                 
@@ -1863,26 +2594,26 @@ def group_participants(data, column_mapping):
                     group_members = [participant]  # Start with the requester
                     assigned_users.add(participant_email)  # Mark requester as assigned
                     
+                    group_emails = {participant_email}
                     found_buddies = []
                     missing_buddies = []
                     
                     for email in available_buddies:
-                        buddy_user = email_to_user[email]
-                        buddy_email = normalize_email(get_value(buddy_user, 'email', ''), email_mapping)
+                        buddy_user = membership.get(email)
+                        buddy_email = buddy_user.email
                         
                         # Check if buddy is already in the group to prevent duplicates
-                        if buddy_email not in [normalize_email(get_value(member, 'email', ''), email_mapping) for member in group_members]:
+                        if buddy_email not in group_emails:
                             group_members.append(buddy_user)
+                            group_emails.add(buddy_email)
                             assigned_users.add(buddy_email)  # Mark buddy as assigned
                             found_buddies.append(email)
                     
                     # Add missing buddies to the list
-                    for email in requested_emails:
-                        if email not in email_to_user:
-                            missing_buddies.append(email)
+                    missing_buddies.extend(buddy_graph.missing_buddies(participant_email))
                     
                     if group_members:
-                        requested_groups.append(group_members)
+                        add_requested_group(group_members)
                         accountability_count += len(group_members)
                         
                 
@@ -1893,13 +2624,13 @@ def group_participants(data, column_mapping):
                     assigned_users.add(participant_email)
                     
                     if group_members:
-                        requested_groups.append(group_members)
+                        add_requested_group(group_members)
                         accountability_count += len(group_members)
     
     # Final pass: ensure all remaining accountability participants are assigned to groups
     # This catches any users that might have been missed in the previous processing
     for participant in remaining_participants:
-        participant_email = normalize_email(get_value(participant, 'email', ''), email_mapping)
+        participant_email = participant.email
         
         # Skip if already assigned
         if participant_email in assigned_users:
@@ -1908,7 +2639,7 @@ def group_participants(data, column_mapping):
         # Create a solo group for this user
         group_members = [participant]
         assigned_users.add(participant_email)
-        requested_groups.append(group_members)
+        add_requested_group(group_members)
         accountability_count += 1
 
     
@@ -1916,14 +2647,17 @@ def group_participants(data, column_mapping):
     # But keep users who have accountability_buddies specified in requested groups
     single_member_requested_groups = []
     multi_member_requested_groups = []
+
+    # First tracking entry for each email (tracking keeps the raw email value)
+    tracking_by_email = {}
+    for info in user_tracking.values():
+        tracking_by_email.setdefault(info.get('email'), info)
     
     for group in requested_groups:
         if len(group) == 1:
             user = group[0]
-            accountability_buddies = get_value(user, 'accountability_buddies', '')
-            
             # If user has accountability_buddies specified (not empty), keep in requested groups
-            if accountability_buddies and str(accountability_buddies).strip() not in ['', 'None', 'nan', 'NaN']:
+            if user.has_buddy_field:
                 # Keep in requested groups
                 multi_member_requested_groups.append(group)
             else:
@@ -1931,12 +2665,11 @@ def group_participants(data, column_mapping):
                 single_member_requested_groups.append(user)
 
                 # Update user tracking
-                user_email = normalize_email(get_value(user, 'email', ''), email_mapping)
-                for user_id, info in user_tracking.items():
-                    if info.get('email') == user_email:
-                        info['status'] = 'regular_grouping'
-                        info['reason'] = 'Moved from single-member requested group to regular grouping'
-                        break
+                user_email = user.email
+                info = tracking_by_email.get(user_email)
+                if info is not None:
+                    info['status'] = 'regular_grouping'
+                    info['reason'] = 'Moved from single-member requested group to regular grouping'
 
                 # Remove from assigned_users so they can go through regular grouping
                 assigned_users.discard(user_email)
@@ -1955,29 +2688,29 @@ def group_participants(data, column_mapping):
     solo_count = 0
     # Remove accountability participants and already assigned users from data for solo processing
     remaining_data = []
+    remaining_emails = set()
     for row in data:
-        user_email = normalize_email(get_value(row, 'email', ''), email_mapping)
+        user_email = row.email
         # Skip if user is already assigned to requested groups
         if user_email not in assigned_users:
             remaining_data.append(row)
+            remaining_emails.add(user_email)
     
     # Add single-member requested group users to remaining_data for processing
     for user in single_member_requested_groups:
-        user_email = normalize_email(get_value(user, 'email', ''), email_mapping)
+        user_email = user.email
         # Only add if not already in remaining_data
-        if not any(normalize_email(get_value(row, 'email', ''), email_mapping) == user_email for row in remaining_data):
+        if user_email not in remaining_emails:
             remaining_data.append(user)
+            remaining_emails.add(user_email)
     
     for row in remaining_data:
-        go_solo_value = str(get_value(row, 'go_solo', '0')).strip()
-        user_id = get_value(row, 'user_id', 'Unknown')
-        user_email = normalize_email(get_value(row, 'email', ''), email_mapping)
-        # Handle various formats: '1', '1.0', 'True', 'true'
-        if go_solo_value.lower() in ['1', '1.0', 'true']:
+        # go_solo accepts '1', '1.0', 'True', 'true'
+        if row.go_solo:
             solo_groups.append([row])
             solo_count += 1
-            assigned_users.add(user_email)  # Mark as assigned
-            user_id_str = str(user_id).strip() if user_id else 'Unknown'
+            assigned_users.add(row.email)  # Mark as assigned
+            user_id_str = row.user_id or 'Unknown'
             if user_id_str in user_tracking:
                 user_tracking[user_id_str]['status'] = 'solo'
                 user_tracking[user_id_str]['reason'] = 'go_solo = True'
@@ -1992,7 +2725,7 @@ def group_participants(data, column_mapping):
     # 4. International: Country → State → Timezone regions
     # 5. Optimize group sizes (3-5 members per group)
 
-    non_solo = [row for row in remaining_data if str(get_value(row, 'go_solo', '0')).strip().lower() not in ['1', '1.0', 'true']]
+    non_solo = [row for row in remaining_data if not row.go_solo]
 
     # ============================================================================
     # STEP 1: PRIORITY GROUPING - Same Gender First, Females First
@@ -2008,8 +2741,8 @@ def group_participants(data, column_mapping):
     }
 
     for row in non_solo:
-        sex = str(get_value(row, 'sex', '')).lower()
-        gender_pref = str(get_value(row, 'gender_preference', '')).lower()
+        sex = row.sex
+        gender_pref = row.gender_preference
 
         # Only process female/male (ignore other genders for now)
         if sex in ['female', 'male']:
@@ -2027,33 +2760,10 @@ def group_participants(data, column_mapping):
         # Group same_gender participants by location first
         location_groups = defaultdict(list)
 
-        # Separate by Philippines vs International
+        # Bucket by Participant.location_key: MM -> same city, rest of PH ->
+        # same province, international -> country + state
         for participant in same_gender_participants:
-            ph_val = str(get_value(participant, 'residing_ph', '0')).strip().lower()
-            if ph_val in ['1', '1.0', 'true', 'yes', 'ph', 'philippines']:
-                # Philippines: different grouping for MM vs outside MM
-                province = str(get_value(participant, 'province', '')).strip()
-                city = str(get_value(participant, 'city', '')).strip()
-                if province.lower() in ['metro manila', 'mm']:
-                    # In MM, group only same city
-                    location_key = f"PH_MM_{city}"
-                else:
-                    # Outside MM, group only same province
-                    location_key = f"PH_{province}"
-            else:
-                # International: group by country + internationalState if exists, else just country
-                country = str(get_value(participant, 'country', '')).strip()
-                if 'internationalState' in column_mapping and column_mapping['internationalState']:
-                    int_state = str(get_value(participant, 'internationalState', '')).strip()
-                    if int_state:
-                        location_key = f"INT_{country}_{int_state}"
-                    else:
-                        location_key = f"INT_{country}"
-                else:
-                    state = str(get_value(participant, 'state', '')).strip()
-                    location_key = f"INT_{country}_{state}"
-
-            location_groups[location_key].append(participant)
+            location_groups[participant.location_key].append(participant)
 
         # Process each location group - create groups of 5 same_gender participants
         for location_key, participants in location_groups.items():
@@ -2072,27 +2782,7 @@ def group_participants(data, column_mapping):
                     # Find no_preference participants from same location
                     available_fillers = []
                     for filler in no_preference_participants:
-                        ph_val = str(get_value(filler, 'residing_ph', '0')).strip().lower()
-                        if ph_val in ['1', '1.0', 'true', 'yes', 'ph', 'philippines']:
-                            filler_province = str(get_value(filler, 'province', '')).strip()
-                            filler_city = str(get_value(filler, 'city', '')).strip()
-                            if filler_province.lower() in ['metro manila', 'mm']:
-                                filler_location = f"PH_MM_{filler_city}"
-                            else:
-                                filler_location = f"PH_{filler_province}"
-                        else:
-                            filler_country = str(get_value(filler, 'country', '')).strip()
-                            if 'internationalState' in column_mapping and column_mapping['internationalState']:
-                                filler_int_state = str(get_value(filler, 'internationalState', '')).strip()
-                                if filler_int_state:
-                                    filler_location = f"INT_{filler_country}_{filler_int_state}"
-                                else:
-                                    filler_location = f"INT_{filler_country}"
-                            else:
-                                filler_state = str(get_value(filler, 'state', '')).strip()
-                                filler_location = f"INT_{filler_country}_{filler_state}"
-
-                        if filler_location == location_key:
+                        if filler.location_key == location_key:
                             available_fillers.append(filler)
 
                     # Sort fillers so those matching the group's goal/age come first
@@ -2112,22 +2802,27 @@ def group_participants(data, column_mapping):
                     if len(parts) >= 3:
                         province, city = parts[1], parts[2]
                         location_info = f"Province: {province}, City: {city}"
+                        info = GroupInfo('mm', current_sex, 'Philippines', province, city, '', 'philippines')
                     else:
                         location_info = f"Province: {parts[1]}"
+                        info = GroupInfo('province', current_sex, 'Philippines', parts[1], '', '', 'philippines')
                 else:  # INT_
                     parts = location_key.split('_', 2)
+                    timezone = participant_timezone(group_members[0])
                     if len(parts) >= 3:
                         country, state = parts[1], parts[2]
                         location_info = f"Country: {country}, State: {state}"
+                        info = GroupInfo('country', current_sex, country, '', '', state, timezone)
                     else:
                         location_info = "International"
+                        info = GroupInfo('international', current_sex, parts[1], '', '', '', timezone)
 
                 group_name = f"Group {group_counter} ({current_sex}, same_gender, {location_info})"
-                grouped[group_name] = group_members
+                grouped.add(group_name, group_members, info)
 
                 # Mark all members as assigned
                 for member in group_members:
-                    member_email = normalize_email(get_value(member, 'email', ''), email_mapping)
+                    member_email = member.email
                     assigned_users.add(member_email)
 
                 group_counter += 1
@@ -2145,7 +2840,7 @@ def group_participants(data, column_mapping):
     # with regular algorithmic grouping
     remaining_participants = []
     for row in non_solo:
-        user_email = normalize_email(get_value(row, 'email', ''), email_mapping)
+        user_email = row.email
         if user_email not in assigned_users:
             remaining_participants.append(row)
 
@@ -2158,16 +2853,14 @@ def group_participants(data, column_mapping):
     gender_pref_groups = defaultdict(list)
 
     for row in remaining_participants:
-        gender_pref = str(get_value(row, 'gender_preference', '')).lower()
-        user_id = get_value(row, 'user_id', 'Unknown')
+        gender_pref = row.gender_preference
 
         # Determine grouping key based on gender preferences
         if gender_pref == 'same_gender':
             # STRICT GENDER SEPARATION: Same biological sex only
-            sex = str(get_value(row, 'sex', '')).lower()
-            gender_identity = str(get_value(row, 'gender_identity', '')).upper()
+            sex = row.sex
 
-            if gender_identity == 'LGBTQ+':
+            if row.gender_identity == 'lgbtq+':
                 # LGBTQ+ participants grouped by biological sex for same-gender preference
                 gender_key = f"lgbtq+_{sex}"
             else:
@@ -2182,231 +2875,39 @@ def group_participants(data, column_mapping):
 
         gender_pref_groups[gender_key].append(row)
 
-    # Step 5: Within each gender group, apply geographic grouping
-    non_ph_rows = []  # accumulates all international rows across gender groups
+    # Step 5: Within each gender group, apply geographic grouping.
+    # Every province / country / North America block is an independent task;
+    # tasks run in order (or in a process pool) and group numbers are assigned
+    # afterwards in task order, so names never depend on execution order.
+    has_international_state = bool(column_mapping.get('internationalState'))
+    bucket_tasks = []
     for gender_key, rows in gender_pref_groups.items():
-        # Separate Philippines vs International residents
-        ph_rows = []
-        loop_non_ph_rows = []
-        
-        for r in rows:
-            ph_val = str(get_value(r, 'residing_ph', '0')).strip().lower()
-            if ph_val in ['1', '1.0', 'true', 'yes', 'ph', 'philippines']:
-                ph_rows.append(r)
-            elif ph_val in ['0', '0.0', 'false', 'no']:
-                loop_non_ph_rows.append(r)
-            else:
-                # For unknown values, treat as international
-                loop_non_ph_rows.append(r)
-        non_ph_rows.extend(loop_non_ph_rows)
-        
-    # PHILIPPINES GROUPING: Province → City (hard boundaries — cities never mixed together,
-    # MM never mixed with other Luzon provinces)
-        province_groups = defaultdict(list)
-        for r in ph_rows:
-            province = get_value(r, 'province', 'Unknown Province')
-            province_norm = province.strip().lower() if isinstance(province, str) else str(province).strip().lower()
-            province_groups[province_norm].append(r)
-
-        # Sort provinces by PH region (Luzon → Visayas → Mindanao → unknown)
-        sorted_provinces = []
-        for province_norm, province_members in province_groups.items():
-            original_province = get_value(province_members[0], 'province', 'Unknown Province')
-            ph_region = get_philippines_region(original_province)
-            sorted_provinces.append((original_province, province_norm, province_members, ph_region))
-
-        region_order = {'luzon': 1, 'visayas': 2, 'mindanao': 3, 'unknown': 4}
-        sorted_provinces.sort(key=lambda x: (region_order.get(x[3], 5), str(x[0]).lower() if x[0] else ''))
-
-        for original_province, province_norm, province_members, ph_region in sorted_provinces:
-            province_display = 'MM' if province_norm in ['metro manila', 'mm'] else original_province
-
-            # Group by city
-            city_members = defaultdict(list)
-            for r in province_members:
-                city = get_value(r, 'city', 'Unknown City')
-                city_norm = city.strip().lower() if isinstance(city, str) else str(city).strip().lower()
-                city_members[city_norm].append(r)
-
-            province_remainder = []
-            for city_norm in sorted(city_members.keys()):
-                members = sort_by_goal_age(city_members[city_norm])
-                original_city = get_value(members[0], 'city', 'Unknown City')
-                location_info = f"Province: {province_display}, City: {original_city}"
-                i = 0
-                while i + 5 <= len(members):
-                    group_members = members[i:i+5]
-                    grouped[f"Group {group_counter} ({gender_key}, {location_info})"] = group_members
-                    for member in group_members:
-                        member_email = normalize_email(get_value(member, 'email', ''), email_mapping)
-                        assigned_users.add(member_email)
-                    group_counter += 1
-                    i += 5
-                # City remainder → province pool for cross-city merging within same province
-                if i < len(members):
-                    province_remainder.extend(members[i:])
-
-            # Merge city remainders within the same province (never cross-province)
-            if province_remainder:
-                province_remainder = sort_by_goal_age(province_remainder)
-                location_info = f"Province: {province_display}, Mixed Cities"
-                i = 0
-                while i + 5 <= len(province_remainder):
-                    group_members = province_remainder[i:i+5]
-                    grouped[f"Group {group_counter} ({gender_key}, {location_info})"] = group_members
-                    for member in group_members:
-                        member_email = normalize_email(get_value(member, 'email', ''), email_mapping)
-                        assigned_users.add(member_email)
-                    group_counter += 1
-                    i += 5
-                # Final province remainder — keep as-is, never merged with another province
-                if i < len(province_remainder):
-                    group_members = province_remainder[i:]
-                    grouped[f"Group {group_counter} ({gender_key}, {location_info})"] = group_members
-                    for member in group_members:
-                        member_email = normalize_email(get_value(member, 'email', ''), email_mapping)
-                        assigned_users.add(member_email)
-                    group_counter += 1
-
-    # INTERNATIONAL GROUPING
-    # - USA + Canada: proximity-based merging by shared timezone (Pacific/Mountain/Central/Eastern)
-    # - All other countries: never merged across country lines
-        if loop_non_ph_rows:
-            # Bucket by country, then by state within each country
-            country_buckets = defaultdict(lambda: defaultdict(list))
-            country_display_name = {}
-            na_rows_intl = []  # USA + Canada collected for timezone-based proximity merging
-
-            for r in loop_non_ph_rows:
-                country = get_value(r, 'country', 'Unknown Country')
-                country_raw = extract_country_from_field(country)
-                country_norm = normalize_country_name(country_raw)
-                country_display_name[country_norm] = country_raw
-
-                if 'internationalState' in column_mapping and column_mapping['internationalState']:
-                    int_state = str(get_value(r, 'internationalState', '')).strip()
-                else:
-                    int_state = ''
+        bucket_tasks.extend(plan_bucket_tasks(gender_key, rows, has_international_state))
 
-                if country_norm in NA_COUNTRIES:
-                    na_rows_intl.append((r, country_norm, int_state))
-                else:
-                    country_buckets[country_norm][int_state].append(r)
-
-            # ── Non-NA countries: no cross-country merging ───────────────────
-            for country_norm in sorted(country_buckets.keys()):
-                country_display = country_display_name.get(country_norm, country_norm)
-                state_buckets = country_buckets[country_norm]
-                country_remainder = []
-
-                for state_key in sorted(state_buckets.keys()):
-                    members = sort_by_goal_age(state_buckets[state_key])
-                    location_info = (f"Country: {country_display}, State: {state_key}"
-                                     if state_key else f"Country: {country_display}")
-                    i = 0
-                    while i + 5 <= len(members):
-                        group = members[i:i+5]
-                        grouped[f"Group {group_counter} ({gender_key}, {location_info})"] = group
-                        for member in group:
-                            member_email = normalize_email(get_value(member, 'email', ''), email_mapping)
-                            assigned_users.add(member_email)
-                        group_counter += 1
-                        i += 5
-                    country_remainder.extend(members[i:])
-
-                if country_remainder:
-                    country_remainder = sort_by_goal_age(country_remainder)
-                    has_states = any(k for k in state_buckets)
-                    location_info = (f"Country: {country_display}, Mixed States"
-                                     if has_states else f"Country: {country_display}")
-                    i = 0
-                    while i + 5 <= len(country_remainder):
-                        group = country_remainder[i:i+5]
-                        grouped[f"Group {group_counter} ({gender_key}, {location_info})"] = group
-                        for member in group:
-                            member_email = normalize_email(get_value(member, 'email', ''), email_mapping)
-                            assigned_users.add(member_email)
-                        group_counter += 1
-                        i += 5
-                    if i < len(country_remainder):
-                        group = country_remainder[i:]
-                        grouped[f"Group {group_counter} ({gender_key}, {location_info})"] = group
-                        for member in group:
-                            member_email = normalize_email(get_value(member, 'email', ''), email_mapping)
-                            assigned_users.add(member_email)
-                        group_counter += 1
-
-            # ── USA + Canada: timezone proximity merging ─────────────────────
-            if na_rows_intl:
-                # Step 1: full groups of 5 per state/province
-                na_state_buckets = defaultdict(list)  # (country_norm, state) -> members
-                for r, country_norm, int_state in na_rows_intl:
-                    na_state_buckets[(country_norm, int_state)].append(r)
-
-                na_tz_remainder = defaultdict(list)  # timezone -> members that didn't fill a group
-
-                for (country_norm, state_key), members in sorted(na_state_buckets.items()):
-                    country_display = country_display_name.get(country_norm, country_norm).title()
-                    members = sort_by_goal_age(members)
-                    location_info = (f"Country: {country_display}, State: {state_key}"
-                                     if state_key else f"Country: {country_display}")
-                    i = 0
-                    while i + 5 <= len(members):
-                        group = members[i:i+5]
-                        grouped[f"Group {group_counter} ({gender_key}, {location_info})"] = group
-                        for member in group:
-                            member_email = normalize_email(get_value(member, 'email', ''), email_mapping)
-                            assigned_users.add(member_email)
-                        group_counter += 1
-                        i += 5
-                    if i < len(members):
-                        tz = get_na_timezone(country_norm, state_key)
-                        na_tz_remainder[tz].extend(members[i:])
-
-                # Step 2: merge remainders by shared timezone, ordered by city proximity
-                na_global_remainder = []
-                for tz in ['pacific', 'mountain', 'central', 'eastern', 'other']:
-                    raw = na_tz_remainder.get(tz, [])
-                    if not raw:
-                        continue
-                    # Sort by goal/age first, then re-order by proximity within that sorted list
-                    raw = sort_by_goal_age(raw)
-                    members = proximity_sort(
-                        raw,
-                        get_city_fn=lambda m: get_value(m, 'internationalCity', '') or get_value(m, 'city', ''),
-                        get_state_fn=lambda m: get_value(m, 'internationalState', '') or get_value(m, 'state', ''),
-                    )
-                    tz_label = tz.title()
-                    location_info = f"NA ({tz_label} Time)"
-                    i = 0
-                    while i + 5 <= len(members):
-                        group = members[i:i+5]
-                        grouped[f"Group {group_counter} ({gender_key}, {location_info})"] = group
-                        for member in group:
-                            member_email = normalize_email(get_value(member, 'email', ''), email_mapping)
-                            assigned_users.add(member_email)
-                        group_counter += 1
-                        i += 5
-                    na_global_remainder.extend(members[i:])
-
-                # Step 3: NA-wide mix — apply proximity sort one final time
-                na_global_remainder = proximity_sort(
-                    sort_by_goal_age(na_global_remainder),
-                    get_city_fn=lambda m: get_value(m, 'internationalCity', '') or get_value(m, 'city', ''),
-                    get_state_fn=lambda m: get_value(m, 'internationalState', '') or get_value(m, 'state', ''),
-                )
-                i = 0
-                while i < len(na_global_remainder):
-                    group = na_global_remainder[i:i+5]
-                    grouped[f"Group {group_counter} ({gender_key}, NA Mixed)"] = group
-                    for member in group:
-                        member_email = normalize_email(get_value(member, 'email', ''), email_mapping)
-                        assigned_users.add(member_email)
-                    group_counter += 1
-                    i += 5
+    for gender_key, location_info, info, group_members in run_bucket_tasks(bucket_tasks, workers):
+        grouped.add(f"Group {group_counter} ({gender_key}, {location_info})", group_members, info)
+        for member in group_members:
+            assigned_users.add(member.email)
+        group_counter += 1
 
     # Merge small groups based on geographic proximity
     # grouped = merge_small_groups(grouped, column_mapping, email_mapping)
+
+    # ============================================================================
+    # STEP 4: LOCAL-SEARCH OPTIMIZATION (optional)
+    # ============================================================================
+    # Swap members between groups with the same label to improve geography,
+    # goal, age and timezone fit; sizes and group names are unchanged
+    if optimizer:
+        objective = GroupObjective(
+            goal_fn=lambda m: GOAL_ORDER.get(m.goal, 99),
+            age_fn=lambda m: age_group_rank(m.age_group),
+            coords_fn=participant_coords,
+            timezone_fn=participant_timezone,
+        )
+        budget = OPTIMIZER_TIME_BUDGET if optimizer_time_budget is None else optimizer_time_budget
+        metrics = make_optimizer(optimizer, objective, time_budget=budget).optimize(grouped)
+        print_optimizer_metrics(metrics)
     
     # Generate diagnostic report
     generate_diagnostic_report(user_tracking, original_count, solo_groups, grouped, excluded_users, multi_member_requested_groups, column_mapping)
@@ -2420,54 +2921,176 @@ def group_participants(data, column_mapping):
     # Return the updated groups - use original requested groups without combining
     return solo_groups, grouped, excluded_users, multi_member_requested_groups, {}
 
-def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excluded_users=None, requested_groups=None, combined_group_info=None):
+# ============================================================================
+# EXPORT ROW MODEL
+# ============================================================================
+# save_to_excel renders a list of ExportGroup rows built once by
+# build_export_groups; the same rows feed the columnar exports in
+# assignment_tables.py.
+
+EXPORT_SLOTS = 7  # member column blocks on the Grouped Members sheet
+
+GROUPED_MEMBERS_HEADER = [
+    "Group Name",
+    "User ID 1", "Name 1", "Location 1", "Coach and Age 1",
+    "User ID 2", "Name 2", "Location 2", "Coach and Age 2",
+    "User ID 3", "Name 3", "Location 3", "Coach and Age 3",
+    "User ID 4", "Name 4", "Location 4", "Coach and Age 4",
+    "User ID 5", "Name 5", "Location 5", "Coach and Age 5",
+    "User ID 6", "Name 6", "Location 6", "Coach and Age 6",
+    "User ID 7", "Name 7", "Location 7", "Coach and Age 7",
+    "Gender Identity", "Sex", "Residing in PH", "Gender Preference", "Country", "Province", "City", "State",
+    "Previous Coach Name"
+]
+
+STYLE_VALUE_KEYS = ('sex', 'gender_identity', 'gender_preference', 'has_accountability_buddies',
+                    'current_goal', 'accountability_buddies')
+
+def member_style_values(member, column_mapping, safe=False, go_solo=False, is_excluded=False):
     """
-    Save all groups to formatted Excel file with color coding and structure.
-
-    OUTPUT STRUCTURE (by sheet row order):
-    1. Requested Groups (Accountability Buddies) - Green highlight if ≥5 members
-    2. Solo Groups - Individual participants
-    3. Regular Groups - Light blue highlight if ≥5 members + same location
-    4. Excluded Users - Participants who opted out (joiningAsStudent=False)
+    apply_color_to_cell keyword arguments for one member.
 
-    EXCEL COLUMNS:
-    - Group Name, User ID 1-7, Name 1-7, Location 1-7, Coach 1-7
-    - Gender Identity, Sex, Residing in PH, Gender Preference
-    - Country, Province, City, State, Previous Coach Name
+    Args:
+        member: Participant record
+        column_mapping: Column name mappings
+        safe: Read values with safe_get_value (NaN -> '', stripped) instead of raw .get
+        go_solo: Grey fill (solo participant)
+        is_excluded: Orange fill (not participating)
+    """
+    if safe:
+        values = {key: safe_get_value(member, column_mapping.get(key, ''), '') for key in STYLE_VALUE_KEYS}
+    else:
+        values = {key: member.get(column_mapping.get(key), '') for key in STYLE_VALUE_KEYS}
+    values['go_solo'] = go_solo
+    values['is_excluded'] = is_excluded
+    return values
 
-    VISUAL FORMATTING:
-    - User IDs: Sex-based fill colors (blue=male, pink=female)
-    - Special colors: Green fill for 'get_bigger' goal, maroon font for LGBTQ+
-    - Bold text: Same-gender preference groups
-    - Underlined text: Users with accountability buddies
-    - Group highlighting: Green (requested ≥5), Blue (regular ≥5 + same location)
+class ExportGroup:
+    """
+    One Grouped Members row: a group, its display values and its formatting.
+
+    Attributes:
+        group_id: 1-based row number among groups (sheet order)
+        group_type: 'requested', 'team', 'solo', 'regular' or 'excluded'
+        name: Group Name cell text
+        members: Members in display order
+        slots: (user_id, name, location, coach_with_age) per member
+        summary: Trailing first-member / coach columns
+        member_styles: apply_color_to_cell keyword arguments per member
+        highlight: Group Name fill color, or None
+    """
+
+    __slots__ = ('group_id', 'group_type', 'name', 'members', 'slots', 'summary', 'member_styles', 'highlight')
+
+    def __init__(self, group_type, name, members, column_mapping, summary, member_styles, highlight=None):
+        self.group_id = None
+        self.group_type = group_type
+        self.name = name
+        self.members = members
+        self.slots = [member_slot_values(member, column_mapping) for member in members]
+        self.summary = summary
+        self.member_styles = member_styles
+        self.highlight = highlight
+
+    def member_flags(self, index):
+        """Formatting flags for one member (what the cell colors and fonts encode)."""
+        style = self.member_styles[index]
+        flags = member_style_flags(style['gender_identity'], style['gender_preference'],
+                                   style['has_accountability_buddies'], style['accountability_buddies'])
+        flags['sex'] = str(style['sex']).lower().strip() if style['sex'] else ''
+        flags['bulking'] = bool(style['current_goal'] and str(style['current_goal']).lower() == 'bulking')
+        flags['solo'] = style['go_solo']
+        flags['excluded'] = style['is_excluded']
+        return flags
+
+def member_slot_values(member, column_mapping):
+    """User ID, display name, location display and coach-with-age for one member."""
+    record = as_participant(member, column_mapping)
+    return (
+        member.get(column_mapping.get('user_id'), ''),
+        record.display_name,  # Name with prefixes/suffixes from kaizen_client_type
+        record.location_display,
+        record.coach_with_age,
+    )
+
+def export_row(group):
+    """
+    Grouped Members row values and cell styles for an ExportGroup.
+
+    Styles are plain data (picklable), applied by write_grouped_workbook.
+
+    Returns:
+        tuple: (values, {column: (fill_color, font)}) where font is
+               (font_color, bold, underline) or None to leave the font alone
+    """
+    row = [group.name]
+    styles = {}
+    if group.highlight:
+        styles[1] = (group.highlight, None)
+    for i in range(EXPORT_SLOTS):
+        if i < len(group.slots):
+            row.extend(group.slots[i])
+            style = group.member_styles[i]
+            styles[2 + i*4] = member_cell_style(is_user_id=True, **style)  # User ID
+            styles[3 + i*4] = member_cell_style(is_user_id=False, **style)  # Name
+        else:
+            row.extend(["", "", "", ""])
+    row.extend(group.summary)
+    return row, styles
+
+
+def group_email_key(members, column_mapping):
+    """Frozenset of the members' normalized emails (entries without '@' are skipped)."""
+    emails = set()
+    for member in members:
+        email = member.get(column_mapping.get('email'), '')
+        if isinstance(email, str) and '@' in email:
+            emails.add(email.lower().strip())
+    return frozenset(emails)
+
+def index_combined_groups(combined_group_info, column_mapping):
+    """
+    Index combined_group_info by member email set.
+
+    Args:
+        combined_group_info: {key: {'members', 'is_combined', 'combined_info'}}
+        column_mapping: Column name mappings
+
+    Returns:
+        dict: group_email_key(members) -> (is_combined, combined_info);
+              the first entry wins when two share the same email set
+    """
+    index = {}
+    for group_info in (combined_group_info or {}).values():
+        index.setdefault(group_email_key(group_info['members'], column_mapping),
+                         (group_info['is_combined'], group_info['combined_info']))
+    return index
+
+def build_export_groups(solo_groups, grouped, column_mapping, excluded_users=None, requested_groups=None, combined_group_info=None):
+    """
+    Build the export row model: one ExportGroup per Grouped Members row, in sheet order.
+
+    ROW ORDER:
+    1. Requested Groups (Accountability Buddies) / Team Groups
+    2. Solo Groups
+    3. Regular Groups (sorted by location, country, city, state, size)
+    4. Excluded Users
 
     Args:
         solo_groups: List of single-member groups
         grouped: Dict of {group_name: [members]} for regular groups
-        filename_or_buffer: Output file path or BytesIO buffer
         column_mapping: Column name mappings
         excluded_users: Users who opted out
         requested_groups: Accountability buddy groups
         combined_group_info: Information about combined groups
+
+    Returns:
+        list: ExportGroup rows (group_id numbered from 1 in sheet order)
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Grouped Members"
-    ws.append([
-        "Group Name",
-        "User ID 1", "Name 1", "Location 1", "Coach and Age 1",
-        "User ID 2", "Name 2", "Location 2", "Coach and Age 2",
-        "User ID 3", "Name 3", "Location 3", "Coach and Age 3",
-        "User ID 4", "Name 4", "Location 4", "Coach and Age 4",
-        "User ID 5", "Name 5", "Location 5", "Coach and Age 5",
-        "User ID 6", "Name 6", "Location 6", "Coach and Age 6",
-        "User ID 7", "Name 7", "Location 7", "Coach and Age 7",
-        "Gender Identity", "Sex", "Residing in PH", "Gender Preference", "Country", "Province", "City", "State",
-        "Previous Coach Name"
-    ])
-    
-    # Write requested groups (accountability buddies)
+    export_groups = []
+    combined_index = index_combined_groups(combined_group_info, column_mapping)
+
+    # Requested groups (accountability buddies)
     if requested_groups:
         # Sort requested groups by location priority: MM first, then provinces, then international
         def get_requested_group_location_priority(group):
@@ -2499,28 +3122,6 @@ def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excl
                     return safe_get_value(first_member, column_mapping.get('city', ''), '')
             return ''
         
-        def get_city_priority(city_name):
-            """Get priority for city-based sorting within MM"""
-            city_order = {
-                'Quezon City': 1,
-                'Taguig': 2,
-                'Makati': 3,
-                'Parañaque': 4,
-                'Pasig': 5,
-                'San Juan': 6,
-                'Mandaluyong': 7,
-                'Manila': 8,
-                'Las Piñas': 9,
-                'Muntinlupa': 10,
-                'Navotas': 11,
-                'Marikina': 12,
-                'Malabon': 13,
-                'Valenzuela': 14,
-                'Caloocan': 15,
-                'Pateros': 16
-            }
-            return city_order.get(city_name, 99)
-        
         def get_requested_group_gender_priority(group):
             """Get gender priority for a requested group"""
             if not group:
@@ -2541,13 +3142,11 @@ def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excl
         
         sorted_requested_groups = sorted(requested_groups, key=lambda g: (
             get_requested_group_location_priority(g),  # Location first
-            get_city_priority(get_requested_group_city(g)),  # City within MM
+            MM_CITY_ORDER.get(get_requested_group_city(g), 99),  # City within MM
             get_requested_group_gender_priority(g),  # Gender preference
             -len(g),  # Larger groups first
             str(g[0].get(column_mapping.get('user_id'), ''))  # User ID as tiebreaker
         ))
-        green_fill = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")
-        group_row_indices = []
         for idx, group in enumerate(sorted_requested_groups, 1):
             # --- SORT small group members ---
             if len(group) < 7:
@@ -2562,30 +3161,9 @@ def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excl
             first_member = group[0]
             accountability_buddies = first_member.get(column_mapping.get('accountability_buddies'), '')
 
-            # Check if this is a combined group
-            is_combined_group = False
-            combined_info = ""
-            if combined_group_info:
-                # Get emails of current group members for comparison
-                current_group_emails = set()
-                for member in group:
-                    email = member.get(column_mapping.get('email'), '')
-                    if email and '@' in email:
-                        current_group_emails.add(email.lower().strip())
-                
-                for group_info in combined_group_info.values():
-                    # Get emails of the combined group members
-                    combined_group_emails = set()
-                    for member in group_info['members']:
-                        email = member.get(column_mapping.get('email'), '')
-                        if email and '@' in email:
-                            combined_group_emails.add(email.lower().strip())
-                    
-                    # Compare email sets
-                    if current_group_emails == combined_group_emails:
-                        is_combined_group = group_info['is_combined']
-                        combined_info = group_info['combined_info']
-                        break
+            # Check if this is a combined group (one lookup on the member email set)
+            current_group_emails = group_email_key(group, column_mapping)
+            is_combined_group, combined_info = combined_index.get(current_group_emails, (False, ""))
             
             # Determine if this is a team group or accountability buddy group
             team_names = set()
@@ -2607,10 +3185,10 @@ def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excl
             
             if all_same_team and all_no_accountability and team_name:
                 # This is a team group
+                group_type = 'team'
                 group_name = f"Team Group {idx} - {team_name} ({len(group)} members)"
                 if is_combined_group and combined_info:
                     group_name += f" - {combined_info}"
-                row = [group_name]
             else:
                 # This is an accountability buddy group
                 # Check for missing buddies
@@ -2621,55 +3199,18 @@ def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excl
                     temp_email_mapping = create_email_mapping([], {})
                     requested_emails = extract_emails_from_accountability_buddies(accountability_buddies, temp_email_mapping)
                     
-                    # Get emails of current group members
-                    group_emails = []
-                    for member in group:
-                        email = member.get(column_mapping.get('email'), '')
-                        if email and '@' in email:
-                            group_emails.append(email.lower().strip())
-                    
                     # Find missing buddies
-                    missing_buddies = [email for email in requested_emails if email not in group_emails]
+                    missing_buddies = [email for email in requested_emails if email not in current_group_emails]
                     
                     if missing_buddies:
                         missing_buddies_info = f" - Missing: {', '.join(missing_buddies[:3])}"
                         if len(missing_buddies) > 3:
                             missing_buddies_info += f" (+{len(missing_buddies)-3} more)"
                 
+                group_type = 'requested'
                 group_name = f"Requested Group {idx} ({len(group)} members){missing_buddies_info}"
                 if is_combined_group and combined_info:
                     group_name += f" - {combined_info}"
-                row = [group_name]
-            
-            # Add user data for each member (up to 7)
-            for i in range(7):
-                if i < len(group):
-                    member = group[i]
-                    location_display = format_location_display(member, column_mapping)
-                    coach_name = safe_get_value(member, column_mapping.get('previous_coach_name', ''), '')
-                    age_group = safe_get_value(member, column_mapping.get('age_group', ''), '')
-                    kaizen_client_type = safe_get_value(member, column_mapping.get('kaizen_client_type', ''), '')
-                    # Format coach name with age group in parentheses
-                    coach_with_age = coach_name
-                    if coach_name and age_group:
-                        coach_with_age = f"{coach_name} ({age_group})"
-                    elif coach_name:
-                        coach_with_age = coach_name
-                    elif age_group:
-                        coach_with_age = f"({age_group})"
-
-                    # Format the name with prefixes/suffixes based on kaizen_client_type
-                    original_name = member.get(column_mapping.get('name'), '')
-                    formatted_name = format_name_display(original_name, kaizen_client_type)
-
-                    row.extend([
-                        member.get(column_mapping.get('user_id'), ''),
-                        formatted_name,  # Use formatted name with prefixes/suffixes
-                        location_display,
-                        coach_with_age
-                    ])
-                else:
-                    row.extend(["", "", "", ""])
             
             # Add extra info for the first member
             member = group[0]
@@ -2677,18 +3218,9 @@ def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excl
             # Collect all coach names with age groups from group members
             coach_names = []
             for group_member in group:
-                coach_name = safe_get_value(group_member, column_mapping.get('previous_coach_name', ''), '')
-                age_group = safe_get_value(group_member, column_mapping.get('age_group', ''), '')
-                if coach_name and str(coach_name).strip() not in ['', 'None', 'nan']:
-                    # Format coach name with age group
-                    coach_with_age = coach_name
-                    if coach_name and age_group:
-                        coach_with_age = f"{coach_name} ({age_group})"
-                    elif coach_name:
-                        coach_with_age = coach_name
-                    elif age_group:
-                        coach_with_age = f"({age_group})"
-                    coach_names.append(str(coach_with_age).strip())
+                record = as_participant(group_member, column_mapping)
+                if record.previous_coach_name and str(record.previous_coach_name).strip() not in ['', 'None', 'nan']:
+                    coach_names.append(str(record.coach_with_age).strip())
 
             # Combine coach names with "/" separator if they're different
             combined_coach_names = ' / '.join(sorted(set(coach_names))) if coach_names else ''
@@ -2698,7 +3230,7 @@ def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excl
             if province and str(province).lower() == 'metro manila':
                 province = 'MM'
             
-            row.extend([
+            summary = [
                 member.get(column_mapping.get('gender_identity'), ''),
                 member.get(column_mapping.get('sex'), ''),
                 member.get(column_mapping.get('residing_ph'), ''),
@@ -2708,31 +3240,15 @@ def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excl
                 member.get(column_mapping.get('city'), ''),
                 member.get(column_mapping.get('state'), ''),
                 combined_coach_names
-            ])
-            
-            ws.append(row)
-            group_row_indices.append((ws.max_row, len(group)))
+            ]
             
-            # Apply formatting
-            for i in range(7):
-                if i < len(group):
-                    member = group[i]
-                    gender_pref = member.get(column_mapping.get('gender_preference'), '')
-                    kaizen_client_type = member.get(column_mapping.get('kaizen_client_type'), '')
-                    sex = member.get(column_mapping.get('sex'), '')
-                    gender_identity = member.get(column_mapping.get('gender_identity'), '')
-                    has_accountability_buddies = member.get(column_mapping.get('has_accountability_buddies'), '')
-                    current_goal = member.get(column_mapping.get('current_goal'), '')
-                    accountability_buddies = member.get(column_mapping.get('accountability_buddies'), '')
-                    apply_color_to_cell(ws.cell(row=ws.max_row, column=2 + i*4), sex, gender_identity, gender_pref, has_accountability_buddies, current_goal, is_user_id=True, accountability_buddies=accountability_buddies)  # User ID
-                    apply_color_to_cell(ws.cell(row=ws.max_row, column=3 + i*4), sex, gender_identity, gender_pref, has_accountability_buddies, current_goal, is_user_id=False, accountability_buddies=accountability_buddies)  # Name
-        
-        # After all requested groups are written, apply green highlight to group name cell if group has 5 or more members
-        for row_idx, group_size in group_row_indices:
-            if group_size >= 5:
-                ws.cell(row=row_idx, column=1).fill = green_fill
+            # Green highlight on the group name cell if group has 5 or more members
+            export_groups.append(ExportGroup(
+                group_type, group_name, group, column_mapping, summary,
+                [member_style_values(m, column_mapping) for m in group],
+                highlight=GREEN_COLOR if len(group) >= 5 else None))
     
-    # Write solo groups
+    # Solo groups
     for idx, group in enumerate(solo_groups, 1):
         # --- SORT small group members ---
         if len(group) < 7:
@@ -2742,38 +3258,9 @@ def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excl
                 m.get(column_mapping.get('city'), ''),
                 m.get(column_mapping.get('previous_coach_name'), '')
             ))
-        row = [f"Solo {idx}"]
-        for i in range(7):
-            if i < len(group):
-                member = group[i]
-                location_display = format_location_display(member, column_mapping)
-                coach_name = safe_get_value(member, column_mapping.get('previous_coach_name', ''), '')
-                age_group = safe_get_value(member, column_mapping.get('age_group', ''), '')
-                kaizen_client_type = safe_get_value(member, column_mapping.get('kaizen_client_type', ''), '')
-                # Format coach name with age group in parentheses
-                coach_with_age = coach_name
-                if coach_name and age_group:
-                    coach_with_age = f"{coach_name} ({age_group})"
-                elif coach_name:
-                    coach_with_age = coach_name
-                elif age_group:
-                    coach_with_age = f"({age_group})"
-
-                # Format the name with prefixes/suffixes based on kaizen_client_type
-                original_name = member.get(column_mapping.get('name'), '')
-                formatted_name = format_name_display(original_name, kaizen_client_type)
-
-                row.extend([
-                    member.get(column_mapping.get('user_id'), ''),
-                    formatted_name,  # Use formatted name with prefixes/suffixes
-                    location_display,
-                    coach_with_age
-                ])
-            else:
-                row.extend(["", "", "", ""])
         # Add extra info for the first member
         member = group[0]
-        row.extend([
+        summary = [
             member.get(column_mapping.get('gender_identity'), ''),
             member.get(column_mapping.get('sex'), ''),
             member.get(column_mapping.get('residing_ph'), ''),
@@ -2783,153 +3270,18 @@ def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excl
             member.get(column_mapping.get('city'), ''),
             member.get(column_mapping.get('state'), ''),
             member.get(column_mapping.get('previous_coach_name'), '')
-        ])
-        ws.append(row)
-        # Color code user_id and name cells for each member
-        for i in range(7):
-            if i < len(group):
-                member = group[i]
-                gender_pref = safe_get_value(member, column_mapping.get('gender_preference', ''), '')
-                kaizen_client_type = safe_get_value(member, column_mapping.get('kaizen_client_type', ''), '')
-                sex = safe_get_value(member, column_mapping.get('sex', ''), '')
-                gender_identity = safe_get_value(member, column_mapping.get('gender_identity', ''), '')
-                has_accountability_buddies = safe_get_value(member, column_mapping.get('has_accountability_buddies', ''), '')
-                current_goal = safe_get_value(member, column_mapping.get('current_goal', ''), '')
-                accountability_buddies = safe_get_value(member, column_mapping.get('accountability_buddies', ''), '')
-                apply_color_to_cell(ws.cell(row=ws.max_row, column=2 + i*4), sex, gender_identity, gender_pref, has_accountability_buddies, current_goal, is_user_id=True, accountability_buddies=accountability_buddies, go_solo=True)  # User ID
-                apply_color_to_cell(ws.cell(row=ws.max_row, column=3 + i*4), sex, gender_identity, gender_pref, has_accountability_buddies, current_goal, is_user_id=False, accountability_buddies=accountability_buddies, go_solo=True)  # Name
-
-    # Write grouped participants
-    # Track regular groups with 5 or more members for highlighting
-    regular_group_row_indices = []
-    
+        ]
+        # User ID and name cells are grey for solo participants
+        export_groups.append(ExportGroup(
+            'solo', f"Solo {idx}", group, column_mapping, summary,
+            [member_style_values(m, column_mapping, safe=True, go_solo=True) for m in group]))
+
+    # Regular groups
     # Sort groups by location priority: MM first, then provinces, then international
-    def get_location_priority(group_name):
-        if 'Province: MM' in group_name:
-            return 0  # MM first
-        elif 'Province:' in group_name and 'MM' not in group_name:
-            return 1  # Philippine provinces second
-        elif 'Country:' in group_name:
-            return 2  # International countries last
-        else:
-            return 3  # Any other groups
-    
-    def get_city_from_group_name(group_name):
-        """Extract city from MM group name for sorting"""
-        if 'Province: MM, City:' in group_name:
-            start = group_name.find('City:') + 5
-            end = group_name.find(')', start)
-            if end == -1:
-                end = len(group_name)
-            city = group_name[start:end].strip()
-            return city
-        return ''
-    
-    def get_country_from_group_name(group_name):
-        """Extract country from international group name for sorting"""
-        if 'Country:' in group_name:
-            start = group_name.find('Country:') + 8
-            end = group_name.find(',', start)
-            if end == -1:
-                end = group_name.find(')', start)
-                if end == -1:
-                    end = len(group_name)
-            country = group_name[start:end].strip()
-            return country
-        return ''
-    
-    def get_state_from_group_name(group_name):
-        """Extract state from international group name for sorting"""
-        if 'State:' in group_name:
-            start = group_name.find('State:') + 6
-            end = group_name.find(')', start)
-            if end == -1:
-                end = len(group_name)
-            state = group_name[start:end].strip()
-            return state
-        return ''
-    
-    def get_country_priority(country_name):
-        """Get priority for country-based sorting"""
-        # Prioritize major countries/regions
-        country_order = {
-            'United States': 1,
-            'Canada': 2,
-            'United Kingdom': 3,
-            'Australia': 4,
-            'United Arab Emirates': 5,
-            'Singapore': 6,
-            'Japan': 7,
-            'Germany': 8,
-            'New Zealand': 9,
-            'China': 10,
-            'Hong Kong': 11,
-            'Vietnam': 12,
-            'Norway': 13,
-            'Netherlands': 14,
-            'Spain': 15,
-            'Turkey': 16,
-            'Oman': 17,
-            'Qatar': 18,
-            'Saudi Arabia': 19,
-            'Cayman Islands': 20
-        }
-        return country_order.get(country_name, 99)
-    
-    def get_city_priority(city_name):
-        """Get priority for city-based sorting within MM"""
-        city_order = {
-            'Quezon City': 1,
-            'Taguig': 2,
-            'Makati': 3,
-            'Parañaque': 4,
-            'Pasig': 5,
-            'San Juan': 6,
-            'Mandaluyong': 7,
-            'Manila': 8,
-            'Las Piñas': 9,
-            'Muntinlupa': 10,
-            'Navotas': 11,
-            'Marikina': 12,
-            'Malabon': 13,
-            'Valenzuela': 14,
-            'Caloocan': 15,
-            'Pateros': 16
-        }
-        return city_order.get(city_name, 99)
-    
-    def get_gender_key_from_group_name(group_name):
-        """Extract gender key from group name for sorting"""
-        if '(' in group_name and ')' in group_name:
-            start = group_name.find('(') + 1
-            end = group_name.find(')', start)
-            info = group_name[start:end]
-            parts = info.split(', ')
-            if len(parts) >= 1:
-                return parts[0]  # gender_key
-        return 'unknown'
-    
-    def get_gender_priority(gender_key):
-        """Get priority for gender-based sorting within location"""
-        gender_order = {
-            'female': 1,
-            'lgbtq+_female': 2,
-            'male': 3,
-            'lgbtq+_male': 4,
-            'no_preference': 5,
-            'other': 6,
-            'unknown': 7
-        }
-        return gender_order.get(gender_key, 8)
-    
-    sorted_groups = sorted(grouped.items(), key=lambda x: (
-        get_location_priority(x[0]),  # Location first
-        get_country_priority(get_country_from_group_name(x[0])),  # Country priority for international
-        get_city_priority(get_city_from_group_name(x[0])),  # City within MM (all same city groups together)
-        get_state_from_group_name(x[0]),  # State within country
-        -len(x[1]),  # Larger groups first
-        x[0]  # Alphabetical as tiebreaker
-    ))
+    # (groups from group_participants carry GroupInfo; plain dicts fall back to the name)
+    group_info = getattr(grouped, 'info', {})
+    sorted_groups = sorted(grouped.items(), key=lambda x: group_sort_key(
+        x[0], x[1], group_info.get(x[0]) or group_info_from_name(x[0])))
     
     for group_name, members in sorted_groups:
         # --- SORT small group members ---
@@ -2940,38 +3292,9 @@ def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excl
                 m.get(column_mapping.get('city'), ''),
                 m.get(column_mapping.get('previous_coach_name'), '')
             ))
-        row = [group_name]
-        for i in range(7):
-            if i < len(members):
-                member = members[i]
-                location_display = format_location_display(member, column_mapping)
-                coach_name = safe_get_value(member, column_mapping.get('previous_coach_name', ''), '')
-                age_group = safe_get_value(member, column_mapping.get('age_group', ''), '')
-                kaizen_client_type = safe_get_value(member, column_mapping.get('kaizen_client_type', ''), '')
-                # Format coach name with age group in parentheses
-                coach_with_age = coach_name
-                if coach_name and age_group:
-                    coach_with_age = f"{coach_name} ({age_group})"
-                elif coach_name:
-                    coach_with_age = coach_name
-                elif age_group:
-                    coach_with_age = f"({age_group})"
-
-                # Format the name with prefixes/suffixes based on kaizen_client_type
-                original_name = member.get(column_mapping.get('name'), '')
-                formatted_name = format_name_display(original_name, kaizen_client_type)
-
-                row.extend([
-                    member.get(column_mapping.get('user_id'), ''),
-                    formatted_name,  # Use formatted name with prefixes/suffixes
-                    location_display,
-                    coach_with_age
-                ])
-            else:
-                row.extend(["", "", "", ""])
         # Add extra info for the first member
         member = members[0]
-        row.extend([
+        summary = [
             member.get(column_mapping.get('gender_identity'), ''),
             member.get(column_mapping.get('sex'), ''),
             member.get(column_mapping.get('residing_ph'), ''),
@@ -2981,11 +3304,10 @@ def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excl
             member.get(column_mapping.get('city'), ''),
             member.get(column_mapping.get('state'), ''),
             member.get(column_mapping.get('previous_coach_name'), '')
-        ])
-        ws.append(row)
+        ]
         
         # Check if group has 5 or more members and all members have the same location
-        should_highlight = False
+        highlight = None
         if len(members) >= 5:
             # Check if all members have the same location
             first_member = members[0]
@@ -3009,65 +3331,19 @@ def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excl
                 )
             
             if all_same_location:
-                regular_group_row_indices.append(ws.max_row)
+                highlight = REGULAR_GROUP_COLOR
         
-        # Color code user_id and name cells for each member
-        for i in range(7):
-            if i < len(members):
-                member = members[i]
-                gender_pref = safe_get_value(member, column_mapping.get('gender_preference', ''), '')
-                kaizen_client_type = safe_get_value(member, column_mapping.get('kaizen_client_type', ''), '')
-                sex = safe_get_value(member, column_mapping.get('sex', ''), '')
-                gender_identity = safe_get_value(member, column_mapping.get('gender_identity', ''), '')
-                has_accountability_buddies = safe_get_value(member, column_mapping.get('has_accountability_buddies', ''), '')
-                current_goal = safe_get_value(member, column_mapping.get('current_goal', ''), '')
-                accountability_buddies = safe_get_value(member, column_mapping.get('accountability_buddies', ''), '')
-                apply_color_to_cell(ws.cell(row=ws.max_row, column=2 + i*4), sex, gender_identity, gender_pref, has_accountability_buddies, current_goal, is_user_id=True, accountability_buddies=accountability_buddies)  # User ID
-                apply_color_to_cell(ws.cell(row=ws.max_row, column=3 + i*4), sex, gender_identity, gender_pref, has_accountability_buddies, current_goal, is_user_id=False, accountability_buddies=accountability_buddies)  # Name
-    
-    # Apply highlighting to regular groups with 5 or more members and same location
-    if regular_group_row_indices:
-        # Use a different color for regular groups with 5 or more members and same location (light blue)
-        regular_group_fill = PatternFill(start_color="87CEEB", end_color="87CEEB", fill_type="solid")
-        for row_idx in regular_group_row_indices:
-            ws.cell(row=row_idx, column=1).fill = regular_group_fill
-    
-    # Write excluded users (joiningAsStudent=False)
+        # Light blue group name cell for 5+ members in the same location
+        export_groups.append(ExportGroup(
+            'regular', group_name, members, column_mapping, summary,
+            [member_style_values(m, column_mapping, safe=True) for m in members],
+            highlight=highlight))
+    
+    # Excluded users (joiningAsStudent=False)
     if excluded_users:
         for idx, user in enumerate(excluded_users, 1):
-            row = [f"Excluded {idx}"]
-            
-            # Add user data
-            location_display = format_location_display(user, column_mapping)
-            coach_name = safe_get_value(user, column_mapping.get('previous_coach_name', ''), '')
-            age_group = safe_get_value(user, column_mapping.get('age_group', ''), '')
-            kaizen_client_type = safe_get_value(user, column_mapping.get('kaizen_client_type', ''), '')
-            # Format coach name with age group in parentheses
-            coach_with_age = coach_name
-            if coach_name and age_group:
-                coach_with_age = f"{coach_name} ({age_group})"
-            elif coach_name:
-                coach_with_age = coach_name
-            elif age_group:
-                coach_with_age = f"({age_group})"
-
-            # Format the name with prefixes/suffixes based on kaizen_client_type
-            original_name = user.get(column_mapping.get('name'), '')
-            formatted_name = format_name_display(original_name, kaizen_client_type)
-
-            row.extend([
-                user.get(column_mapping.get('user_id'), ''),
-                formatted_name,  # Use formatted name with prefixes/suffixes
-                location_display,
-                coach_with_age
-            ])
-
-            # Add empty cells for remaining slots (to fill up to 7 members)
-            for i in range(6):  # 6 more slots (total 7)
-                row.extend(["", "", "", ""])
-            
             # Add extra info
-            row.extend([
+            summary = [
                 user.get(column_mapping.get('gender_identity'), ''),
                 user.get(column_mapping.get('sex'), ''),
                 user.get(column_mapping.get('residing_ph'), ''),
@@ -3077,94 +3353,728 @@ def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excl
                 user.get(column_mapping.get('city'), ''),
                 user.get(column_mapping.get('state'), ''),
                 user.get(column_mapping.get('previous_coach_name'), '')
-            ])
-            
-            ws.append(row)
-            
-            # Apply formatting (treat as solo)
-            gender_pref = user.get(column_mapping.get('gender_preference'), '')
-            kaizen_client_type = user.get(column_mapping.get('kaizen_client_type'), '')
-            sex = user.get(column_mapping.get('sex'), '')
-            gender_identity = user.get(column_mapping.get('gender_identity'), '')
-            has_accountability_buddies = user.get(column_mapping.get('has_accountability_buddies'), '')
-            current_goal = user.get(column_mapping.get('current_goal'), '')
-            accountability_buddies = user.get(column_mapping.get('accountability_buddies'), '')
-            apply_color_to_cell(ws.cell(row=ws.max_row, column=2), sex, gender_identity, gender_pref, has_accountability_buddies, current_goal, is_user_id=True, accountability_buddies=accountability_buddies, is_excluded=True)  # User ID
-            apply_color_to_cell(ws.cell(row=ws.max_row, column=3), sex, gender_identity, gender_pref, has_accountability_buddies, current_goal, is_user_id=False, accountability_buddies=accountability_buddies, is_excluded=True)  # Name
-    
-    # ============================================================================
-    # LEGEND SHEET
-    # ============================================================================
+            ]
+            # Formatting (treat as solo, orange for not participating)
+            export_groups.append(ExportGroup(
+                'excluded', f"Excluded {idx}", [user], column_mapping, summary,
+                [member_style_values(user, column_mapping, is_excluded=True)]))
+
+    for group_id, group in enumerate(export_groups, 1):
+        group.group_id = group_id
+    return export_groups
+
+# ============================================================================
+# EXPORT METRICS
+# ============================================================================
+# save_to_excel and save_user_list_to_excel return a metrics dict (seconds per
+# section, rows / cells written, distinct styles, output size) so slow runs
+# can be split into grouping vs Excel rendering; EXPORT_METRICS_LOG keeps them
+# as JSON lines across runs.
+
+@contextmanager
+def timed_section(timings, name):
+    """Add the elapsed seconds of the with-block to timings[name]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+def timed_rows(rows, sections, timings):
+    """
+    Yield rows, adding the time to build and write each one to timings[section].
+
+    The time between two resumptions covers producing a row and the
+    consumer writing it, so each interval is charged to that row's section.
+    """
+    last = time.perf_counter()
+    for section, row in zip(sections, rows):
+        yield row
+        now = time.perf_counter()
+        timings[section] = timings.get(section, 0.0) + now - last
+        last = now
+
+def output_size(filename_or_buffer):
+    """Size in bytes of a saved workbook (file path or buffer), None if unknown."""
+    if isinstance(filename_or_buffer, (str, os.PathLike)):
+        return os.path.getsize(filename_or_buffer)
+    try:
+        return filename_or_buffer.getbuffer().nbytes
+    except AttributeError:
+        return None
+
+def export_metrics(workbook, filename_or_buffer, writer, used_styles, timings, start):
+    """Metrics dict for one saved workbook."""
+    return {
+        'workbook': workbook,
+        'file': os.fspath(filename_or_buffer) if isinstance(filename_or_buffer, (str, os.PathLike)) else None,
+        'sections': timings,
+        'rows': writer.rows,
+        'cells': writer.cells,
+        'styles': len(used_styles),
+        'bytes': output_size(filename_or_buffer),
+        'elapsed_seconds': time.perf_counter() - start,
+    }
+
+def log_export_metrics(metrics, path):
+    """Append metrics to a JSON-lines file, stamped with the current time."""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'timestamp': datetime.now().isoformat(timespec='seconds'), **metrics}) + '\n')
+
+def print_export_metrics(metrics):
+    """Print the summary of one workbook export."""
+    size = f"{metrics['bytes'] / 1024:.0f} KB" if metrics['bytes'] is not None else "size unknown"
+    print(f"⏱️  {metrics['workbook']}: {metrics['elapsed_seconds']:.2f}s | {metrics['rows']} rows, "
+          f"{metrics['cells']} cells, {metrics['styles']} styles | {size}")
+    print("    " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in metrics['sections'].items()))
+
+def save_to_excel(solo_groups, grouped, filename_or_buffer, column_mapping, excluded_users=None, requested_groups=None, combined_group_info=None, write_only=False, export_groups=None, metrics_log=None):
+    """
+    Save all groups to formatted Excel file with color coding and structure.
+
+    OUTPUT STRUCTURE (by sheet row order):
+    1. Requested Groups (Accountability Buddies) - Green highlight if ≥5 members
+    2. Solo Groups - Individual participants
+    3. Regular Groups - Light blue highlight if ≥5 members + same location
+    4. Excluded Users - Participants who opted out (joiningAsStudent=False)
+
+    EXCEL COLUMNS:
+    - Group Name, User ID 1-7, Name 1-7, Location 1-7, Coach 1-7
+    - Gender Identity, Sex, Residing in PH, Gender Preference
+    - Country, Province, City, State, Previous Coach Name
+
+    VISUAL FORMATTING:
+    - User IDs: Sex-based fill colors (blue=male, pink=female)
+    - Special colors: Green fill for 'get_bigger' goal, maroon font for LGBTQ+
+    - Bold text: Same-gender preference groups
+    - Underlined text: Users with accountability buddies
+    - Group highlighting: Green (requested ≥5), Blue (regular ≥5 + same location)
+
+    Args:
+        solo_groups: List of single-member groups
+        grouped: Dict of {group_name: [members]} for regular groups
+        filename_or_buffer: Output file path or BytesIO buffer
+        column_mapping: Column name mappings
+        excluded_users: Users who opted out
+        requested_groups: Accountability buddy groups
+        combined_group_info: Information about combined groups
+        write_only: Stream rows into a write-only workbook (flat memory for large cohorts)
+        export_groups: Pre-built build_export_groups() rows (the group arguments are then ignored)
+        metrics_log: Optional JSON-lines file the export metrics are appended to
+
+    Returns:
+        dict: Export metrics (see write_grouped_workbook); 'build' is the
+              build_export_groups() time when the rows were built here
+    """
+    start = time.perf_counter()
+    timings = {}
+    if export_groups is None:
+        with timed_section(timings, 'build'):
+            export_groups = build_export_groups(solo_groups, grouped, column_mapping, excluded_users,
+                                                requested_groups, combined_group_info)
+
+    metrics = write_grouped_workbook(filename_or_buffer, (export_row(group) for group in export_groups), write_only,
+                                     sections=[group.group_type for group in export_groups])
+    metrics['sections'] = {**timings, **metrics['sections']}
+    metrics['elapsed_seconds'] = time.perf_counter() - start
+    if metrics_log:
+        log_export_metrics(metrics, metrics_log)
+    return metrics
+
+def write_grouped_workbook(filename_or_buffer, rows, write_only=False, changes=None, sections=None):
+    """
+    Write the Grouped Members and Legend sheets from export_row() rows.
+
+    Args:
+        filename_or_buffer: Output file path or BytesIO buffer
+        rows: Iterable of (values, styles) from export_row (consumed as it is written)
+        write_only: Stream rows into a write-only workbook (flat memory for large cohorts)
+        changes: Optional diff_assignment_tables() frame, written as a Changes sheet
+        sections: Section name per row (e.g. group_type) for the timing breakdown
+
+    Returns:
+        dict: Export metrics - seconds per section ('legend', 'changes' and
+              'save' included), rows and cells written to the main sheet
+              (header included), distinct cell styles, output bytes
+    """
+    start = time.perf_counter()
+    timings = {}
+    if sections is not None:
+        rows = timed_rows(rows, sections, timings)
+    if write_only:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title="Grouped Members")
+    else:
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Grouped Members"
+    writer = RowWriter(ws)
+    writer.append(GROUPED_MEMBERS_HEADER)
+    used_styles = set()
+    for values, styles in rows:
+        used_styles.update(styles.values())
+        writer.append(values, {column: CELL_STYLES.styler(fill_color, font)
+                               for column, (fill_color, font) in styles.items()})
+    if sections is None:
+        timings['rows'] = time.perf_counter() - start
+
+    with timed_section(timings, 'legend'):
+        write_legend_sheet(wb)
+    if changes is not None:
+        with timed_section(timings, 'changes'):
+            write_changes_sheet(wb, changes)
+
+    # filename_or_buffer is either a file path or a BytesIO buffer
+    with timed_section(timings, 'save'):
+        wb.save(filename_or_buffer)
+    return export_metrics('grouped_members', filename_or_buffer, writer, used_styles, timings, start)
+
+def write_legend_sheet(wb):
+    """Add the color and formatting Legend sheet to a workbook."""
     ws_legend = wb.create_sheet(title="Legend")
+    legend = RowWriter(ws_legend)
+
+    # Column widths (set before any rows so write-only sheets emit them)
+    ws_legend.column_dimensions['A'].width = 38
+    ws_legend.column_dimensions['B'].width = 40
 
     header_font = Font(bold=True, size=12)
     section_font = Font(bold=True, size=11)
 
     def legend_row(label, color_hex=None, font_color=None, is_bold=False, is_underline=False, note=''):
         """Append one legend row and apply its formatting."""
-        ws_legend.append([label, note])
-        row_idx = ws_legend.max_row
-        sample_cell = ws_legend.cell(row=row_idx, column=1)
-        if color_hex:
-            sample_cell.fill = PatternFill(start_color=color_hex, end_color=color_hex, fill_type="solid")
-        sample_cell.font = Font(
-            color=font_color,
-            bold=is_bold,
-            underline='single' if is_underline else None
-        )
+        legend.append([label, note], {1: CELL_STYLES.styler(color_hex, (font_color, is_bold, is_underline))})
 
     # --- Title ---
-    ws_legend.append(["COLOR & FORMATTING LEGEND", ""])
-    ws_legend.cell(row=ws_legend.max_row, column=1).font = header_font
-    ws_legend.append([])
+    legend.append(["COLOR & FORMATTING LEGEND", ""], {1: font_styler(header_font)})
+    legend.append([])
 
     # --- Background fill colors ---
-    ws_legend.append(["BACKGROUND COLORS (User ID and Name cells)", ""])
-    ws_legend.cell(row=ws_legend.max_row, column=1).font = section_font
+    legend.append(["BACKGROUND COLORS (User ID and Name cells)", ""], {1: font_styler(section_font)})
 
     legend_row("Male",                color_hex='ADD8E6', note="Light blue fill")
     legend_row("Female",              color_hex='FFC0CB', note="Pink fill")
     legend_row("Bulking goal",        color_hex='90EE90', note="Light green fill (User ID cell only)")
     legend_row("Solo participant",    color_hex='D3D3D3', note="Grey fill (overrides sex color)")
     legend_row("Not participating",   color_hex='FFD580', note="Orange fill (overrides everything)")
-    ws_legend.append([])
+    legend.append([])
 
     # --- Group label colors ---
-    ws_legend.append(["GROUP LABEL COLORS (Group Name cell)", ""])
-    ws_legend.cell(row=ws_legend.max_row, column=1).font = section_font
+    legend.append(["GROUP LABEL COLORS (Group Name cell)", ""], {1: font_styler(section_font)})
 
     legend_row("Requested group ≥5 members",       color_hex='90EE90', note="Light green on group name")
     legend_row("Regular group ≥5 members same loc", color_hex='87CEEB', note="Sky blue on group name")
-    ws_legend.append([])
+    legend.append([])
 
     # --- Font / text formatting ---
-    ws_legend.append(["TEXT FORMATTING", ""])
-    ws_legend.cell(row=ws_legend.max_row, column=1).font = section_font
+    legend.append(["TEXT FORMATTING", ""], {1: font_styler(section_font)})
 
     legend_row("LGBTQ+",                         font_color='800000', note="Maroon text color")
     legend_row("Same-gender preference",          is_bold=True,        note="Bold name")
     legend_row("Has accountability buddies",      is_underline=True,   note="Underlined name")
-    ws_legend.append([])
+    legend.append([])
 
     # --- Name prefix/suffix conventions ---
-    ws_legend.append(["NAME PREFIXES / SUFFIXES", ""])
-    ws_legend.cell(row=ws_legend.max_row, column=1).font = section_font
+    legend.append(["NAME PREFIXES / SUFFIXES", ""], {1: font_styler(section_font)})
 
-    ws_legend.append(["**Name",   "Team member"])
-    ws_legend.append(["Name*",    "Returning – latest season"])
-    ws_legend.append(["Name**",   "Returning – other season"])
-    ws_legend.append([])
+    legend.append(["**Name",   "Team member"])
+    legend.append(["Name*",    "Returning – latest season"])
+    legend.append(["Name**",   "Returning – other season"])
+    legend.append([])
 
-    # --- Column widths ---
-    ws_legend.column_dimensions['A'].width = 38
-    ws_legend.column_dimensions['B'].width = 40
+# Fill of the Change column on the Changes sheet
+CHANGE_COLORS = {'Added': '90EE90', 'Moved': '87CEEB', 'Removed': 'FFD580'}
 
-    # Check if filename_or_buffer is a string (file path) or BytesIO buffer
-    if isinstance(filename_or_buffer, str):
-        wb.save(filename_or_buffer)
+def write_changes_sheet(wb, changes):
+    """
+    Add a Changes sheet listing members added, moved or removed since the previous run.
+
+    Args:
+        wb: Workbook to add the sheet to
+        changes: DataFrame from diff_assignment_tables()
+    """
+    ws_changes = wb.create_sheet(title="Changes")
+    for column, width in zip('ABCDE', (10, 14, 30, 45, 45)):
+        ws_changes.column_dimensions[column].width = width
+
+    writer = RowWriter(ws_changes)
+    header_font = Font(bold=True)
+    writer.append(['Change', 'User ID', 'Name', 'Previous Group', 'New Group'],
+                  {column: font_styler(header_font) for column in range(1, len(CHANGE_COLUMNS) + 1)})
+    if changes.empty:
+        writer.append(['No member changes since the previous run'])
+        return
+    for row in changes[CHANGE_COLUMNS].itertuples(index=False):
+        writer.append(list(row), {1: CELL_STYLES.styler(CHANGE_COLORS.get(row.change))})
+
+# ============================================================================
+# INCREMENTAL EXPORT
+# ============================================================================
+# The previous run's assignment is kept as a long-format table next to the
+# workbook. A re-run diffs against it by member ids: an unchanged assignment
+# leaves the workbook untouched, a changed one is written again with a
+# Changes sheet for reviewers.
+
+def assignment_snapshot_path(output_file):
+    """grouped_participants.xlsx -> grouped_participants_assignments.csv"""
+    stem, _ = os.path.splitext(output_file)
+    return f"{stem}_assignments.csv"
+
+def save_incremental_export(export_groups, output_file, snapshot_path=None, write_only=False):
+    """
+    Export only if the assignment differs from the previous run's snapshot.
+
+    Args:
+        export_groups: ExportGroup rows from build_export_groups()
+        output_file: Workbook path
+        snapshot_path: Previous-run table (default: assignment_snapshot_path(output_file))
+        write_only: Stream rows into a write-only workbook
+
+    Returns:
+        tuple: (changes, written) - changes is the diff_assignment_tables()
+            frame (None without a previous snapshot), written is False when
+            the existing workbook was already up to date
+    """
+    snapshot_path = snapshot_path or assignment_snapshot_path(output_file)
+    current = assignment_table(export_groups)
+
+    previous = read_assignment_table(snapshot_path) if os.path.exists(snapshot_path) else None
+    if previous is not None and os.path.exists(output_file) and tables_equal(previous, current):
+        return pd.DataFrame(columns=CHANGE_COLUMNS), False
+
+    changes = diff_assignment_tables(previous, current) if previous is not None else None
+    write_grouped_workbook(output_file, (export_row(group) for group in export_groups), write_only, changes)
+    write_assignment_table(current, snapshot_path)
+    return changes, True
+
+# ============================================================================
+# REGIONAL WORKBOOKS
+# ============================================================================
+# One workbook per region next to the master file. Each group lands in exactly
+# one region, decided by its first member: Metro Manila, the other Philippine
+# regions (PHILIPPINES_REGIONS), or the TIMEZONE_REGIONS bucket of the member's
+# country (USA / Canada by state timezone).
+
+# NA timezone zone -> TIMEZONE_REGIONS key
+NA_TIMEZONE_REGIONS = {
+    'pacific': 'pst_pdt',
+    'mountain': 'mst_mdt',
+    'central': 'cst_cdt',
+    'eastern': 'est_edt',
+    'other': 'north_america',
+}
+
+def export_region(group, column_mapping):
+    """
+    Region key for an ExportGroup: 'MM', 'luzon' / 'visayas' / 'mindanao' /
+    'ph_unknown', or a TIMEZONE_REGIONS / SIMILAR_COUNTRIES key ('other' if unmapped).
+    """
+    record = as_participant(group.members[0], column_mapping)
+    if record.is_ph:
+        if record.province.lower() in ['metro manila', 'mm']:
+            return 'MM'
+        region = get_philippines_region(record.province)
+        return region if region != 'unknown' else 'ph_unknown'
+    if record.country_key in NA_COUNTRIES:
+        return NA_TIMEZONE_REGIONS[get_na_timezone(record.country_key, record.international_state or record.state)]
+    return get_timezone_region(record.country_name)
+
+def region_workbook_path(output_file, region):
+    """grouped_participants.xlsx -> grouped_participants_<region>.xlsx"""
+    stem, ext = os.path.splitext(output_file)
+    return f"{stem}_{region}{ext or '.xlsx'}"
+
+def save_region_workbooks(export_groups, column_mapping, output_file, workers=None, write_only=False, include_master=True):
+    """
+    Write the master workbook and one workbook per region.
+
+    Row values and cell styles are computed once (export_row) and shared by
+    every workbook; with workers > 1 the workbooks are written concurrently
+    in a process pool.
+
+    Args:
+        export_groups: ExportGroup rows from build_export_groups()
+        column_mapping: Column name mappings
+        output_file: Master workbook path; regional files are named after it
+        workers: Processes for writing (None or 1 = one after another)
+        write_only: Stream rows into write-only workbooks
+        include_master: Also write output_file with every group
+
+    Returns:
+        dict: {region: path} in sheet order ('all' for the master workbook)
+    """
+    rows = [export_row(group) for group in export_groups]
+    region_rows = defaultdict(list)
+    for group, row in zip(export_groups, rows):
+        region_rows[export_region(group, column_mapping)].append(row)
+
+    tasks = [('all', output_file, rows)] if include_master else []
+    tasks += [(region, region_workbook_path(output_file, region), workbook_rows)
+              for region, workbook_rows in region_rows.items()]
+
+    if workers and workers > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(write_grouped_workbook, path, workbook_rows, write_only)
+                       for _, path, workbook_rows in tasks]
+            for future in futures:
+                future.result()
     else:
-        # It's a BytesIO buffer
+        for _, path, workbook_rows in tasks:
+            write_grouped_workbook(path, workbook_rows, write_only)
+
+    return {region: path for region, path, _ in tasks}
+
+# ============================================================================
+# USER LIST EXPORT
+# ============================================================================
+# One row per participant in source order, built from the same Participant
+# records, cell styles and RowWriter as the Grouped Members sheet.
+# user_list_to_excel.py is the stand-alone entry point.
+
+USER_LIST_HEADER = ["User ID", "Name", "Location", "Coach and Age", "Email Address", "Group Mates"]
+
+def unique_by_user_id(data, column_mapping):
+    """
+    Drop repeated user ids, keeping the first row (rows without an id are kept).
+
+    Returns:
+        tuple: (unique rows, number of duplicates removed)
+    """
+    user_id_col = column_mapping.get('user_id')
+    unique_data = []
+    seen_user_ids = set()
+    for record in data:
+        user_id_raw = record.get(user_id_col, '')
+        user_id = str(user_id_raw).strip() if user_id_raw is not None else ''
+        if user_id and user_id in seen_user_ids:
+            continue
+        if user_id:
+            seen_user_ids.add(user_id)
+        unique_data.append(record)
+    return unique_data, len(data) - len(unique_data)
+
+# go_solo values that grey a User List row
+USER_LIST_SOLO_VALUES = ('1', '1.0', 'true', 'yes')
+
+def user_list_text(member, column):
+    """safe_get_value() that also blanks 'nan' / 'none' text, so the list never shows them."""
+    value = safe_get_value(member, column or '', '')
+    return '' if value.lower() in ('nan', 'none') else value
+
+def user_list_location(member, column_mapping, is_ph):
+    """
+    User List location: "City, Province" (Metro Manila -> MM) for Philippines
+    residents, else "City, State, Location Identifier, Country". Missing parts
+    are left out; an empty internationalCity / internationalState falls back to
+    the mapped city / state column.
+    """
+    def part(column):
+        value = member.get(column, '') if column else ''
+        if not value or (isinstance(value, float) and value != value):
+            return ''
+        text = str(value)
+        return '' if text.strip().lower() == 'nan' else text
+
+    if is_ph:
+        city = part(column_mapping.get('city'))
+        province = part(column_mapping.get('province'))
+        if province.lower() == 'metro manila':
+            province = 'MM'
+        parts = [city, province]
+    else:
+        parts = [
+            part('internationalCity') or part(column_mapping.get('city')),
+            part('internationalState') or part(column_mapping.get('state')),
+            part('locationIdentifier') or part('location_identifier'),
+            part(column_mapping.get('country')),
+        ]
+    return ', '.join(value for value in parts if value)
+
+def user_list_row(member, column_mapping):
+    """
+    User List row values and cell styles for one participant.
+
+    User ID, Name and Location get the participant cell formatting; Coach and
+    Age, Email Address and Group Mates get the row fill (excluded > solo > sex).
+    Names are underlined on the has_accountability_buddies flag alone, and
+    missing values are blank (never 'nan').
+
+    Returns:
+        tuple: (values, {column: (fill_color, font)}) as export_row()
+    """
+    record = as_participant(member, column_mapping)
+    go_solo = user_list_text(record, column_mapping.get('go_solo')).lower() in USER_LIST_SOLO_VALUES
+    style = member_style_values(record, column_mapping, safe=True, go_solo=go_solo, is_excluded=record.excluded)
+
+    user_id = record.get(column_mapping.get('user_id'), '')
+    if isinstance(user_id, float) and user_id != user_id:
+        user_id = ''
+    name = format_name_display(user_list_text(record, column_mapping.get('name')), record.kaizen_client_type)
+    coach_with_age = format_coach_with_age(user_list_text(record, column_mapping.get('previous_coach_name')),
+                                           user_list_text(record, column_mapping.get('age_group')))
+    values = [
+        user_id,
+        name,
+        user_list_location(record, column_mapping, record.is_ph),
+        coach_with_age,
+        user_list_text(record, column_mapping.get('email')),
+        user_list_text(record, column_mapping.get('accountability_buddies')),  # Group Mates
+    ]
+
+    user_id_style = member_cell_style(is_user_id=True, require_buddy_list=False, **style)
+    name_style = member_cell_style(is_user_id=False, require_buddy_list=False, **style)
+    styles = {1: user_id_style, 2: name_style, 3: name_style}
+    row_fill = (EXCLUDED_COLOR if record.excluded else
+                SOLO_COLOR if go_solo else
+                SEX_COLOR.get(record.sex))
+    if row_fill:
+        styles.update({column: (row_fill, None) for column in range(4, 7)})
+    return values, styles
+
+def save_user_list_to_excel(data, filename_or_buffer, column_mapping, merged_df=None, write_only=False, metrics_log=None):
+    """
+    Save the User List sheet (and optionally the Merged Data sheet).
+
+    Args:
+        data: Participant dictionaries or Participant records, in output order
+        filename_or_buffer: Output file path or BytesIO buffer
+        column_mapping: Column name mappings
+        merged_df: Optional source DataFrame, copied to a Merged Data sheet
+        write_only: Stream rows into a write-only workbook
+        metrics_log: Optional JSON-lines file the export metrics are appended to
+
+    Returns:
+        dict: Export metrics (see write_grouped_workbook); sections are
+              'rows', 'merged_data' and 'save'
+    """
+    start = time.perf_counter()
+    timings = {}
+    if column_mapping.get('user_id'):
+        data, duplicates_removed = unique_by_user_id(data, column_mapping)
+        if duplicates_removed > 0:
+            print(f"🧹 Deduplication: Removed {duplicates_removed} duplicate users, kept {len(data)} unique users")
+        else:
+            print(f"✅ No duplicates found: {len(data)} unique users")
+    else:
+        print("⚠️ No user_id column found - cannot deduplicate")
+
+    with timed_section(timings, 'rows'):
+        rows = [user_list_row(member, column_mapping) for member in data]
+
+    if write_only:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title="User List")
+    else:
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "User List"
+    # Widths come from the values, so they are set before any row is written
+    set_column_widths(ws, [USER_LIST_HEADER, *(values for values, _ in rows)])
+    writer = RowWriter(ws)
+    used_styles = set()
+    with timed_section(timings, 'rows'):
+        writer.append(USER_LIST_HEADER)
+        for values, styles in rows:
+            used_styles.update(styles.values())
+            writer.append(values, {column: CELL_STYLES.styler(fill_color, font)
+                                   for column, (fill_color, font) in styles.items()})
+
+    if merged_df is not None and not merged_df.empty:
+        with timed_section(timings, 'merged_data'):
+            write_merged_data_sheet(wb, merged_df)
+
+    # filename_or_buffer is either a file path or a BytesIO buffer
+    with timed_section(timings, 'save'):
         wb.save(filename_or_buffer)
+    metrics = export_metrics('user_list', filename_or_buffer, writer, used_styles, timings, start)
+    if metrics_log:
+        log_export_metrics(metrics, metrics_log)
+    return metrics
+
+def write_merged_data_sheet(wb, merged_df):
+    """Add a Merged Data sheet with the source DataFrame."""
+    ws_merged = wb.create_sheet(title="Merged Data")
+    header = list(merged_df.columns)
+    rows = list(merged_df.itertuples(index=False, name=None))
+    set_column_widths(ws_merged, [header, *rows], skip_empty=True)
+    writer = RowWriter(ws_merged)
+    writer.append(header)
+    for row in rows:
+        writer.append(row)
+
+def encode_categories(df, column_mapping):
+    """
+    Store the location and preference columns as categoricals (one integer code per row).
+
+    Args:
+        df: Merged participant data
+        column_mapping: Column name mappings
+
+    Returns:
+        pd.DataFrame: df with text columns of CATEGORICAL_FIELDS (and the literal
+        country / province / city columns the sort reads) converted
+    """
+    columns = {column_mapping.get(key) for key in CATEGORICAL_FIELDS} | {'country', 'province', 'city'}
+    converted = {column: df[column].astype('category') for column in df.columns
+                 if column in columns and not pd.api.types.is_numeric_dtype(df[column])}
+    return df.assign(**converted) if converted else df
+
+def frequency_order(values):
+    """
+    Distinct values, most frequent first (ties in order of first appearance), NaN left out.
+
+    Same order as values.value_counts().index for a text column, but computed
+    on the integer category codes, so it is also right for categorical columns
+    (whose value_counts breaks ties by category order).
+    """
+    values = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype('category')
+    codes = values.cat.codes.to_numpy()
+    present, first_seen = np.unique(codes[codes >= 0], return_index=True)
+    counts = np.bincount(codes[codes >= 0])[present]
+    order = np.lexsort((first_seen, -counts))
+    return values.cat.categories[present[order]]
+
+def _value_codes(values):
+    """Integer codes in sorted value order (-1 for NaN)."""
+    return pd.factorize(values, sort=True)[0]
+
+def _sort_codes(codes):
+    """Codes as a sort key with NaN last, like sort_values()."""
+    return np.where(codes < 0, codes.max(initial=-1) + 1, codes)
+
+def _frequency_ranks(values, mask):
+    """Each row's rank by how common its value is among the masked rows (most common 0, NaN last)."""
+    order = frequency_order(values[mask])
+    ranks = order.get_indexer(values)
+    return np.where(ranks < 0, len(order), ranks)
+
+def _bucket_sizes(*codes):
+    """Rows sharing each row's combination of codes (0 if any code is -1, i.e. NaN)."""
+    bucket = np.zeros(len(codes[0]), dtype=np.int64)
+    for column_codes in codes:
+        # Combine and renumber, so the bucket ids stay small
+        bucket = pd.factorize(bucket * (column_codes.max(initial=0) + 2) + column_codes + 1)[0]
+    sizes = np.bincount(bucket)[bucket]
+    return np.where(np.any([column_codes < 0 for column_codes in codes], axis=0), 0, sizes)
+
+# Column mapping keys input_sort_order() reads
+INPUT_SORT_FIELDS = ('residing_ph', 'province', 'city', 'country', 'internationalState', 'state',
+                     'internationalCity', 'gender_preference', 'gender_identity', 'user_id')
+
+def sort_frame(participants, column_mapping):
+    """
+    The columns input_sort_order() reads, built one column at a time from the records' raw cells.
+
+    The streaming path orders its records with this instead of rebuilding the whole input frame.
+
+    Args:
+        participants: Participant records in file order
+        column_mapping: Column name mappings
+
+    Returns:
+        pd.DataFrame: One row per record, only the sort columns
+    """
+    names = dict.fromkeys(column_mapping.get(key) for key in INPUT_SORT_FIELDS)
+    return pd.DataFrame({name: [participant.get(name) for participant in participants]
+                         for name in names if name and participants and name in participants[0]},
+                        index=pd.RangeIndex(len(participants)))
+
+def input_sort_order(df, column_mapping):
+    """
+    Sort order of the input rows, computed on integer codes in one stable lexsort.
+
+    Philippines residents come first, sorted by province, then city;
+    everyone else by country, then state, then city. Larger location groups
+    come first (ties in order of first appearance), then rows are ordered by
+    gender preference, gender identity and user id. Without a residing_ph
+    column, rows are ordered by province, city, preferences and user id.
+    This only orders the rows; group_participants() does its own bucketing.
+
+    Args:
+        df: Merged participant data (text or categorical columns)
+        column_mapping: Column name mappings
+
+    Returns:
+        np.ndarray: Row positions of df in grouping order
+    """
+    def column(key):
+        name = column_mapping.get(key)
+        return df[name] if name and name in df.columns else None
+
+    def present(*columns):
+        return [values for values in columns if values is not None]
+
+    codes = {}
+    def value_codes(values):
+        # Factorize each column once; codes serve both as sort keys and bucket ids
+        if values.name not in codes:
+            codes[values.name] = _value_codes(values)
+        return codes[values.name]
+
+    zeros = np.zeros(len(df), dtype=np.int64)
+    detail = present(column('gender_preference'), column('gender_identity'), column('user_id'))
+
+    residing_ph = column('residing_ph')
+    if residing_ph is None:
+        sort_columns = present(column('province'), column('city')) + detail
+        if not sort_columns:
+            return np.arange(len(df))
+        print(f"\n📊 Data sorted by: {[values.name for values in sort_columns]}")
+        return np.lexsort([_sort_codes(value_codes(values)) for values in reversed(sort_columns)])
+
+    is_ph = residing_ph.astype(str).str.lower().isin(PH_RESIDENT_VALUES).to_numpy()
+    flag = is_ph.astype(np.int64)
+
+    # Philippines: province (most common first), city bucket size, city
+    province, city = column('province'), column('city')
+    ph_area = _frequency_ranks(province, is_ph) if province is not None else zeros
+    ph_size = (-_bucket_sizes(flag, value_codes(province), value_codes(city))
+               if province is not None and city is not None else zeros)
+    ph_city = _sort_codes(value_codes(city)) if city is not None else zeros
+
+    # Elsewhere: country (most common first), state bucket size, state, city bucket size, city
+    country = column('country')
+    state = column('internationalState')
+    if state is None:
+        state = column('state')
+    intl_city = column('internationalCity') if state is not None else None
+    if intl_city is None and state is not None:
+        intl_city = city
+    other_area = _frequency_ranks(country, ~is_ph) if country is not None else zeros
+    area_codes = [flag] + ([value_codes(country)] if country is not None else [])
+    state_size = -_bucket_sizes(*area_codes, value_codes(state)) if state is not None else zeros
+    state_code = _sort_codes(value_codes(state)) if state is not None else zeros
+    city_size = (-_bucket_sizes(*area_codes, value_codes(state), value_codes(intl_city))
+                 if intl_city is not None else zeros)
+    city_code = _sort_codes(value_codes(intl_city)) if intl_city is not None else zeros
+
+    keys = [
+        ~is_ph,
+        np.where(is_ph, ph_area, other_area),
+        np.where(is_ph, ph_size, state_size),
+        np.where(is_ph, ph_city, state_code),
+        np.where(is_ph, 0, city_size),
+        np.where(is_ph, 0, city_code),
+        *(_sort_codes(value_codes(values)) for values in detail),
+    ]
+    print(f"\n📊 Data sorted: Philippines residents by province/city, non-Philippines by country/state")
+    return np.lexsort(keys[::-1])
+
+def stream_participants(path):
+    """
+    Read the input in chunks and build Participant records as each chunk arrives.
+
+    Args:
+        path: CSV or xlsx file (sheet 'Merged Data')
+
+    Returns:
+        tuple: (column mapping, Participant records in file order)
+    """
+    email_mapping = create_email_mapping([], {})
+    categories = CategoryMemo()
+    return stream_records(path, find_column_mapping,
+                          lambda rows, column_mapping: build_participants(rows, column_mapping, email_mapping, categories))
 
 def main():
     """
@@ -3173,7 +4083,7 @@ def main():
     WORKFLOW:
     1. Load merged participant data (Excel/CSV format)
     2. Dynamically detect and map column names
-    3. Sort data for consistent processing order
+    3. Order participants by location bucket (largest first) for consistent processing
     4. Execute 5-phase grouping algorithm:
        - Accountability buddies (graph-based clustering)
        - Solo participants (user choice)
@@ -3186,136 +4096,83 @@ def main():
     INPUT: Merged participant data file (update INPUT_FILE path)
     OUTPUT: Excel file with organized groups, color coding, and metadata
     """
-    # Load input data - supports both Excel and CSV formats
+    # Load input data - supports both Excel and CSV formats (snapshot of a previous read if unchanged)
+    participants = None
     try:
-        df = pd.read_excel(INPUT_FILE, sheet_name='Merged Data')
-        print(f"✅ Successfully read input file with {len(df)} records")
-    except Exception as e:
-        try:
-            df = pd.read_csv(INPUT_FILE)
-            print(f"✅ Successfully read CSV file with {len(df)} records")
-        except Exception as e2:
-            print(f"❌ Error reading input file: {e2}")
-            return
-    
-    # Find column mapping
-    column_mapping = find_column_mapping(df)
-    print(f"\n📋 Column mapping found:")
-    for key, value in column_mapping.items():
-        if value:
-            print(f"  ✅ {key}: {value}")
+        if STREAMING_INPUT:
+            column_mapping, participants = stream_participants(INPUT_FILE)
+            columns = list(participants[0]) if participants else []
+            print(f"✅ Successfully streamed input file with {len(participants)} records")
         else:
-            print(f"  ❌ {key}: NOT FOUND")
+            df, column_mapping, cached = load_merged_data(INPUT_FILE, find_column_mapping, cache_dir=INPUT_CACHE_DIR,
+                                                          mapping_key=json.dumps(EXPECTED_COLUMNS, sort_keys=True))
+            columns = df.columns
+            print(f"✅ Successfully read input file with {len(df)} records" + (" (cached snapshot)" if cached else ""))
+    except Exception as e:
+        print(f"❌ Error reading input file: {e}")
+        return
     
-    # Convert DataFrame to list of dictionaries
-    # --- SORTING STEP: Separate Philippines and non-Philippines residents, sort each group appropriately ---
-    ph_column = column_mapping.get('residing_ph')
-    if ph_column and ph_column in df.columns:
-        # Filter Philippines residents
-        ph_residents = df[df[ph_column].astype(str).str.lower().isin(['1', '1.0', 'true', 'yes', 'ph', 'philippines'])].copy()
-        # Filter non-Philippines residents
-        non_ph_residents = df[~df[ph_column].astype(str).str.lower().isin(['1', '1.0', 'true', 'yes', 'ph', 'philippines'])].copy()
-        
-        # Sort Philippines residents by province frequency (largest first), then city frequency within province (largest first), then other columns
-        if not ph_residents.empty:
-            # Sort provinces by frequency descending
-            province_counts = ph_residents['province'].value_counts()
-            province_order = province_counts.index
-            ph_residents['province'] = ph_residents['province'].astype('category').cat.set_categories(province_order)
-            
-            # Add city count within province
-            ph_residents['city_count'] = ph_residents.groupby(['province', 'city'])['city'].transform('count')
-            
-            ph_sort_columns = []
-            for col_key in ['province', 'city_count', 'city', 'gender_preference', 'gender_identity', 'user_id']:
-                if col_key == 'city_count':
-                    ph_sort_columns.append('city_count')
-                else:
-                    col_name = column_mapping.get(col_key)
-                    if col_name and col_name in ph_residents.columns:
-                        ph_sort_columns.append(col_name)
-            ph_residents = ph_residents.sort_values(by=ph_sort_columns, ascending=[True, False, True, True, True, True])
-            ph_residents = ph_residents.drop(columns=['city_count'])
-        
-        # Sort non-Philippines residents by country frequency (largest first), then internationalState frequency within country (largest first), then internationalCity frequency within state (largest first), then other columns
-        if not non_ph_residents.empty:
-            # Sort countries by frequency descending
-            country_counts = non_ph_residents['country'].value_counts()
-            country_order = country_counts.index
-            non_ph_residents['country'] = non_ph_residents['country'].astype('category').cat.set_categories(country_order)
-            
-            # Add internationalState count within country if column exists
-            if 'internationalState' in non_ph_residents.columns:
-                non_ph_residents['state_count'] = non_ph_residents.groupby(['country', 'internationalState'])['internationalState'].transform('count')
-                state_col = 'internationalState'
-            else:
-                # Fallback to state
-                state_col_name = column_mapping.get('state')
-                if state_col_name and state_col_name in non_ph_residents.columns:
-                    non_ph_residents['state_count'] = non_ph_residents.groupby(['country', state_col_name])[state_col_name].transform('count')
-                    state_col = state_col_name
-                else:
-                    state_col = None
-            
-            # Add internationalCity count within country and state if columns exist
-            if 'internationalCity' in non_ph_residents.columns and state_col:
-                non_ph_residents['city_count'] = non_ph_residents.groupby(['country', state_col, 'internationalCity'])['internationalCity'].transform('count')
-                city_col = 'internationalCity'
-            else:
-                city_col_name = column_mapping.get('city')
-                if city_col_name and city_col_name in non_ph_residents.columns and state_col:
-                    non_ph_residents['city_count'] = non_ph_residents.groupby(['country', state_col, city_col_name])[city_col_name].transform('count')
-                    city_col = city_col_name
-                else:
-                    city_col = None
-            
-            non_ph_sort_columns = ['country']
-            if state_col:
-                non_ph_sort_columns.extend(['state_count', state_col])
-            if city_col:
-                non_ph_sort_columns.extend(['city_count', city_col])
-            
-            # Add other columns
-            for col_key in ['gender_preference', 'gender_identity', 'user_id']:
-                col_name = column_mapping.get(col_key)
-                if col_name and col_name in non_ph_residents.columns:
-                    non_ph_sort_columns.append(col_name)
-            
-            ascending_order = [True] * len(non_ph_sort_columns)
-            # Set descending for count columns
-            for i, col in enumerate(non_ph_sort_columns):
-                if col.endswith('_count'):
-                    ascending_order[i] = False
-            
-            non_ph_residents = non_ph_residents.sort_values(by=non_ph_sort_columns, ascending=ascending_order)
-            # Drop temporary count columns
-            count_cols = [col for col in non_ph_sort_columns if col.endswith('_count')]
-            non_ph_residents = non_ph_residents.drop(columns=count_cols, errors='ignore')
-        
-        # Combine sorted dataframes: Philippines first, then non-Philippines
-        df = pd.concat([ph_residents, non_ph_residents], ignore_index=True)
-        print(f"\n📊 Data sorted: Philippines residents by province/city, non-Philippines by country/state")
-    else:
-        # Fallback to original sorting if residing_ph column not found
-        sort_columns = []
-        for col_key in ['province', 'city', 'gender_preference', 'gender_identity', 'user_id']:
-            col_name = column_mapping.get(col_key)
-            if col_name and col_name in df.columns:
-                sort_columns.append(col_name)
-        if sort_columns:
-            df = df.sort_values(by=sort_columns)
-            print(f"\n📊 Data sorted by: {sort_columns}")
-    data = df.to_dict('records')
+    # Column mapping (detected on first read, stored with the snapshot)
+    print_column_mapping(column_mapping, columns)
+    
+    # Streaming keeps no input frame; the sort reads its few columns from the records
+    if participants is not None:
+        df = sort_frame(participants, column_mapping)
+    
+    # Location / preference columns as categoricals, then the input sort:
+    # largest location groups first (see input_sort_order)
+    df = encode_categories(df, column_mapping)
+    order = input_sort_order(df, column_mapping)
     
     print(f"\n🚀 Starting group assignment process...")
     
+    # Parse the rows once, in file order; grouping and the user list share the records
+    if participants is None:
+        data = df.to_dict('records')
+        participants = build_participants(data, column_mapping, create_email_mapping(data, column_mapping))
+    
     # Group participants
-    solo_groups, grouped, excluded_users, requested_groups, combined_group_info = group_participants(data, column_mapping)
+    solo_groups, grouped, excluded_users, requested_groups, combined_group_info = group_participants(
+        [participants[i] for i in order], column_mapping, optimizer=GROUP_OPTIMIZER,
+        optimizer_time_budget=OPTIMIZER_TIME_BUDGET, workers=GROUPING_WORKERS)
     
     print(f"\n💾 Saving results to Excel...")
     
-    # Save to Excel
-    save_to_excel(solo_groups, grouped, OUTPUT_FILE, column_mapping, excluded_users, requested_groups, combined_group_info)
+    # Build the row model once; Excel and the columnar tables render from it
+    export_groups = build_export_groups(solo_groups, grouped, column_mapping, excluded_users, requested_groups, combined_group_info)
+    if REGION_WORKBOOKS:
+        paths = save_region_workbooks(export_groups, column_mapping, OUTPUT_FILE,
+                                      workers=EXPORT_WORKERS, write_only=EXCEL_WRITE_ONLY)
+        print(f"🗺️  Wrote {len(paths) - 1} regional workbooks: {', '.join(r for r in paths if r != 'all')}")
+    elif INCREMENTAL_EXPORT:
+        changes, written = save_incremental_export(export_groups, OUTPUT_FILE, write_only=EXCEL_WRITE_ONLY)
+        if not written:
+            print(f"⏭️  Assignment unchanged since the previous run, kept {OUTPUT_FILE}")
+        elif changes is None:
+            print(f"🆕 No previous snapshot, wrote the full export and {assignment_snapshot_path(OUTPUT_FILE)}")
+        else:
+            counts = changes['change'].value_counts()
+            print(f"🔁 Changes since the previous run: " +
+                  ', '.join(f"{counts.get(kind, 0)} {kind.lower()}" for kind in CHANGE_COLORS))
+    else:
+        metrics = save_to_excel(solo_groups, grouped, OUTPUT_FILE, column_mapping, write_only=EXCEL_WRITE_ONLY,
+                                export_groups=export_groups, metrics_log=EXPORT_METRICS_LOG)
+        print_export_metrics(metrics)
+    
+    if TABLE_EXPORTS:
+        table = assignment_table(export_groups)
+        for path in TABLE_EXPORTS:
+            try:
+                write_assignment_table(table, path)
+                print(f"📄 Assignment table ({len(table)} rows) saved to: {path}")
+            except (ImportError, ValueError) as e:
+                print(f"❌ Could not write {path}: {e}")
+    
+    if USER_LIST_FILE:
+        metrics = save_user_list_to_excel(participants, USER_LIST_FILE, column_mapping,
+                                          write_only=EXCEL_WRITE_ONLY, metrics_log=EXPORT_METRICS_LOG)
+        print(f"📋 User list saved to: {USER_LIST_FILE}")
+        print_export_metrics(metrics)
     
     print(f"\n✅ Group assignment completed successfully!")
     print(f"📁 Results saved to: {OUTPUT_FILE}")
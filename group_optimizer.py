@@ -0,0 +1,259 @@
+"""
+Local-search optimizer for regular (algorithmic) groups.
+
+Phase 3 of group_participants forms groups by chunking sorted lists, so group
+quality depends on sort order. This module takes that greedy assignment as a
+starting point and swaps members between groups that share the same label
+(same gender key and location text, e.g. two "NA (Pacific Time)" groups) to
+lower an objective combining geography, goal, age and timezone mismatches.
+
+Swaps keep every group's size and label valid, so the constraints enforced by
+the grouping phases (same-gender, city/province/country boundaries) hold.
+
+Optimizers are pluggable: anything with an optimize(grouped) method that
+returns a metrics dict can be registered in OPTIMIZERS.
+"""
+
+import math
+import re
+import time
+from collections import defaultdict
+from itertools import combinations
+
+import numpy as np
+
+from city_coordinates import haversine_matrix
+
+# "Group 12 (female, NA (Pacific Time))" -> "(female, NA (Pacific Time))"
+GROUP_NUMBER_PREFIX = re.compile(r'^Group \d+ ')
+
+
+def _codes(values):
+    """Map hashable values to small ints (equal values share a code)."""
+    seen = {}
+    return [seen.setdefault(value, len(seen)) for value in values]
+
+
+class GroupObjective:
+    """
+    Pairwise cost of putting two members in the same group (lower is better).
+
+    pair cost = goal weight      * [goals differ]
+              + age weight       * |age rank difference|
+              + timezone weight  * [timezones differ]
+              + geography weight * miles / distance_scale   (both members located)
+
+    A group's cost is the sum over its member pairs.
+    """
+
+    DEFAULT_WEIGHTS = {'geography': 1.0, 'goal': 1.0, 'age': 0.5, 'timezone': 2.0}
+
+    def __init__(self, goal_fn, age_fn, coords_fn, timezone_fn, weights=None, distance_scale=100.0):
+        """
+        Args:
+            goal_fn:        callable(member) -> goal key
+            age_fn:         callable(member) -> numeric age rank, or None if unknown
+            coords_fn:      callable(member) -> (lat, lng) or None
+            timezone_fn:    callable(member) -> timezone key
+            weights:        overrides for DEFAULT_WEIGHTS
+            distance_scale: miles that cost as much as one goal mismatch (at weight 1)
+        """
+        self.goal_fn = goal_fn
+        self.age_fn = age_fn
+        self.coords_fn = coords_fn
+        self.timezone_fn = timezone_fn
+        self.weights = dict(self.DEFAULT_WEIGHTS, **(weights or {}))
+        self.distance_scale = distance_scale
+
+    def component_matrices(self, members):
+        """
+        Per-component pair matrices for a list of members.
+
+        Returns:
+            dict: component name -> (n, n) numpy array of unweighted pair costs
+        """
+        goals = [self.goal_fn(m) for m in members]
+        ages = np.array([np.nan if a is None else a for a in (self.age_fn(m) for m in members)], dtype=float)
+        timezones = [self.timezone_fn(m) for m in members]
+        coords = [self.coords_fn(m) for m in members]
+
+        goal_codes = np.array(_codes(goals))
+        tz_codes = np.array(_codes(timezones))
+        matrices = {
+            'goal': (goal_codes[:, None] != goal_codes[None, :]).astype(float),
+            'age': np.nan_to_num(np.abs(ages[:, None] - ages[None, :])),  # unknown age -> no cost
+            'timezone': (tz_codes[:, None] != tz_codes[None, :]).astype(float),
+        }
+
+        geography = np.zeros((len(members), len(members)))
+        located = [i for i, c in enumerate(coords) if c]
+        if len(located) > 1:
+            lats = [coords[i][0] for i in located]
+            lngs = [coords[i][1] for i in located]
+            geography[np.ix_(located, located)] = haversine_matrix(lats, lngs) / self.distance_scale
+        matrices['geography'] = geography
+        return matrices
+
+    def pair_matrix(self, members, matrices=None):
+        """Weighted pair-cost matrix for a list of members (reuses matrices if given)."""
+        if matrices is None:
+            matrices = self.component_matrices(members)
+        total = np.zeros((len(members), len(members)))
+        for name, matrix in matrices.items():
+            total += self.weights.get(name, 0.0) * matrix
+        return total
+
+
+def group_cost(pair_costs, indices):
+    """Sum of pair costs over all pairs in a group of member indices."""
+    return sum(pair_costs[a][b] for a, b in combinations(indices, 2))
+
+
+def swap_domains(grouped):
+    """
+    Group names that may exchange members: same label apart from "Group N".
+
+    Returns:
+        list: Lists of group names (2+ groups each), in first-seen order
+    """
+    domains = defaultdict(list)
+    for group_name in grouped:
+        domains[GROUP_NUMBER_PREFIX.sub('', group_name)].append(group_name)
+    return [names for names in domains.values() if len(names) > 1]
+
+
+class SwapOptimizer:
+    """
+    First-improvement pairwise swap search within each swap domain.
+
+    Deterministic for a given input when it converges within the budget;
+    a run cut off by the time budget keeps every swap made so far.
+    """
+
+    name = 'swap'
+
+    def __init__(self, objective, time_budget=5.0, max_passes=20):
+        """
+        Args:
+            objective:   GroupObjective used to score groups
+            time_budget: Wall-clock seconds for the whole run (None = unlimited)
+            max_passes:  Maximum improvement passes per domain
+        """
+        self.objective = objective
+        self.time_budget = time_budget
+        self.max_passes = max_passes
+
+    def optimize(self, grouped):
+        """
+        Improve grouped in place.
+
+        Args:
+            grouped: Dict of {group_name: [members]} (lists are modified in place)
+
+        Returns:
+            dict: Run metrics (costs before/after per component, swaps, passes, timing)
+        """
+        start = time.perf_counter()
+        deadline = start + self.time_budget if self.time_budget is not None else math.inf
+        domains = swap_domains(grouped)
+        metrics = {
+            'optimizer': self.name,
+            'time_budget_seconds': self.time_budget,
+            'domains': len(domains),
+            'groups': sum(len(names) for names in domains),
+            'members': 0,
+            'passes': 0,
+            'swaps': 0,
+            'cost_before': 0.0,
+            'cost_after': 0.0,
+            'components_before': defaultdict(float),
+            'components_after': defaultdict(float),
+            'stopped': 'converged',
+        }
+
+        for names in domains:
+            members = [m for name in names for m in grouped[name]]
+            metrics['members'] += len(members)
+            components = self.objective.component_matrices(members)
+            pair_costs = self.objective.pair_matrix(members, components).tolist()
+
+            # Groups as lists of indices into members
+            groups, offset = [], 0
+            for name in names:
+                groups.append(list(range(offset, offset + len(grouped[name]))))
+                offset += len(grouped[name])
+
+            self._add_costs(metrics['components_before'], components, groups)
+            metrics['cost_before'] += sum(group_cost(pair_costs, g) for g in groups)
+
+            if metrics['stopped'] != 'time_budget':
+                passes, swaps, stopped = self._search(groups, pair_costs, deadline)
+                metrics['passes'] += passes
+                metrics['swaps'] += swaps
+                if stopped != 'converged':
+                    metrics['stopped'] = stopped
+
+            self._add_costs(metrics['components_after'], components, groups)
+            metrics['cost_after'] += sum(group_cost(pair_costs, g) for g in groups)
+            for name, indices in zip(names, groups):
+                grouped[name][:] = [members[i] for i in indices]
+
+        metrics['components_before'] = dict(metrics['components_before'])
+        metrics['components_after'] = dict(metrics['components_after'])
+        before = metrics['cost_before']
+        metrics['improvement_pct'] = (100.0 * (before - metrics['cost_after']) / before) if before else 0.0
+        metrics['elapsed_seconds'] = time.perf_counter() - start
+        return metrics
+
+    def _search(self, groups, pair_costs, deadline):
+        """Swap members between group pairs while the total cost decreases."""
+        passes = swaps = 0
+        checks = 0
+        while passes < self.max_passes:
+            passes += 1
+            improved = False
+            for gi, gj in combinations(range(len(groups)), 2):
+                group_a, group_b = groups[gi], groups[gj]
+                for pos_a in range(len(group_a)):
+                    for pos_b in range(len(group_b)):
+                        checks += 1
+                        if checks % 256 == 0 and time.perf_counter() > deadline:
+                            return passes, swaps, 'time_budget'
+                        a, b = group_a[pos_a], group_b[pos_b]
+                        row_a, row_b = pair_costs[a], pair_costs[b]
+                        delta = 0.0
+                        for x in group_a:
+                            if x != a:
+                                delta += row_b[x] - row_a[x]
+                        for y in group_b:
+                            if y != b:
+                                delta += row_a[y] - row_b[y]
+                        if delta < -1e-9:
+                            group_a[pos_a], group_b[pos_b] = b, a
+                            swaps += 1
+                            improved = True
+            if not improved:
+                return passes, swaps, 'converged'
+        return passes, swaps, 'max_passes'
+
+    @staticmethod
+    def _add_costs(totals, components, groups):
+        for name, matrix in components.items():
+            totals[name] += sum(float(matrix[a][b]) for g in groups for a, b in combinations(g, 2))
+
+
+OPTIMIZERS = {
+    'swap': SwapOptimizer,
+}
+
+
+def make_optimizer(name, objective, **options):
+    """
+    Build a registered optimizer by name.
+
+    Raises:
+        ValueError: If name is not in OPTIMIZERS
+    """
+    if name not in OPTIMIZERS:
+        raise ValueError(f"Unknown group optimizer '{name}'. Available: {', '.join(sorted(OPTIMIZERS))}")
+    return OPTIMIZERS[name](objective, **options)
@@ -0,0 +1,231 @@
+"""
+Content-hashed snapshots of the merged input.
+
+Parsing the Merged Data sheet with openpyxl is the slowest part of startup.
+load_merged_data() hashes the input bytes; the first read stores the parsed
+DataFrame (dtypes included) and the detected column mapping under
+INPUT_CACHE_DIR, and later reads of the same bytes load that snapshot
+instead. An edited file hashes differently, so a stale snapshot is never used.
+
+Snapshots are Parquet when pyarrow is installed and the frame survives a
+Parquet round trip unchanged, otherwise pickle (pandas' own format, which
+keeps dtypes exactly).
+
+Snapshots hold the full input, participant names and emails included, so the
+directory is local-only (gitignored) and pruned after every write: at most
+INPUT_CACHE_MAX_ENTRIES snapshots, none older than INPUT_CACHE_MAX_AGE_DAYS.
+"""
+
+import hashlib
+import io
+import json
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+
+INPUT_CACHE_DIR = '.input_cache'
+
+# Snapshots kept per cache directory (newest first) and their maximum age
+INPUT_CACHE_MAX_ENTRIES = 8
+INPUT_CACHE_MAX_AGE_DAYS = 14
+
+# Bump when reading or the snapshot layout changes, to ignore older snapshots
+SNAPSHOT_VERSION = 1
+
+# Snapshot format -> file extension
+SNAPSHOT_FORMATS = {'parquet': '.parquet', 'pickle': '.pkl'}
+
+
+def _source_bytes(source):
+    """Raw bytes of a file path, bytes, or file-like object (e.g. a Streamlit upload)."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read()
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if hasattr(source, 'getvalue'):
+        return source.getvalue()
+    position = source.tell()
+    data = source.read()
+    source.seek(position)
+    return data
+
+
+def content_digest(data, *extra):
+    """SHA-256 of the input bytes plus anything else that changes the parsed result."""
+    digest = hashlib.sha256(data)
+    for part in (SNAPSHOT_VERSION, pd.__version__, *extra):
+        digest.update(b'\0' + str(part).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def default_snapshot_format():
+    """'parquet' if pyarrow is installed, else 'pickle'."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return 'pickle'
+    return 'parquet'
+
+
+def read_merged_data(data, sheet_name='Merged Data', csv_fallback=True):
+    """
+    Parse the merged input: the Excel sheet, or CSV if that fails.
+
+    Raises:
+        Exception: The CSV error if both fail (the Excel error without csv_fallback)
+    """
+    try:
+        return pd.read_excel(io.BytesIO(data), sheet_name=sheet_name)
+    except Exception:
+        if not csv_fallback:
+            raise
+        return pd.read_csv(io.BytesIO(data))
+
+
+def _snapshot_paths(cache_dir, digest, fmt):
+    return (os.path.join(cache_dir, digest + SNAPSHOT_FORMATS[fmt]),
+            os.path.join(cache_dir, digest + '.json'))
+
+
+def _write_snapshot(df, path, fmt):
+    """
+    Write atomically (temp file + rename) so an interrupted run leaves no partial snapshot.
+
+    Raises:
+        ValueError: If a Parquet round trip does not give back the same frame and dtypes
+    """
+    tmp_path = path + '.tmp'
+    try:
+        if fmt == 'parquet':
+            df.to_parquet(tmp_path)
+            if not _same_frame(df, pd.read_parquet(tmp_path)):
+                raise ValueError("Parquet round trip changed the data")
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _same_frame(df, other):
+    """Same columns, dtypes and values, and the same value types in object columns (None is not NaN)."""
+    if list(df.columns) != list(other.columns) or not (df.dtypes == other.dtypes).all() or not df.equals(other):
+        return False
+    return all(df[column].map(type).equals(other[column].map(type))
+               for column in df.columns[df.dtypes == object])
+
+
+def prune_snapshots(cache_dir, max_entries=INPUT_CACHE_MAX_ENTRIES, max_age_days=INPUT_CACHE_MAX_AGE_DAYS):
+    """
+    Delete snapshots beyond the newest max_entries or older than max_age_days.
+
+    Args:
+        cache_dir: Snapshot directory
+        max_entries: Snapshots to keep (None = no count limit)
+        max_age_days: Maximum snapshot age in days (None = no age limit)
+
+    Returns:
+        int: Number of snapshots removed
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+    snapshot_exts = tuple(SNAPSHOT_FORMATS.values()) + ('.json',)
+    entries = {}
+    for name in os.listdir(cache_dir):
+        digest, ext = os.path.splitext(name)
+        if ext not in snapshot_exts:
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        paths, newest = entries.get(digest, ([], 0))
+        entries[digest] = (paths + [path], max(newest, mtime))
+
+    ranked = sorted(entries.values(), key=lambda entry: entry[1], reverse=True)
+    cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+    removed = 0
+    for rank, (paths, mtime) in enumerate(ranked):
+        if (max_entries is None or rank < max_entries) and (cutoff is None or mtime >= cutoff):
+            continue
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        removed += 1
+    return removed
+
+
+def load_merged_data(source, column_mapping_fn=None, sheet_name='Merged Data', cache_dir=INPUT_CACHE_DIR,
+                     csv_fallback=True, mapping_key=''):
+    """
+    Load the merged input, from a snapshot when these exact bytes were read before.
+
+    Args:
+        source: File path, bytes, or file-like object (e.g. a Streamlit upload)
+        column_mapping_fn: Optional callable(df) -> column mapping, stored with the snapshot
+        sheet_name: Excel sheet to read
+        cache_dir: Snapshot directory (None = always parse)
+        csv_fallback: Parse as CSV if the Excel sheet cannot be read
+        mapping_key: Extra cache key for the mapping rules (e.g. the expected column names)
+
+    Returns:
+        tuple: (DataFrame, column mapping or None, True if loaded from a snapshot)
+    """
+    data = _source_bytes(source)
+    if cache_dir is None:
+        df = read_merged_data(data, sheet_name, csv_fallback)
+        return df, column_mapping_fn(df) if column_mapping_fn else None, False
+
+    digest = content_digest(data, sheet_name, csv_fallback, mapping_key)
+    for fmt in SNAPSHOT_FORMATS:
+        data_path, meta_path = _snapshot_paths(cache_dir, digest, fmt)
+        if os.path.exists(data_path) and os.path.exists(meta_path):
+            try:
+                with open(meta_path, encoding='utf-8') as f:
+                    meta = json.load(f)
+                if meta.get('version') != SNAPSHOT_VERSION or meta.get('format') != fmt:
+                    break
+                df = pd.read_parquet(data_path) if fmt == 'parquet' else pd.read_pickle(data_path)
+            except Exception:
+                break  # unreadable snapshot: parse again and overwrite it
+            if column_mapping_fn and meta.get('column_mapping') is None:
+                meta['column_mapping'] = column_mapping_fn(df)
+            return df, meta.get('column_mapping'), True
+
+    df = read_merged_data(data, sheet_name, csv_fallback)
+    column_mapping = column_mapping_fn(df) if column_mapping_fn else None
+
+    os.makedirs(cache_dir, exist_ok=True)
+    fmt = default_snapshot_format()
+    data_path, meta_path = _snapshot_paths(cache_dir, digest, fmt)
+    try:
+        _write_snapshot(df, data_path, fmt)
+    except Exception:
+        if fmt == 'pickle':
+            raise
+        # Mixed-type object columns cannot always be stored (or restored) as Parquet
+        fmt = 'pickle'
+        data_path, meta_path = _snapshot_paths(cache_dir, digest, fmt)
+        _write_snapshot(df, data_path, fmt)
+    meta = {
+        'version': SNAPSHOT_VERSION,
+        'source': os.path.basename(os.fspath(source)) if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', None),
+        'sheet_name': sheet_name,
+        'format': fmt,
+        'rows': len(df),
+        'columns': [str(column) for column in df.columns],
+        'column_mapping': column_mapping,
+        'created': datetime.now().isoformat(timespec='seconds'),
+    }
+    with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + '.tmp', meta_path)
+    prune_snapshots(cache_dir)
+    return df, column_mapping, False
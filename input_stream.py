@@ -0,0 +1,168 @@
+"""
+Streaming ingestion of the merged input.
+
+The default path parses the whole file into a DataFrame, copies every row
+into a dict and only then builds Participant records. iter_row_chunks()
+instead reads CSV in chunks (pandas) and xlsx row by row (openpyxl
+read-only mode), keeps only the columns the pipeline uses, and yields small
+lists of rows; stream_records() turns each chunk into records (e.g.
+Participant) right away, so the parsed frame of a chunk can be freed before
+the next one is read. Each row is a RowValues mapping: a tuple of cells over
+one column index shared by the whole file, not a dict per row.
+
+Each chunk is typed by pandas' own parser (the one read_excel uses), so
+cells match the DataFrame path: blanks and NA strings become NaN, 'True' /
+'False' become bools, numeric text becomes numbers. One difference: whole
+floats become int in every chunk, where a full-frame read turns an integer
+column with blanks into floats (a chunk without blanks would stay int).
+"""
+
+import math
+import os
+from collections.abc import Mapping
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+# Rows per chunk handed to the record builder
+STREAM_CHUNK_ROWS = 5000
+
+# Columns read by literal name (location display and the input sort), kept
+# alongside the mapped columns
+LITERAL_COLUMNS = ('country', 'province', 'city', 'internationalState', 'internationalCity',
+                   'locationIdentifier', 'location_identifier')
+
+
+def normalize_cell(value):
+    """A parsed cell with None as NaN and whole floats as int (chunks disagree on int vs float)."""
+    if value is None:
+        return math.nan
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def is_csv(path):
+    return os.path.splitext(str(path))[1].lower() == '.csv'
+
+
+def read_header(path, sheet_name='Merged Data'):
+    """Column names of the input file."""
+    if is_csv(path):
+        return list(pd.read_csv(path, nrows=0).columns)
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        header = next(wb[sheet_name].iter_rows(max_row=1, values_only=True), ())
+    finally:
+        wb.close()
+    return [column for column in header if column is not None]
+
+
+class RowValues(Mapping):
+    """Read-only row mapping: a tuple of cells over a column index shared by every row of a file."""
+    __slots__ = ('index', 'values')
+
+    def __init__(self, index, values):
+        self.index = index
+        self.values = values
+
+    def __getitem__(self, column):
+        return self.values[self.index[column]]
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, column):
+        return column in self.index
+
+    def get(self, column, default=None):
+        position = self.index.get(column)
+        return default if position is None else self.values[position]
+
+    def __repr__(self):
+        return f"RowValues({dict(self)!r})"
+
+
+def chunk_records(chunk, columns, index=None):
+    """RowValues rows of a parsed chunk, cells normalized."""
+    if index is None:
+        index = {column: i for i, column in enumerate(columns)}
+    return [RowValues(index, tuple(normalize_cell(value) for value in row))
+            for row in chunk[columns].itertuples(index=False, name=None)]
+
+
+def iter_row_chunks(path, columns, sheet_name='Merged Data', chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Yield lists of RowValues rows restricted to columns, chunk_rows rows at a time.
+
+    Args:
+        path: CSV or xlsx file
+        columns: Column names to keep (others are never materialized)
+        sheet_name: Sheet of an xlsx file
+        chunk_rows: Rows per chunk
+    """
+    columns = list(columns)
+    index = {column: i for i, column in enumerate(columns)}
+    if is_csv(path):
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_rows):
+            yield chunk_records(chunk, columns, index)
+        return
+
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb[sheet_name].iter_rows(values_only=True)
+        header = next(rows, ())
+        positions = [header.index(column) for column in columns]
+        chunk = []
+        blank_rows = 0  # held back until a filled row follows; read_excel drops trailing blank rows
+        for row in rows:
+            if all(cell is None for cell in row):
+                blank_rows += 1
+                continue
+            # Blank cells as '' like pandas' openpyxl reader
+            chunk.extend([[''] * len(positions)] * blank_rows)
+            chunk.append(['' if i >= len(row) or row[i] is None else row[i] for i in positions])
+            blank_rows = 0
+            if len(chunk) >= chunk_rows:
+                yield _parse_cells(chunk, columns, index)
+                chunk = []
+        if chunk:
+            yield _parse_cells(chunk, columns, index)
+    finally:
+        wb.close()
+
+
+def _parse_cells(rows, columns, index):
+    """Type cell values with the parser read_excel uses ('True' -> True, '77' -> 77, '' -> NaN)."""
+    return chunk_records(TextParser(rows, names=columns).read(), columns, index)
+
+
+def stream_records(path, column_mapping_fn, build_records, sheet_name='Merged Data', chunk_rows=STREAM_CHUNK_ROWS):
+    """
+    Read the input chunk by chunk and build records as it goes.
+
+    Args:
+        path: CSV or xlsx file
+        column_mapping_fn: callable(df) -> column mapping (given an empty frame with the header)
+        build_records: callable(rows, column_mapping) -> records for one chunk
+        sheet_name: Sheet of an xlsx file
+        chunk_rows: Rows per chunk
+
+    Returns:
+        tuple: (column_mapping, records in file order)
+    """
+    header = read_header(path, sheet_name)
+    column_mapping = column_mapping_fn(pd.DataFrame(columns=header))
+    keep = {column for column in column_mapping.values() if column}
+    keep.update(column for column in LITERAL_COLUMNS if column in header)
+    columns = [column for column in header if column in keep]
+
+    records = []
+    for rows in iter_row_chunks(path, columns, sheet_name, chunk_rows):
+        records.extend(build_records(rows, column_mapping))
+    return column_mapping, records
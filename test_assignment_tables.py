@@ -0,0 +1,62 @@
+"""Tests for assignment_tables.py (run with `python -m pytest`)."""
+
+import pandas as pd
+
+import group_assignment_to_excel as grouping
+from assignment_tables import (ASSIGNMENT_COLUMNS, CHANGE_COLUMNS, GROUP_TYPES, assignment_table,
+                               diff_assignment_tables, read_assignment_table, tables_equal,
+                               write_assignment_table)
+
+ROWS = [{'id': str(i), 'email': f'user{i}@example.com', 'name': f'User {i}', 'sex': 'female' if i % 2 else 'male',
+         'residingInPhilippines': 'true', 'province': 'Cebu', 'city': 'Cebu City', 'country': 'Philippines'}
+        for i in range(10)]
+COLUMN_MAPPING = grouping.find_column_mapping(pd.DataFrame(ROWS))
+PARTICIPANTS = grouping.build_participants(ROWS, COLUMN_MAPPING, {})
+
+
+def make_table(groups, solo=()):
+    """Assignment table for regular groups {name: member indices} and solo member indices."""
+    grouped = {name: [PARTICIPANTS[i] for i in members] for name, members in groups.items()}
+    solo_groups = [[PARTICIPANTS[i]] for i in solo]
+    return assignment_table(grouping.build_export_groups(solo_groups, grouped, COLUMN_MAPPING))
+
+
+def test_csv_round_trip(tmp_path):
+    table = make_table({'Group 1 (no_preference, Cebu)': [0, 1, 2, 3], 'Group 2 (no_preference, Cebu)': [4, 5, 6, 7]},
+                       solo=[8])
+    path = tmp_path / 'groups.csv'
+    write_assignment_table(table, path)
+    loaded = read_assignment_table(path)
+
+    assert list(loaded.columns) == ASSIGNMENT_COLUMNS
+    assert tables_equal(table, loaded)
+    assert loaded['user_id'].tolist() == ['8', '0', '1', '2', '3', '4', '5', '6', '7']
+    assert str(loaded['group_id'].dtype) == 'int32' and str(loaded['slot'].dtype) == 'int16'
+    assert list(loaded['group_type'].cat.categories) == GROUP_TYPES
+    assert loaded['solo'].dtype == bool and loaded['solo'].tolist() == [True] + [False] * 8
+
+
+def test_diff_ignores_renamed_groups():
+    previous = make_table({'Group 1 (no_preference, Cebu)': [0, 1, 2, 3], 'Group 2 (no_preference, Cebu)': [4, 5, 6, 7]})
+    current = make_table({'Group 1 (no_preference, Cebu)': [4, 5, 6, 7], 'Group 2 (no_preference, Cebu)': [0, 1, 2, 3]})
+
+    changes = diff_assignment_tables(previous, current)
+    assert list(changes.columns) == CHANGE_COLUMNS
+    assert changes.empty
+
+
+def test_diff_reports_added_moved_and_removed_members():
+    previous = make_table({'Group 1 (no_preference, Cebu)': [0, 1, 2, 3], 'Group 2 (no_preference, Cebu)': [4, 5, 6, 7]},
+                          solo=[8])
+    current = make_table({'Group 1 (no_preference, Cebu)': [0, 1, 2, 3], 'Group 2 (no_preference, Cebu)': [4, 5, 6, 9]},
+                         solo=[7])
+
+    changes = diff_assignment_tables(previous, current)
+    assert changes.values.tolist() == [
+        ['Moved', '7', 'User 7', 'Group 2 (no_preference, Cebu)', 'Solo 1'],
+        ['Moved', '4', 'User 4', 'Group 2 (no_preference, Cebu)', 'Group 2 (no_preference, Cebu)'],
+        ['Moved', '5', 'User 5', 'Group 2 (no_preference, Cebu)', 'Group 2 (no_preference, Cebu)'],
+        ['Moved', '6', 'User 6', 'Group 2 (no_preference, Cebu)', 'Group 2 (no_preference, Cebu)'],
+        ['Added', '9', 'User 9', '', 'Group 2 (no_preference, Cebu)'],
+        ['Removed', '8', 'User 8', 'Solo 1', ''],
+    ]
@@ -0,0 +1,21 @@
+"""Tests for buddy_graph.py (run with `python -m pytest`)."""
+
+from buddy_graph import BuddyGraph
+
+
+def test_blank_email_requests_are_not_pooled():
+    graph = BuddyGraph(known_emails=['a@x.com', 'b@x.com', 'c@x.com'])
+    graph.add_request('', ['a@x.com'])
+    graph.add_request('', ['b@x.com'])
+    graph.add_request('no-email', ['c@x.com'])
+    graph.add_request('a@x.com', ['c@x.com'])
+
+    assert graph.requested_emails('') == []
+    assert graph.requested_emails('no-email') == []
+    assert graph.referenced_emails() == {'c@x.com'}
+
+    for email in ('', 'a@x.com', 'b@x.com', 'c@x.com'):
+        graph.add_participant(email)
+    components = graph.connected_components()
+    assert ['a@x.com', 'c@x.com'] in components
+    assert not any('' in component and len(component) > 1 for component in components)
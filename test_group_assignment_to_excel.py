@@ -0,0 +1,186 @@
+"""Tests for group_assignment_to_excel.py (run with `python -m pytest`)."""
+
+import contextlib
+import gc
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import warnings
+import weakref
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+import group_assignment_to_excel as grouping
+from user_list_to_excel import save_user_list_to_excel
+
+SYNTHETIC_COLUMN_MAPPING = {
+    'user_id': 'id', 'email': 'email', 'sex': 'sex', 'residing_ph': 'residingInPhilippines',
+    'gender_preference': 'groupGenderPreference', 'country': 'country', 'province': 'province',
+    'city': 'city', 'internationalState': 'internationalState', 'internationalCity': 'internationalCity',
+    'current_goal': 'currentGoal', 'age_group': 'ageGroup',
+}
+
+
+def synthetic_rows(n_users, seed=7):
+    """Input rows with many goal / age ties, spread over several PH provinces and countries."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_users):
+        ph = rng.random() < 0.6
+        rows.append({
+            'id': str(i), 'email': f'user{i}@example.com', 'sex': rng.choice(['female', 'male']),
+            'groupGenderPreference': rng.choice(['same_gender', 'no_preference']),
+            'currentGoal': rng.choice(['cutting', 'bulking', 'not_sure']),
+            'ageGroup': rng.choice(['21-30', '31-40', '41-50']),
+            'residingInPhilippines': 'true' if ph else 'false',
+            'country': 'Philippines' if ph else rng.choice(['Japan', 'United States', 'Canada']),
+            'province': rng.choice(['Metro Manila', 'Cebu', 'Laguna']) if ph else '',
+            'city': rng.choice(['City A', 'City B']) if ph else '',
+            'internationalState': '' if ph else rng.choice(['California', 'Ontario', 'Tokyo']),
+            'internationalCity': '',
+        })
+    return rows
+
+
+def group_synthetic(n_users=400, workers=None):
+    """group_participants() on synthetic_rows(), console output silenced."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return grouping.group_participants(synthetic_rows(n_users), SYNTHETIC_COLUMN_MAPPING, workers=workers)
+
+
+def grouping_fingerprint(workers=None):
+    """Group names and member ids of group_synthetic(), as JSON."""
+    solo_groups, grouped, *_ = group_synthetic(workers=workers)
+    return json.dumps({
+        'solo': [[member.user_id for member in members] for members in solo_groups],
+        'grouped': [[name, [member.user_id for member in members]] for name, members in grouped.items()],
+    })
+
+
+def incremental_export(output_file):
+    """save_incremental_export() of group_synthetic() as JSON: (change counts or None, written)."""
+    solo_groups, grouped, excluded_users, requested_groups, combined_group_info = group_synthetic()
+    export_groups = grouping.build_export_groups(solo_groups, grouped, SYNTHETIC_COLUMN_MAPPING, excluded_users,
+                                                 requested_groups, combined_group_info)
+    changes, written = grouping.save_incremental_export(export_groups, output_file)
+    counts = changes['change'].value_counts().to_dict() if changes is not None else None
+    return json.dumps([counts, written])
+
+
+def run_with_hash_seed(hash_seed, code, *args):
+    """Stdout of `python -c code args` in this directory under the given PYTHONHASHSEED."""
+    env = {**os.environ, 'PYTHONHASHSEED': str(hash_seed)}
+    result = subprocess.run([sys.executable, '-c', code, *map(str, args)], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+def workbook_values(path):
+    """{sheet name: cell values by row} of an xlsx file."""
+    wb = load_workbook(path)
+    return {ws.title: [list(row) for row in ws.iter_rows(values_only=True)] for ws in wb.worksheets}
+
+
+def run_main(monkeypatch, input_file, output_dir, streaming):
+    """main() on input_file; returns the values of the group workbook and the user list."""
+    output_file = output_dir / f'groups_{streaming}.xlsx'
+    user_list_file = output_dir / f'users_{streaming}.xlsx'
+    settings = {'INPUT_FILE': str(input_file), 'OUTPUT_FILE': str(output_file), 'USER_LIST_FILE': str(user_list_file),
+                'INPUT_CACHE_DIR': None, 'STREAMING_INPUT': streaming}
+    for name, value in settings.items():
+        monkeypatch.setattr(grouping, name, value)
+    with contextlib.redirect_stdout(io.StringIO()):
+        grouping.main()
+    return workbook_values(output_file), workbook_values(user_list_file)
+
+
+def test_category_memo_holds_every_distinct_value():
+    categories = grouping.CategoryMemo()
+    cities = [f' City {i} ' for i in range(10000)]
+    texts = [categories.text(city) for city in cities]
+    # Every distinct value stays memoized (no eviction), so equal values share one string
+    assert all(categories.text(f' City {i} ') is text for i, text in enumerate(texts))
+    assert categories.key(' City 7 ') == 'city 7'
+    assert categories.text(True) == 'True' and categories.text(1) == '1'
+    assert categories.text(float('nan')) is categories.text(float('nan'))
+    assert [categories.code(key) for key in ['cebu', 'japan', 'cebu']] == [0, 1, 0]
+
+    assert grouping.CategoryMemo().text(' City 7 ') is not texts[7]
+
+
+def test_category_memos_do_not_outlive_their_build(monkeypatch):
+    memos = weakref.WeakSet()
+    created = []
+
+    class TrackedMemo(grouping.CategoryMemo):
+        def __init__(self):
+            super().__init__()
+            memos.add(self)
+            created.append(None)
+
+    monkeypatch.setattr(grouping, 'CategoryMemo', TrackedMemo)
+    rows = synthetic_rows(200)
+    with contextlib.redirect_stdout(io.StringIO()):
+        # The Streamlit app's user list download, then a grouping run
+        save_user_list_to_excel(rows, io.BytesIO(), SYNTHETIC_COLUMN_MAPPING)
+        grouping.group_participants(rows, SYNTHETIC_COLUMN_MAPPING)
+    gc.collect()
+    assert created and not memos
+
+
+def test_input_sort_order_raises_no_pandas_warnings():
+    df = pd.DataFrame({
+        'residingInPhilippines': [True, False, True, False, True, False],
+        'province': ['Cebu', None, 'Metro Manila', None, 'Cebu', None],
+        'city': ['Cebu City', None, 'Makati', None, 'Cebu City', None],
+        'country': ['Philippines', 'Japan', 'Philippines', 'USA', 'Philippines', 'USA'],
+        'groupGenderPreference': ['same', 'no_preference', 'same', 'same', 'no_preference', 'same'],
+        'id': [1, 2, 3, 4, 5, 6],
+    })
+    column_mapping = grouping.find_column_mapping(df)
+    with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+        # Values outside the PH / non-PH frequency ranks used to warn on pandas 3 (and raise on 4)
+        warnings.simplefilter('error')
+        text_order = grouping.input_sort_order(df, column_mapping)
+        categorical_order = grouping.input_sort_order(grouping.encode_categories(df, column_mapping), column_mapping)
+
+    # PH: Cebu (2 rows, then by preference) before Metro Manila; elsewhere: USA (2 rows) before Japan
+    assert list(text_order) == [4, 0, 2, 3, 5, 1]
+    assert list(categorical_order) == list(text_order)
+
+
+def test_grouping_does_not_depend_on_hash_seed_or_worker_count():
+    code = 'import sys, test_group_assignment_to_excel as t; print(t.grouping_fingerprint(int(sys.argv[1])))'
+    # Ties between equally common goals / ages used to be broken in set order
+    fingerprints = {run_with_hash_seed(hash_seed, code, workers)
+                    for hash_seed, workers in [(0, 1), (1, 1), (2, 2), (3, 3)]}
+    assert len(fingerprints) == 1
+
+
+def test_incremental_export_of_unchanged_input_reports_no_changes(tmp_path):
+    code = 'import sys, test_group_assignment_to_excel as t; print(t.incremental_export(sys.argv[1]))'
+    output_file = tmp_path / 'groups.xlsx'
+    assert json.loads(run_with_hash_seed(0, code, output_file)) == [None, True]
+    # A different hash seed must not show up as moved members
+    assert json.loads(run_with_hash_seed(1, code, output_file)) == [{}, False]
+    assert json.loads(run_with_hash_seed(2, code, output_file)) == [{}, False]
+
+
+@pytest.mark.parametrize('extension', ['csv', 'xlsx'])
+def test_streaming_input_matches_the_whole_frame_read(monkeypatch, tmp_path, extension):
+    df = pd.DataFrame(synthetic_rows(300))
+    df['name'] = [f'User {i}' for i in range(len(df))]
+    input_file = tmp_path / f'merged.{extension}'
+    if extension == 'csv':
+        df.to_csv(input_file, index=False)
+    else:
+        df.to_excel(input_file, sheet_name='Merged Data', index=False)
+
+    streamed = run_main(monkeypatch, input_file, tmp_path, streaming=True)
+    assert streamed == run_main(monkeypatch, input_file, tmp_path, streaming=False)
+    assert len(streamed[1]['User List']) == 301
@@ -0,0 +1,29 @@
+"""Tests for input_cache.py (run with `python -m pytest`)."""
+
+import os
+import time
+
+from input_cache import prune_snapshots
+
+
+def _snapshot(cache_dir, digest, age_days):
+    mtime = time.time() - age_days * 86400
+    for ext in ('.pkl', '.json'):
+        path = os.path.join(cache_dir, digest + ext)
+        with open(path, 'w') as f:
+            f.write('{}')
+        os.utime(path, (mtime, mtime))
+
+
+def test_prune_keeps_newest_snapshots_within_age(tmp_path):
+    for i, age in enumerate([0, 1, 2, 3, 30]):
+        _snapshot(tmp_path, f'digest{i}', age)
+    (tmp_path / 'notes.txt').write_text('kept')
+
+    assert prune_snapshots(tmp_path, max_entries=3, max_age_days=14) == 2
+    assert sorted(os.listdir(tmp_path)) == ['digest0.json', 'digest0.pkl', 'digest1.json', 'digest1.pkl',
+                                            'digest2.json', 'digest2.pkl', 'notes.txt']
+
+
+def test_prune_missing_directory(tmp_path):
+    assert prune_snapshots(tmp_path / 'absent') == 0
@@ -0,0 +1,57 @@
+"""Tests for the User List export (run with `python -m pytest`)."""
+
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from user_list_to_excel import find_column_mapping, save_user_list_to_excel
+
+NAN = np.nan
+
+FIXTURE = pd.DataFrame([
+    # PH resident without a city; buddy flag set but no buddies listed
+    {'id': 1, 'name': 'Ana Cruz', 'email': 'ana@example.com', 'sex': 'female', 'residingInPhilippines': True,
+     'province': 'Metro Manila', 'city': NAN, 'country': 'Philippines', 'internationalCity': NAN,
+     'internationalState': NAN, 'locationIdentifier': NAN, 'hasAccountabilityBuddies': True,
+     'accountabilityBuddies': NAN, 'previousCoachName': 'Coach Lee', 'ageGroup': '31-40',
+     'kaizenClientType': 'returning_latest'},
+    # International, state and location identifier missing
+    {'id': 2, 'name': 'Ben Ali', 'email': 'ben@example.com', 'sex': 'male', 'residingInPhilippines': False,
+     'province': NAN, 'city': NAN, 'country': 'United Arab Emirates', 'internationalCity': 'Dubai',
+     'internationalState': NAN, 'locationIdentifier': NAN, 'hasAccountabilityBuddies': False,
+     'accountabilityBuddies': NAN, 'previousCoachName': NAN, 'ageGroup': NAN, 'kaizenClientType': NAN},
+    # International with no location at all, no name and no coach
+    {'id': 3, 'name': NAN, 'email': NAN, 'sex': 'male', 'residingInPhilippines': False,
+     'province': NAN, 'city': NAN, 'country': NAN, 'internationalCity': NAN,
+     'internationalState': NAN, 'locationIdentifier': NAN, 'hasAccountabilityBuddies': True,
+     'accountabilityBuddies': 'Ana Cruz (ana@example.com)', 'previousCoachName': NAN, 'ageGroup': '21-30',
+     'kaizenClientType': NAN},
+])
+
+
+def export_user_list(df):
+    buffer = io.BytesIO()
+    with contextlib.redirect_stdout(io.StringIO()):
+        save_user_list_to_excel(df.to_dict('records'), buffer, find_column_mapping(df))
+    buffer.seek(0)
+    return load_workbook(buffer)['User List']
+
+
+def test_user_list_values_have_no_nan_text():
+    ws = export_user_list(FIXTURE)
+    rows = [[cell.value for cell in row] for row in ws.iter_rows(min_row=2)]
+    assert rows == [
+        [1, 'Ana Cruz*', 'MM', 'Coach Lee (31-40)', 'ana@example.com', None],
+        [2, 'Ben Ali', 'Dubai, United Arab Emirates', None, 'ben@example.com', None],
+        [3, None, None, '(21-30)', None, 'Ana Cruz (ana@example.com)'],
+    ]
+
+
+def test_user_list_underlines_on_the_buddy_flag_alone():
+    ws = export_user_list(FIXTURE)
+    underlined = [ws.cell(row=row, column=2).font.u for row in (2, 3, 4)]
+    assert underlined == ['single', None, 'single']
+    assert ws.cell(row=2, column=1).fill.fgColor.rgb == '00FFC0CB'